@@ -0,0 +1,3 @@
+"""
+Python access to the aircombat datasets in data/.
+"""
@@ -0,0 +1,81 @@
+"""
+Readers and content hashes for the files in data/, shared by the build
+scripts and the pipeline.
+
+    from aircombat.datafiles import load_inputs
+    tables = load_inputs('data', ['calcs', 'global_merged'])
+"""
+
+import csv
+import hashlib
+import io
+import json
+import os
+import pathlib
+import re
+
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.feather as feather
+
+# CSVs whose Feather twin is written directly by another pipeline step;
+# re-parsing them in convert_to_feather.py would only overwrite a
+# better-typed file.
+SKIP_CSVS = {"global_merged.csv"}
+
+# Country files are the CSVs with a 2-3 letter stem (us.csv, rus.csv):
+# merge_countries.py merges exactly these and the pipeline tracks them.
+COUNTRY_CSV = re.compile(r'^[a-zA-Z]{2,3}\.csv$')
+
+
+def country_csvs(data_dir):
+    """Sorted paths of the country CSVs in data_dir"""
+    return sorted(path for path in pathlib.Path(data_dir).glob('*.csv') if COUNTRY_CSV.match(path.name))
+
+
+def file_sha256(path):
+    """Return the hex SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def save_manifest(manifest_path, manifest):
+    """Write a JSON manifest atomically with stable key order"""
+    manifest_path = pathlib.Path(manifest_path)
+    tmp_path = manifest_path.with_name(manifest_path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write('\n')
+    os.replace(tmp_path, manifest_path)
+
+
+def read_strings(source):
+    """Whole CSV as an Arrow table with every column read as a string;
+    `source` is a path, the file's bytes or a binary file object"""
+    if isinstance(source, (bytes, bytearray)) or hasattr(source, 'read'):
+        data = bytes(source) if isinstance(source, (bytes, bytearray)) else source.read()
+        names = next(csv.reader(io.StringIO(data.decode('utf-8-sig'), newline='')), [])
+        source = io.BytesIO(data)
+    else:
+        with open(source, 'r', encoding='utf-8-sig', newline='') as f:
+            names = next(csv.reader(f), [])
+    return pacsv.read_csv(source, convert_options=pacsv.ConvertOptions(
+        column_types={name: pa.string() for name in names}, strings_can_be_null=True))
+
+
+def load_inputs(data_dir, names, inputs=None):
+    """{name: Arrow table} for the given data file stems, taken from `inputs`
+    when already loaded; global_merged prefers its Feather file"""
+    data_dir = pathlib.Path(data_dir)
+    loaded = {}
+    for name in names:
+        if inputs and name in inputs:
+            loaded[name] = inputs[name]
+        elif name == 'global_merged' and (data_dir / 'global_merged.feather').exists():
+            loaded[name] = feather.read_table(data_dir / 'global_merged.feather')
+        else:
+            loaded[name] = read_strings(data_dir / f'{name}.csv')
+    return loaded
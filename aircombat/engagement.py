@@ -0,0 +1,269 @@
+"""
+Monte Carlo beyond-visual-range engagement model, country vs country.
+
+Each country's side is built from calcs.csv and the merged fleet:
+
+  package     -- the aircraft listed in column `60` ("F-22A (20) + ...")
+  missile     -- longest range in `BVR` ("AIM-120D-3 (180) / AIM-260 (230)")
+  engagement  -- `BVR limit km`, the cued launch range
+  detection   -- longest radar range in `AEW`
+  fleet depth -- manned fighters In Service in global_merged (reserves)
+  quality     -- the A-G sub-scores (sensor, signature, missile, kill
+                 chain, ECM)
+
+A trial is a few volleys between the two packages. The side that detects
+and can launch from further out fires first; every later volley is
+simultaneous and closer in. Kill probability falls off as launch range
+approaches the missile's kinematic range and is reduced by the target's
+signature and ECM scores. Between volleys each side may replace losses
+from its reserve (fleet beyond the package), and a side wins a trial
+when it ends with more of its package still flying.
+
+All trials of a pair are drawn as NumPy arrays at once and pairs are
+spread over a process pool; each pair's random stream is derived from
+the seed and the pair's position, so results do not depend on the
+number of workers.
+
+    python -m aircombat.engagement --trials 100000 --seed 1
+"""
+
+import argparse
+import math
+import os
+import pathlib
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from aircombat.parsing import parse_items
+from aircombat.store import FLAG_TO_FILE_CODE, read_feather
+
+DATA_DIR = pathlib.Path("data")
+
+DEFAULT_TRIALS = 100000
+VOLLEYS = 3
+SHOTS_PER_AIRCRAFT = 2
+BASE_PK = 0.45
+# Later volleys close in by this factor each time
+CLOSING_FACTOR = 0.7
+# Chance a lost airframe is replaced from the reserve between volleys
+REINFORCE_RATE = 0.25
+# Spread of the per-trial detection range (log-normal sigma)
+DETECTION_SIGMA = 0.15
+# 95% two-sided normal quantile for the Wilson intervals
+Z_95 = 1.959963984540054
+
+
+def fleet_depth(fleet):
+    """Manned fighters In Service per file code, from the merged fleet table"""
+    frame = fleet.to_pandas() if hasattr(fleet, 'to_pandas') else fleet
+    counts = frame['In Service']
+    if not pd.api.types.is_numeric_dtype(counts):
+        counts = pd.to_numeric(counts.astype(str).str.extract(r'^\s*(\d+)')[0], errors='coerce')
+    fighters = (frame['Manned'] == 'Yes') & frame['Type'].fillna('').str.contains('Fighter')
+    return counts.fillna(0)[fighters].groupby(frame['country'].astype(str)[fighters]).sum().to_dict()
+
+
+def build_profiles(calcs, fleet=None):
+    """Per-country engagement parameters as a DataFrame, one row per calcs
+    row whose `60` column lists any aircraft"""
+    depth = fleet_depth(fleet) if fleet is not None else {}
+    rows = []
+    for record in calcs.to_dict('records'):
+        package = sum(count for _, count in parse_items(record.get('60'), strict=False))
+        if package <= 0:
+            # A blank or unparseable package has nothing to fly; left in, every
+            # survivor ratio against it would be 0/0
+            print(f"⚠️  {record['Country']}: no aircraft parsed from column 60, left out")
+            continue
+        missiles = [km for _, km in parse_items(record.get('BVR'), strict=False)]
+        radars = [km for _, km in parse_items(record.get('AEW'), strict=False)]
+        missile = max(missiles) if missiles else 0
+        limit = pd.to_numeric(record.get('BVR limit km'), errors='coerce')
+        code = FLAG_TO_FILE_CODE.get(str(record.get('Flag Abbrev', '')).strip().lower(), '')
+        fighters = depth.get(code, 0)
+        rows.append({
+            'Country': record['Country'],
+            'package': min(package, fighters) if fighters else package,
+            # Countries missing from the merged fleet are treated as having no reserve
+            'fleet': max(fighters, package),
+            'missile_km': missile,
+            'engage_km': limit if limit == limit else missile,
+            'detect_km': max(radars) if radars else 0,
+            **{name: float(record[name]) / 100 for name in 'ABCDE'},
+        })
+    return pd.DataFrame(rows)
+
+
+def _side(profile):
+    return {key: float(profile[key]) for key in
+            ('package', 'fleet', 'missile_km', 'engage_km', 'detect_km', 'A', 'B', 'C', 'D', 'E')}
+
+
+def _kill_probability(shooter, target, launch_km):
+    """Per-missile Pk at the given launch ranges (array)"""
+    reach = np.clip(launch_km / max(shooter['missile_km'], 1.0), 0.0, 1.0)
+    pk = BASE_PK * shooter['C'] * math.sqrt(shooter['D']) * (1 - 0.6 * reach ** 2)
+    return pk * (1 - 0.35 * (target['B'] + target['E']) / 2)
+
+
+def _volley(rng, shooters, shooter, targets, target, launch_km):
+    """Kills from one volley: each target faces shots/targets missiles on average"""
+    shots = shooters * SHOTS_PER_AIRCRAFT
+    per_target = np.divide(shots, targets, out=np.zeros_like(shots, dtype=float), where=targets > 0)
+    pk = _kill_probability(shooter, target, launch_km)
+    return rng.binomial(targets, 1 - (1 - pk) ** per_target)
+
+
+def simulate_pair(first, second, trials, seed):
+    """Run `trials` engagements; returns (first wins, draws, second wins)"""
+    rng = np.random.default_rng(seed)
+    a, b = _side(first), _side(second)
+
+    def launch_range(side):
+        detect = side['detect_km'] * side['A'] * rng.lognormal(0.0, DETECTION_SIGMA, trials)
+        return np.minimum(side['engage_km'], detect) * rng.uniform(0.5, 1.0, trials)
+
+    range_a, range_b = launch_range(a), launch_range(b)
+    alive_a = np.full(trials, int(a['package']), dtype=np.int64)
+    alive_b = np.full(trials, int(b['package']), dtype=np.int64)
+
+    # Opening volley: the longer launch range shoots first, then survivors reply
+    a_first = range_a >= range_b
+    kills = _volley(rng, np.where(a_first, alive_a, 0), a, alive_b, b, range_a)
+    alive_b -= kills
+    kills = _volley(rng, alive_b, b, alive_a, a, range_b)
+    alive_a -= kills
+    kills = _volley(rng, np.where(a_first, 0, alive_a), a, alive_b, b, range_a)
+    alive_b -= kills
+
+    reserve_a = np.full(trials, int(a['fleet'] - a['package']), dtype=np.int64)
+    reserve_b = np.full(trials, int(b['fleet'] - b['package']), dtype=np.int64)
+    for volley in range(1, VOLLEYS):
+        for side, alive, reserve in ((a, alive_a, reserve_a), (b, alive_b, reserve_b)):
+            replaced = np.minimum(rng.binomial(int(side['package']) - alive, REINFORCE_RATE), reserve)
+            alive += replaced
+            reserve -= replaced
+
+        closing = CLOSING_FACTOR ** volley
+        kills_b = _volley(rng, alive_a, a, alive_b, b, range_a * closing)
+        kills_a = _volley(rng, alive_b, b, alive_a, a, range_b * closing)
+        alive_a -= kills_a
+        alive_b -= kills_b
+
+    # Share of the package still flying; an empty package has none left
+    left_a = alive_a / a['package'] if a['package'] > 0 else np.zeros(trials)
+    left_b = alive_b / b['package'] if b['package'] > 0 else np.zeros(trials)
+    wins = int((left_a > left_b).sum())
+    losses = int((left_b > left_a).sum())
+    return wins, trials - wins - losses, losses
+
+
+def _run_pairs(task):
+    profiles, pairs, trials, seeds = task
+    return [simulate_pair(profiles[i], profiles[j], trials, seed)
+            for (i, j), seed in zip(pairs, seeds)]
+
+
+def wilson_interval(successes, trials, z=Z_95):
+    """Wilson score interval for a binomial proportion (arrays welcome)"""
+    p = successes / trials
+    denom = 1 + z ** 2 / trials
+    centre = (p + z ** 2 / (2 * trials)) / denom
+    half = z * np.sqrt(p * (1 - p) / trials + z ** 2 / (4 * trials ** 2)) / denom
+    return centre - half, centre + half
+
+
+def win_matrix(profiles, trials=DEFAULT_TRIALS, seed=None, jobs=None):
+    """Simulate every pair of countries.
+
+    Returns a dict of countries × countries DataFrames: 'win' (row beats
+    column, draws counted as half), 'draw', and 'ci_low'/'ci_high' (95%
+    Wilson interval on the outright win rate), plus 'trials' and
+    'seconds'.
+    """
+    countries = list(profiles['Country'])
+    records = profiles.to_dict('records')
+    n = len(records)
+    pairs = [(i, j) for i in range(n) for j in range(i + 1, n)]
+    seeds = np.random.SeedSequence(seed).spawn(len(pairs))
+
+    jobs = jobs or os.cpu_count() or 1
+    chunk = max(1, math.ceil(len(pairs) / (jobs * 4)))
+    tasks = [(records, pairs[k:k + chunk], trials, seeds[k:k + chunk])
+             for k in range(0, len(pairs), chunk)]
+
+    start = time.perf_counter()
+    if jobs <= 1:
+        results = [r for task in tasks for r in _run_pairs(task)]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = [r for batch in pool.map(_run_pairs, tasks) for r in batch]
+    seconds = time.perf_counter() - start
+
+    wins = np.zeros((n, n))
+    draws = np.zeros((n, n))
+    for (i, j), (won, drawn, lost) in zip(pairs, results):
+        wins[i, j], wins[j, i] = won, lost
+        draws[i, j] = draws[j, i] = drawn
+    np.fill_diagonal(draws, trials)
+
+    low, high = wilson_interval(wins, trials)
+
+    def frame(values):
+        return pd.DataFrame(values, index=countries, columns=countries)
+
+    return {
+        'win': frame((wins + draws / 2) / trials),
+        'draw': frame(draws / trials),
+        'ci_low': frame(low),
+        'ci_high': frame(high),
+        'trials': trials * len(pairs),
+        'seconds': seconds,
+    }
+
+
+def load_inputs(data_dir=DATA_DIR):
+    """calcs.csv and the merged fleet (Feather when present, else CSV)"""
+    data_dir = pathlib.Path(data_dir)
+    calcs = pd.read_csv(data_dir / 'calcs.csv')
+    if (data_dir / 'global_merged.feather').exists():
+        fleet = read_feather(data_dir / 'global_merged.feather')
+    else:
+        fleet = pd.read_csv(data_dir / 'global_merged.csv')
+    return calcs, fleet
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Monte Carlo BVR win-probability matrix')
+    parser.add_argument('--data-dir', default=str(DATA_DIR))
+    parser.add_argument('--trials', type=int, default=DEFAULT_TRIALS, help='Trials per pair')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--jobs', type=int, default=None, help='Worker processes (default: CPUs)')
+    parser.add_argument('--output', default=None,
+                        help='Write attacker/defender win probabilities and CIs as CSV')
+    args = parser.parse_args(argv)
+
+    calcs, fleet = load_inputs(args.data_dir)
+    profiles = build_profiles(calcs, fleet)
+    result = win_matrix(profiles, args.trials, args.seed, args.jobs)
+
+    with pd.option_context('display.width', 250, 'display.max_columns', None):
+        print((result['win'] * 100).round(1).to_string())
+    print(f"\n{result['trials']:,} trials in {result['seconds']:.2f}s "
+          f"({result['trials'] / result['seconds']:,.0f} trials/s)")
+
+    if args.output:
+        long = pd.concat({key: result[key].stack() for key in ('win', 'draw', 'ci_low', 'ci_high')},
+                         axis=1)
+        long.index.names = ['Country', 'Opponent']
+        long.reset_index()[lambda df: df['Country'] != df['Opponent']].to_csv(args.output, index=False)
+        print(f"Wrote {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
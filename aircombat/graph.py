@@ -0,0 +1,276 @@
+"""
+Aircraft / product / company / country cross-reference graph.
+
+build_crossref_graph.py resolves every link in the CSVs once (fleet rows,
+'Associated products' lists, product and company makers, calcs Sell/Buy
+lists) and writes a CSR adjacency artifact:
+
+    graph_nodes.feather  id, kind, name, key, code, offset, degree
+    graph_edges.feather  target, kind   (sorted by source node)
+
+A node's edges are graph_edges[offset:offset + degree], so neighbours are
+a slice rather than a scan of every table. Every edge is stored in both
+directions under its own kind ('makes' / 'made_by', ...).
+
+    from aircombat.graph import open_graph
+    graph = open_graph('data')
+    graph.operators_of_company('Raytheon')      # country nodes
+    graph.reachable(graph.node('AIM-120D-3'), hops=2, node_kind='country')
+"""
+
+import functools
+import pathlib
+import re
+
+import numpy as np
+
+from aircombat.store import DATA_DIR, read_feather
+
+# 'aircraft' nodes are global_merged rows, which include some missiles
+# and radars; 'product' nodes are products.csv rows and any other name
+# mentioned in an 'Associated products' list
+NODE_KINDS = ['country', 'aircraft', 'product', 'company']
+
+# Edge kind -> the kind stored for the reverse direction
+EDGE_KINDS = {
+    'operates': 'operated_by',
+    'operated_by': 'operates',
+    'made_by': 'makes',
+    'makes': 'made_by',
+    'associated': 'associated',
+    'exports_to': 'imports_from',
+    'imports_from': 'exports_to',
+    'based_in': 'home_of',
+    'home_of': 'based_in',
+}
+
+# Only a spaced-off qualifier: the '(V)' in 'AN/APG-77(V)1' is part of the name
+PARENTHETICAL = re.compile(r'\s+\(([^)]*)\)')
+NAME_NOISE = re.compile(r"[^\w/&.'+-]+")
+DIGIT = re.compile(r'\d')
+
+# Descriptor words that say what a thing is rather than which thing it is,
+# so 'PL-15' and 'PL-15 long-range BVR missile' resolve to one node
+GENERIC_WORDS = frozenset({
+    'aesa', 'active', 'bvr', 'engine', 'engines', 'hypersonic', 'implied',
+    'long-range', 'missile', 'missiles', 'radar', 'radars', 'suite', 'system',
+    'systems',
+})
+
+
+def normalize_name(text):
+    """Lookup key: case-folded, parentheticals dropped, punctuation collapsed"""
+    text = PARENTHETICAL.sub(' ', str(text or ''))
+    return ' '.join(NAME_NOISE.sub(' ', text.casefold()).split())
+
+
+def name_aliases(text):
+    """Keys a name is known by: the name itself and any parenthetical,
+    so 'RTX Corporation (Raytheon)' also answers to 'Raytheon'"""
+    keys = [normalize_name(text)]
+    keys += [normalize_name(inner) for inner in PARENTHETICAL.findall(str(text or ''))
+             if inner.strip().casefold() != 'implied']
+    return [key for key in keys if key]
+
+
+class NameResolver:
+    """Fuzzy name -> node resolution.
+
+    Tries, in order: an exact key, an exact key with generic descriptor
+    words removed, then a unique token-prefix match ('AIM-120D-3' ->
+    'AIM-120D-3 AMRAAM', 'Saab' -> 'Saab AB'). A name may only extend a
+    shorter node name when that name carries a designator ('AIM-120C-7
+    AMRAAM' -> 'AIM-120C-7', but not 'Meteor seeker' -> 'Meteor'). With
+    contains=True a name may also match as any run of a node's words
+    ('Korea' -> 'South Korea'). Anything ambiguous stays unresolved
+    rather than guessing.
+
+    Token tuples are indexed by their first word (both prefix rules need
+    it to match) and by every word (for word runs), so a lookup only
+    compares against names sharing a word with it.
+    """
+
+    def __init__(self, generic=GENERIC_WORDS, contains=False):
+        self.generic = generic
+        self.contains = contains
+        self.exact = {}
+        self.core = {}
+        self.by_first = {}
+        self.by_word = {}
+
+    def _core(self, key):
+        tokens = tuple(t for t in key.split() if t not in self.generic)
+        return tokens or tuple(key.split())
+
+    def add(self, name, node):
+        for key in name_aliases(name):
+            self.exact.setdefault(key, set()).add(node)
+            core = self._core(key)
+            self.core.setdefault(core, set()).add(node)
+            entry = (core, node)
+            self.by_first.setdefault(core[0], []).append(entry)
+            if self.contains:
+                for word in set(core):
+                    self.by_word.setdefault(word, []).append(entry)
+
+    def resolve(self, name, fuzzy=True):
+        keys = name_aliases(name)
+        if not keys:
+            return None
+        # An alias shared by several nodes ('UAC') is no answer on its own
+        if len(self.exact.get(keys[0], ())) == 1:
+            return next(iter(self.exact[keys[0]]))
+        if not fuzzy:
+            return None
+        core = self._core(keys[0])
+        if len(self.core.get(core, ())) == 1:
+            return next(iter(self.core[core]))
+        matches = {node for tokens, node in self.by_first.get(core[0], ())
+                   if tokens[:len(core)] == core
+                   or (core[:len(tokens)] == tokens and any(DIGIT.search(t) for t in tokens))}
+        if len(matches) == 1:
+            return matches.pop()
+        if self.contains:
+            # Every word of the run must occur; scan the rarest one's entries
+            candidates = min((self.by_word.get(word, ()) for word in set(core)), key=len)
+            matches = {node for tokens, node in candidates
+                       if any(tokens[i:i + len(core)] == core for i in range(len(tokens)))}
+            if len(matches) == 1:
+                return matches.pop()
+        return None
+
+
+def new_resolvers():
+    """One resolver per node kind; country names also match on a word run"""
+    return {kind: NameResolver(contains=kind == 'country') for kind in NODE_KINDS}
+
+
+class CrossRefGraph:
+    """The CSR graph artifact, with memoized name lookups and traversals.
+
+    indptr/targets/edge_kinds are the CSR arrays as loaded; traversal runs
+    over plain lists of them, which beats NumPy on graphs this small, and
+    each (start, hops, edge kinds, node kind) answer is computed once.
+    """
+
+    def __init__(self, data_dir=DATA_DIR):
+        data_dir = pathlib.Path(data_dir)
+        nodes = read_feather(data_dir / 'graph_nodes.feather')
+        edges = read_feather(data_dir / 'graph_edges.feather')
+
+        self.names = nodes.column('name').to_pylist()
+        self.codes = nodes.column('code').to_pylist()
+        kinds = nodes.column('kind').combine_chunks()
+        self.kind_names = kinds.dictionary.to_pylist()
+        self.kinds = kinds.indices.to_numpy()
+        offsets = nodes.column('offset').to_numpy()
+        self.indptr = np.append(offsets, len(edges)).astype(np.int64)
+        self.targets = edges.column('target').to_numpy()
+        edge_kinds = edges.column('kind').combine_chunks()
+        self.edge_kind_names = edge_kinds.dictionary.to_pylist()
+        self.edge_kinds = edge_kinds.indices.to_numpy()
+
+        self._kinds = self.kinds.tolist()
+        self._indptr = self.indptr.tolist()
+        self._targets = self.targets.tolist()
+        self._edge_kinds = self.edge_kinds.tolist()
+        self._node_cache = {}
+        self._reach_cache = {}
+
+        self.resolvers = new_resolvers()
+        self.by_code = {}
+        for node, (name, code) in enumerate(zip(self.names, self.codes)):
+            self.resolvers[self.kind_names[self._kinds[node]]].add(name, node)
+            if code:
+                self.by_code[code] = node
+
+    def __len__(self):
+        return len(self.names)
+
+    def kind(self, node):
+        return self.kind_names[self._kinds[node]]
+
+    def node(self, name, kind=None):
+        """Node id for a (fuzzy) name, or a country file code; None if unknown"""
+        cache_key = (name, kind)
+        if cache_key not in self._node_cache:
+            self._node_cache[cache_key] = self._resolve(name, kind)
+        return self._node_cache[cache_key]
+
+    def _resolve(self, name, kind):
+        if kind in (None, 'country') and normalize_name(name) in self.by_code:
+            return self.by_code[normalize_name(name)]
+        # Exact names across every kind win over fuzzy matches in any one
+        kinds = [kind] if kind else NODE_KINDS
+        for fuzzy in (False, True):
+            for candidate in kinds:
+                node = self.resolvers[candidate].resolve(name, fuzzy)
+                if node is not None:
+                    return node
+        return None
+
+    def _edge_filter(self, edge_kinds):
+        if edge_kinds is None:
+            return None
+        return {self.edge_kind_names.index(k) for k in edge_kinds if k in self.edge_kind_names}
+
+    def neighbors(self, node, edge_kinds=None):
+        """Ids adjacent to `node`, optionally only over the given edge kinds"""
+        start, end = self._indptr[node], self._indptr[node + 1]
+        wanted = self._edge_filter(edge_kinds)
+        if wanted is None:
+            return self._targets[start:end]
+        return [self._targets[i] for i in range(start, end) if self._edge_kinds[i] in wanted]
+
+    def reachable(self, start, hops=2, edge_kinds=None, node_kind=None):
+        """Node ids within `hops` edges of `start` (excluding it), sorted"""
+        cache_key = (start, hops, tuple(edge_kinds) if edge_kinds else None, node_kind)
+        if cache_key in self._reach_cache:
+            return self._reach_cache[cache_key]
+
+        wanted = self._edge_filter(edge_kinds)
+        seen = {start}
+        frontier = [start]
+        for _ in range(hops):
+            following = []
+            for node in frontier:
+                for i in range(self._indptr[node], self._indptr[node + 1]):
+                    target = self._targets[i]
+                    if target not in seen and (wanted is None or self._edge_kinds[i] in wanted):
+                        seen.add(target)
+                        following.append(target)
+            if not following:
+                break
+            frontier = following
+        seen.discard(start)
+        if node_kind is not None:
+            kind_index = self.kind_names.index(node_kind)
+            seen = {node for node in seen if self._kinds[node] == kind_index}
+        found = self._reach_cache[cache_key] = sorted(seen)
+        return found
+
+    def operators_of_company(self, company, hops=2):
+        """Countries operating anything `company` makes, within `hops` edges.
+
+        Two hops is company -> aircraft -> country; three also reaches
+        countries whose aircraft carry the company's products.
+        """
+        node = self.node(company, 'company')
+        if node is None:
+            return []
+        found = self.reachable(node, hops, ('makes', 'associated', 'operated_by'), 'country')
+        return [self.names[n] for n in found]
+
+    def describe(self, node):
+        return {'id': int(node), 'kind': self.kind(node), 'name': self.names[node],
+                'code': self.codes[node]}
+
+
+@functools.lru_cache(maxsize=None)
+def _cached_graph(data_dir):
+    return CrossRefGraph(data_dir)
+
+
+def open_graph(data_dir=DATA_DIR):
+    """Return a shared CrossRefGraph for `data_dir`, loaded on first use"""
+    return _cached_graph(str(pathlib.Path(data_dir).resolve()))
@@ -0,0 +1,312 @@
+"""
+Append-only history of the merged fleet and calcs tables.
+
+Every snapshot is stored as a delta against the one before it, in a
+date-partitioned Arrow dataset (Feather files, hive-style directories):
+
+    data/history/manifest.json                    snapshot dates and counts
+    data/history/global_merged.index.feather      key, date, hash, deleted
+    data/history/global_merged/date=2026-01-04/part-0.feather
+    data/history/calcs/...
+
+Rows are keyed by `country|Aircraft` (calcs: Country); a partition holds
+only the rows that were added or changed that day, and removals are only
+recorded in the index. The index (one small row per key version) says
+which partition holds the version of a key in force at any date, so a diff
+between two dates or the trend of one aircraft reads just the partitions
+holding the versions involved instead of every snapshot.
+
+    from aircombat.history import History
+    history = History('data/history')
+    history.changes('global_merged', '2026-01-04', '2026-03-01')
+    history.trend('F-35 Lightning II')
+
+    python -m aircombat.history changes 2026-01-04 2026-03-01
+    python -m aircombat.history trend "F-35 Lightning II" --country us
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pathlib
+import shutil
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+
+from aircombat.store import normalize_key, read_feather
+
+HISTORY_DIR = pathlib.Path("data") / "history"
+MANIFEST_NAME = "manifest.json"
+KEY_COLUMN = '_key'
+
+# Tracked tables and the columns that identify a row
+KEY_COLUMNS = {
+    'global_merged': ['country', 'Aircraft'],
+    'calcs': ['Country'],
+}
+INDEX_SCHEMA = pa.schema([
+    ('key', pa.string()), ('date', pa.string()), ('hash', pa.string()), ('deleted', pa.bool_()),
+])
+
+
+def plain_strings(table):
+    """Dictionary columns decoded, so partitions written on different days line up"""
+    arrays = [pc.cast(column, column.type.value_type) if pa.types.is_dictionary(column.type) else column
+              for column in table.columns]
+    return pa.Table.from_arrays(arrays, names=table.column_names)
+
+
+def row_keys(table, key_columns):
+    """`a|b` keys from the key columns; repeats of a key get `|2`, `|3`, ..."""
+    columns = [table.column(name).to_pylist() for name in key_columns]
+    keys, seen = [], {}
+    for values in zip(*columns):
+        key = '|'.join((str(value).strip() if value is not None else '') for value in values)
+        seen[key] = seen.get(key, 0) + 1
+        keys.append(key if seen[key] == 1 else f"{key}|{seen[key]}")
+    return keys
+
+
+def row_hashes(table):
+    """Content hash of every row; null cells are left out, so adding an empty column changes nothing"""
+    names = table.column_names
+    columns = [table.column(name).to_pylist() for name in names]
+    return [hashlib.sha1(json.dumps({name: value for name, value in zip(names, values) if value is not None},
+                                    sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+            for values in zip(*columns)]
+
+
+def write_atomic_feather(table, path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+    # Uncompressed like the rest of data/, so partitions memory-map in place
+    feather.write_feather(table, tmp, compression='uncompressed')
+    os.replace(tmp, path)
+
+
+class History:
+    """Reader and appender for one history directory"""
+
+    def __init__(self, path=HISTORY_DIR):
+        self.path = pathlib.Path(path)
+        try:
+            self.manifest = json.loads((self.path / MANIFEST_NAME).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            self.manifest = {'version': 1, 'snapshots': {}}
+        self._indexes = {}
+
+    def partition(self, name, date):
+        return self.path / name / f"date={date}" / 'part-0.feather'
+
+    def dates(self, name=None):
+        """Snapshot dates, oldest first (only those that include `name` if given)"""
+        return sorted(date for date, tables in self.manifest['snapshots'].items()
+                      if name is None or name in tables)
+
+    def index(self, name):
+        """The key/date/hash/deleted version index of a table"""
+        if name not in self._indexes:
+            path = self.path / f"{name}.index.feather"
+            self._indexes[name] = read_feather(path) if path.exists() else INDEX_SCHEMA.empty_table()
+        return self._indexes[name]
+
+    def versions(self, name, until=None, keys=None):
+        """{key: (date, hash, deleted)} of the latest version of each key on or before `until`"""
+        index = self.index(name)
+        if until is not None:
+            index = index.filter(pc.less_equal(index.column('date'), until))
+        if keys is not None:
+            index = index.filter(pc.is_in(index.column('key'), pa.array(sorted(keys), pa.string())))
+        latest = {}
+        # Versions are appended in date order, so later rows win
+        for key, date, row_hash, deleted in zip(*(index.column(c).to_pylist() for c in INDEX_SCHEMA.names)):
+            latest[key] = (date, row_hash, deleted)
+        return latest
+
+    def rows(self, name, wanted):
+        """{(key, date): row dict} for the given key versions, one partition read per date"""
+        by_date = {}
+        for key, date in wanted:
+            by_date.setdefault(date, set()).add(key)
+        found = {}
+        for date, keys in sorted(by_date.items()):
+            table = read_feather(self.partition(name, date))
+            table = table.filter(pc.is_in(table.column(KEY_COLUMN), pa.array(sorted(keys), pa.string())))
+            for row in table.to_pylist():
+                key = row.pop(KEY_COLUMN)
+                found[(key, date)] = row
+        return found
+
+    def state(self, name, date):
+        """The whole table as of `date`, as {key: row dict}"""
+        live = {key: version for key, version in self.versions(name, date).items() if not version[2]}
+        rows = self.rows(name, [(key, version[0]) for key, version in live.items()])
+        return {key: rows[(key, version[0])] for key, version in live.items()}
+
+    def append(self, name, table, date):
+        """Record `table` as the snapshot of `name` on `date` (YYYY-MM-DD); returns counts.
+
+        Only added and changed rows are written. Snapshotting the latest
+        date again replaces it; earlier dates are read-only.
+        """
+        if name not in KEY_COLUMNS:
+            raise ValueError(f"unknown table {name!r}; expected one of {', '.join(KEY_COLUMNS)}")
+        dates = self.dates(name)
+        if dates and date < dates[-1]:
+            raise ValueError(f"{name} already has a snapshot for {dates[-1]}; history is append-only")
+
+        index = self.index(name)
+        if dates and date == dates[-1]:
+            index = index.filter(pc.not_equal(index.column('date'), date))
+            self._indexes[name] = index
+            shutil.rmtree(self.partition(name, date).parent, ignore_errors=True)
+        previous = {key: row_hash for key, (_, row_hash, deleted) in self.versions(name).items()
+                    if not deleted}
+
+        table = plain_strings(table)
+        keys = row_keys(table, KEY_COLUMNS[name])
+        hashes = row_hashes(table)
+        changed = [i for i, (key, row_hash) in enumerate(zip(keys, hashes)) if previous.get(key) != row_hash]
+        removed = sorted(set(previous) - set(keys))
+
+        if changed:
+            delta = table.take(pa.array(changed, pa.int64()))
+            delta = delta.append_column(KEY_COLUMN, pa.array([keys[i] for i in changed], pa.string()))
+            write_atomic_feather(delta, self.partition(name, date))
+        additions = pa.table({
+            'key': [keys[i] for i in changed] + removed,
+            'date': [date] * (len(changed) + len(removed)),
+            'hash': [hashes[i] for i in changed] + [None] * len(removed),
+            'deleted': [False] * len(changed) + [True] * len(removed),
+        }, schema=INDEX_SCHEMA)
+        index = pa.concat_tables([index.cast(INDEX_SCHEMA), additions])
+        # The index is written after the partition, so it never points at a missing file
+        write_atomic_feather(index, self.path / f"{name}.index.feather")
+        self._indexes[name] = index
+
+        counts = {
+            'rows': table.num_rows,
+            'added': sum(1 for i in changed if keys[i] not in previous),
+            'changed': sum(1 for i in changed if keys[i] in previous),
+            'removed': len(removed),
+        }
+        counts['unchanged'] = table.num_rows - counts['added'] - counts['changed']
+        self.manifest['snapshots'].setdefault(date, {})[name] = counts
+        self.manifest['snapshots'] = dict(sorted(self.manifest['snapshots'].items()))
+        tmp = self.path / (MANIFEST_NAME + '.tmp')
+        tmp.write_text(json.dumps(self.manifest, indent=2) + '\n', encoding='utf-8')
+        os.replace(tmp, self.path / MANIFEST_NAME)
+        return counts
+
+    def changes(self, name, since, until):
+        """Rows that differ between the snapshots in force on `since` and on `until`.
+
+        Returns a list of {key, change ('added'/'removed'/'changed'),
+        columns, before, after} dicts, sorted by key.
+        """
+        before = self.versions(name, since)
+        after = self.versions(name, until)
+        diff = []
+        for key in set(before) | set(after):
+            old, new = before.get(key), after.get(key)
+            old_live = old if old and not old[2] else None
+            new_live = new if new and not new[2] else None
+            if (old_live and old_live[1]) != (new_live and new_live[1]):
+                diff.append((key, old_live, new_live))
+
+        wanted = [(key, version[0]) for key, old, new in diff for version in (old, new) if version]
+        rows = self.rows(name, wanted)
+        result = []
+        for key, old, new in sorted(diff):
+            old_row = rows[(key, old[0])] if old else None
+            new_row = rows[(key, new[0])] if new else None
+            if old_row and new_row:
+                columns = [column for column in dict.fromkeys([*old_row, *new_row])
+                           if old_row.get(column) != new_row.get(column)]
+                change = 'changed'
+            else:
+                columns = []
+                change = 'added' if new_row else 'removed'
+            result.append({'key': key, 'change': change, 'columns': columns,
+                           'before': old_row, 'after': new_row})
+        return result
+
+    def trend(self, aircraft, country=None, column='In Service'):
+        """[(date, {country: value})] for one aircraft over every snapshot date"""
+        wanted = normalize_key(aircraft)
+        index = self.index('global_merged')
+        keys = set()
+        for key in set(index.column('key').to_pylist()):
+            parts = key.split('|')
+            if normalize_key(parts[1]) == wanted and (country is None or parts[0] == country):
+                keys.add(key)
+        if not keys:
+            return []
+
+        index = index.filter(pc.is_in(index.column('key'), pa.array(sorted(keys), pa.string())))
+        versions = list(zip(*(index.column(c).to_pylist() for c in ('key', 'date', 'deleted'))))
+        rows = self.rows('global_merged', [(key, date) for key, date, deleted in versions if not deleted])
+
+        # Versions are in date order; each snapshot date sees those on or before it
+        trend, current, next_version = [], {}, 0
+        for date in self.dates('global_merged'):
+            while next_version < len(versions) and versions[next_version][1] <= date:
+                key, version_date, deleted = versions[next_version]
+                next_version += 1
+                label = key.split('|')[0]
+                if deleted:
+                    current.pop(label, None)
+                else:
+                    current[label] = rows[(key, version_date)].get(column)
+            trend.append((date, dict(current)))
+        return trend
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Query the snapshot history of the fleet and calcs tables')
+    parser.add_argument('--history', default=str(HISTORY_DIR))
+    commands = parser.add_subparsers(dest='command', required=True)
+    diff = commands.add_parser('changes', help='What changed between two dates')
+    diff.add_argument('since')
+    diff.add_argument('until')
+    diff.add_argument('--table', default='global_merged', choices=sorted(KEY_COLUMNS))
+    trend = commands.add_parser('trend', help='A column of one aircraft over every snapshot')
+    trend.add_argument('aircraft')
+    trend.add_argument('--country', default=None, help='Country file code, e.g. us')
+    trend.add_argument('--column', default='In Service')
+    commands.add_parser('dates', help='List snapshot dates')
+    args = parser.parse_args(argv)
+
+    history = History(args.history)
+    if args.command == 'dates':
+        for date, tables in history.manifest['snapshots'].items():
+            print(date, '  '.join(f"{name}: {counts['rows']} rows, +{counts['added']} "
+                                  f"~{counts['changed']} -{counts['removed']}"
+                                  for name, counts in tables.items()))
+    elif args.command == 'changes':
+        changes = history.changes(args.table, args.since, args.until)
+        for change in changes:
+            if change['change'] == 'changed':
+                detail = '; '.join(f"{column}: {change['before'].get(column)!r} -> {change['after'].get(column)!r}"
+                                   for column in change['columns'])
+            else:
+                detail = ''
+            print(f"{change['change']:<8} {change['key']}  {detail}")
+        print(f"\n{len(changes)} row(s) differ between {args.since} and {args.until}")
+    else:
+        trend = history.trend(args.aircraft, args.country, args.column)
+        if not trend:
+            print(f"No history for {args.aircraft!r}")
+            return 1
+        countries = sorted({country for _, values in trend for country in values})
+        print(f"{'date':<12}" + ''.join(f"{country:>8}" for country in countries))
+        for date, values in trend:
+            print(f"{date:<12}" + ''.join(f"{str(values.get(country, '-')):>8}" for country in countries))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
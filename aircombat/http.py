@@ -0,0 +1,149 @@
+"""
+Shared HTTP plumbing for the scripts that talk to external sites.
+
+One keep-alive `requests.Session` per client, a global token-bucket rate
+limit, and per-host concurrency caps and rate limits, so worker threads
+can share a client without hammering any single host.
+
+Connection errors, timeouts and 429/5xx answers are retried a bounded
+number of times with exponential backoff (honouring Retry-After), so one
+flaky response does not cost a row or a page.
+
+Every request is counted in aircombat.instrument: requests, retries,
+bytes and status classes per run, plus latency and rate-limit wait
+histograms per host.
+"""
+
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from aircombat import instrument
+
+# Answers worth asking again: rate limiting and transient server trouble
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Backoff is capped so a long Retry-After can't stall a whole run
+MAX_BACKOFF = 30.0
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, self.rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available (no-op when rate <= 0)"""
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HttpClient:
+    """Shared keep-alive session with a global rate limit and per-host limits.
+
+    rate      -- requests per second across all hosts (0 = unlimited)
+    per_host  -- concurrent requests allowed to any one host
+    host_rate -- requests per second to any one host (0 = unlimited)
+    retries   -- extra attempts after a connection error, timeout or 429/5xx
+    backoff   -- first retry delay in seconds, doubled on each retry
+    """
+
+    def __init__(self, rate=0, per_host=4, pool_size=10, host_rate=0, headers=None,
+                 retries=2, backoff=0.5):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if headers:
+            self.session.headers.update(headers)
+        self.bucket = TokenBucket(rate)
+        self.per_host = max(1, per_host)
+        self.host_rate = host_rate
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self._host_slots = {}
+        self._host_buckets = {}
+        self._lock = threading.Lock()
+
+    def _host_limits(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+                self._host_buckets[host] = TokenBucket(self.host_rate)
+            return slot, self._host_buckets[host]
+
+    def _delay(self, attempt, response=None):
+        """Seconds to wait before retry number `attempt` (1-based)"""
+        delay = self.backoff * 2 ** (attempt - 1)
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass  # an HTTP date; the exponential delay is close enough
+        return min(delay, MAX_BACKOFF)
+
+    def _attempt(self, method, url, host, slot, host_bucket, kwargs):
+        queued = time.perf_counter()
+        self.bucket.acquire()
+        host_bucket.acquire()
+        with slot:
+            start = time.perf_counter()
+            instrument.observe(f"http.wait {host}", start - queued)
+            try:
+                return self.session.request(method, url, **kwargs)
+            except Exception:
+                instrument.count('http.errors')
+                raise
+            finally:
+                instrument.count('http.requests')
+                instrument.observe(f"http.latency {host}", time.perf_counter() - start)
+
+    def request(self, method, url, **kwargs):
+        slot, host_bucket = self._host_limits(url)
+        host = urlparse(url).netloc
+        attempt = 0
+        while True:
+            try:
+                response = self._attempt(method, url, host, slot, host_bucket, kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.retries:
+                    raise
+                response = None
+            else:
+                instrument.count(f"http.status.{response.status_code // 100}xx")
+                if response.status_code not in RETRY_STATUSES or attempt >= self.retries:
+                    break
+                response.close()
+            attempt += 1
+            instrument.count('http.retries')
+            # Sleep outside the host slot so other requests to the host proceed
+            time.sleep(self._delay(attempt, response))
+        if not kwargs.get('stream'):
+            instrument.count('http.bytes', len(response.content))
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.request('HEAD', url, **kwargs)
@@ -0,0 +1,263 @@
+"""
+Run instrumentation shared by the data scripts.
+
+One recorder per process collects:
+
+    spans       named, timed, nested sections (a stage, one file, one source)
+                with attributes such as rows and bytes
+    counters    HTTP requests/bytes/statuses, cache hits and misses, ...
+    histograms  latencies of external calls (seconds), summarised as
+                percentiles and fixed buckets
+
+and writes them as one JSON run report. Each script's main() hands its
+body to run_main(), which adds --report/--profile handling; with
+--profile the run is also captured with cProfile (main thread) and
+tracemalloc (all threads), and the hottest functions and allocation sites
+go into the report next to a .prof file for snakeviz/pstats.
+
+When a script runs inside another instrumented run (the pipeline calling
+convert_to_feather.main), it becomes a span of the outer run instead of
+writing a report of its own.
+
+    from aircombat import instrument
+    with instrument.span('file', file='us.csv') as attrs:
+        attrs['rows'] = 12
+    instrument.count('http.requests')
+    instrument.observe('http.latency commons.wikimedia.org', 0.12)
+"""
+
+import contextlib
+import cProfile
+import io
+import json
+import os
+import pathlib
+import platform
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+REPORT_DIR = '.reports'
+# Upper bounds (seconds) of the histogram buckets; the last bucket is open
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PROFILE_TOP = 30
+
+
+class Recorder:
+    """Spans, counters and histograms of one run; safe to share between threads"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextlib.contextmanager
+    def span(self, name, **attrs):
+        stack = self._stack()
+        record = {'name': name, 'parent': stack[-1]['id'] if stack else None,
+                  'thread': threading.current_thread().name, 'attrs': attrs}
+        with self._lock:
+            record['id'] = len(self.spans)
+            self.spans.append(record)
+        stack.append(record)
+        start = time.perf_counter()
+        try:
+            yield attrs
+        except BaseException as e:
+            attrs['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            stack.pop()
+            record['start'] = round(start - self.started, 6)
+            record['seconds'] = round(time.perf_counter() - start, 6)
+
+    def add_span(self, name, seconds, **attrs):
+        """Record a span timed elsewhere (e.g. in a worker process)"""
+        stack = self._stack()
+        with self._lock:
+            self.spans.append({'name': name, 'id': len(self.spans),
+                               'parent': stack[-1]['id'] if stack else None,
+                               'thread': threading.current_thread().name,
+                               'start': None, 'seconds': round(seconds, 6), 'attrs': attrs})
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        with self._lock:
+            self.histograms.setdefault(name, []).append(seconds)
+
+    def summary(self):
+        """Totals per span name and histogram summaries, for the report"""
+        stages = {}
+        for record in self.spans:
+            entry = stages.setdefault(record['name'], {'count': 0, 'seconds': 0.0})
+            entry['count'] += 1
+            entry['seconds'] = round(entry['seconds'] + (record.get('seconds') or 0.0), 6)
+        histograms = {name: summarize(values) for name, values in sorted(self.histograms.items())}
+        return stages, histograms
+
+
+def summarize(values):
+    """count/sum/min/percentiles/max and bucket counts of a list of seconds"""
+    values = sorted(values)
+    n = len(values)
+
+    def percentile(p):
+        return round(values[min(n - 1, int(p * n))], 6)
+
+    buckets = {f"le_{bound:g}": 0 for bound in BUCKETS}
+    buckets['inf'] = 0
+    for value in values:
+        for bound in BUCKETS:
+            if value <= bound:
+                buckets[f"le_{bound:g}"] += 1
+                break
+        else:
+            buckets['inf'] += 1
+    return {'count': n, 'sum': round(sum(values), 6), 'min': round(values[0], 6),
+            'p50': percentile(0.5), 'p90': percentile(0.9), 'p99': percentile(0.99),
+            'max': round(values[-1], 6), 'buckets': buckets}
+
+
+_recorder = Recorder()
+_active = False
+
+
+def get_recorder():
+    return _recorder
+
+
+def span(name, **attrs):
+    return _recorder.span(name, **attrs)
+
+
+def add_span(name, seconds, **attrs):
+    _recorder.add_span(name, seconds, **attrs)
+
+
+def count(name, value=1):
+    _recorder.count(name, value)
+
+
+def observe(name, seconds):
+    _recorder.observe(name, seconds)
+
+
+def add_arguments(parser):
+    """--report and --profile, for scripts that call run_main"""
+    parser.add_argument('--report', default=None,
+                        help=f'JSON run report path (default: <data-dir>/{REPORT_DIR}/<script>.json)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Capture cProfile and tracemalloc output in the run report')
+
+
+def profile_summary(profiler, snapshot, prof_path):
+    """The hottest functions and allocation sites, for the report"""
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.dump_stats(str(prof_path))
+    functions = []
+    for (filename, line, function), (_, calls, own, cumulative, _) in stats.stats.items():
+        functions.append({'function': f"{pathlib.Path(filename).name}:{line}({function})",
+                          'calls': calls, 'own_seconds': round(own, 6),
+                          'cumulative_seconds': round(cumulative, 6)})
+    functions.sort(key=lambda entry: entry['cumulative_seconds'], reverse=True)
+    allocations = [{'site': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                    'bytes': stat.size, 'blocks': stat.count}
+                   for stat in snapshot.statistics('lineno')[:PROFILE_TOP]]
+    return {'prof_file': str(prof_path), 'functions': functions[:PROFILE_TOP],
+            'allocations': allocations}
+
+
+def peak_rss_bytes():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def write_report(path, report):
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_text(json.dumps(report, indent=1, default=str) + '\n', encoding='utf-8')
+    os.replace(tmp, path)
+
+
+def run_main(script, args, body, *body_args):
+    """Run a script's main body under a fresh recorder and write the run report.
+
+    `args` is the parsed namespace (for --report, --profile and
+    --data-dir); the body's return value becomes the exit status.
+    """
+    global _recorder, _active
+    if _active:
+        with span(script):
+            return body(*body_args)
+
+    _recorder = Recorder()
+    _active = True
+    started = datetime.now(timezone.utc)
+    profiler = None
+    if getattr(args, 'profile', False):
+        tracemalloc.start(10)
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    status = None
+    try:
+        with span(script):
+            status = body(*body_args)
+        return status
+    except BaseException as e:
+        status = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        _active = False
+        report_path = pathlib.Path(getattr(args, 'report', None) or
+                                   pathlib.Path(getattr(args, 'data_dir', 'data')) / REPORT_DIR / f"{script}.json")
+        stages, histograms = _recorder.summary()
+        report = {
+            'script': script,
+            'status': status,
+            'started': started.isoformat(timespec='seconds'),
+            'seconds': round(time.perf_counter() - _recorder.started, 6),
+            'argv': sys.argv[1:],
+            'commit': os.environ.get('GITHUB_SHA'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'peak_rss_bytes': peak_rss_bytes(),
+            'stages': stages,
+            'counters': dict(sorted(_recorder.counters.items())),
+            'histograms': histograms,
+            'spans': _recorder.spans,
+        }
+        if profiler is not None:
+            report_path.parent.mkdir(parents=True, exist_ok=True)
+            snapshot = tracemalloc.take_snapshot()
+            report['tracemalloc_peak_bytes'] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            report['profile'] = profile_summary(profiler, snapshot, report_path.with_suffix('.prof'))
+        try:
+            write_report(report_path, report)
+            print(f"Run report: {report_path}")
+        except OSError as e:
+            print(f"Could not write run report {report_path}: {e}")
@@ -0,0 +1,64 @@
+"""
+Grammar for the free-text columns in calcs.csv and the fleet CSVs.
+
+    loadout  := item (' + ' item)*           calcs `60`
+    ranged   := item ((' / ' | ' + ') item)* calcs `BVR`, `AEW`
+    item     := name ' (' number ')'         number may be '3,000' or '1 100'
+    list     := entry (',' entry)*           `Associated products`, `Airport`
+
+The separators need surrounding whitespace, so names such as
+'F-16A/B MLU' or 'AN/APG-81' stay whole. Patterns are compiled once here
+and shared by the build step and the analysis modules.
+"""
+
+import re
+
+ITEM_SEPARATOR = re.compile(r'\s+[+/]\s+')
+ITEM = re.compile(r'(?P<name>.+?)\s*\((?P<number>\d{1,3}(?:[ ,]\d{3})+|\d+)\)')
+LIST_SEPARATOR = re.compile(r'\s*,\s*')
+
+# Airport cells that say "no base" rather than naming one
+PLACEHOLDER_AIRPORT = re.compile(r'^(?:N/A\b|Not yet\b|Multiple\s*\()', re.IGNORECASE)
+MULTIPLE_PREFIX = re.compile(r'^Multiple:\s*', re.IGNORECASE)
+
+
+class GrammarError(ValueError):
+    """A cell segment that does not match the column's grammar"""
+
+
+def parse_items(text, strict=True):
+    """'F-22A (20) + F-35A Blk-4 (25)' -> [('F-22A', 20), ('F-35A Blk-4', 25)].
+
+    Raises GrammarError on a segment that is not 'name (number)', unless
+    strict is False, in which case the segment is skipped.
+    """
+    items = []
+    # pandas hands over NaN for empty cells
+    text = text.strip() if isinstance(text, str) else ''
+    if not text:
+        return items
+    for segment in ITEM_SEPARATOR.split(text):
+        match = ITEM.fullmatch(segment.strip())
+        if not match:
+            if strict:
+                raise GrammarError(f"expected 'name (number)', got {segment!r}")
+            continue
+        number = int(re.sub(r'\D', '', match.group('number')))
+        items.append((match.group('name').strip(), number))
+    return items
+
+
+def parse_list(text):
+    """Comma-joined cell -> list of trimmed, non-empty entries"""
+    text = text.strip() if isinstance(text, str) else ''
+    return [part for part in LIST_SEPARATOR.split(text) if part]
+
+
+def parse_airports(text):
+    """Airport cell -> named bases, without placeholders like 'N/A (radar system)'"""
+    airports = []
+    for part in parse_list(text):
+        part = MULTIPLE_PREFIX.sub('', part)
+        if part and not PLACEHOLDER_AIRPORT.match(part):
+            airports.append(part)
+    return airports
@@ -0,0 +1,332 @@
+"""
+One incremental data refresh: scrape -> images -> merge -> convert -> derived -> publish.
+
+Each stage lists the files it reads and writes. A content-hash manifest
+(data/.pipeline_manifest.json) records both for the last successful run,
+so a stage re-runs only when an input changed, an output went missing or
+an output was edited since. Upstream outputs are downstream inputs, so a
+change propagates exactly as far as it matters. The scrape and image
+stages talk to the network and run every time (their own page and lookup
+caches keep that cheap); --offline leaves them out.
+
+The merged fleet is handed to the derived builders as a memory-mapped
+view of the global_merged.feather merge_countries.py wrote (the merge
+itself streams, so its memory stays bounded), and calcs/products/company
+are read once and shared, instead of every builder reading data/ again.
+
+    python -m aircombat.pipeline                # everything that is stale
+    python -m aircombat.pipeline --offline --plan
+    python -m aircombat.pipeline --only graph,search --force
+"""
+
+import argparse
+import graphlib
+import json
+import pathlib
+import sys
+import time
+
+from aircombat import instrument
+from aircombat.datafiles import SKIP_CSVS, country_csvs, file_sha256, load_inputs, save_manifest
+from aircombat.store import read_feather
+
+DATA_DIR = pathlib.Path("data")
+MANIFEST_NAME = ".pipeline_manifest.json"
+
+DERIVED_INPUTS = ['global_merged.feather', 'calcs.csv', 'products.csv', 'company.csv']
+
+
+def source_csvs(data_dir):
+    """CSVs maintained by hand or by the scraper, i.e. not written by the pipeline"""
+    return sorted(path for path in data_dir.glob('*.csv') if path.name != 'global_merged.csv')
+
+
+def feather_twins(data_dir):
+    return [path.with_suffix('.feather') for path in data_dir.glob('*.csv')
+            if path.name not in SKIP_CSVS]
+
+
+def run_scrape(ctx):
+    import scrape_aircraft
+    return scrape_aircraft.main(['--data-dir', str(ctx.data_dir), '--jobs', str(ctx.jobs)])
+
+
+def run_images(ctx):
+    import update_aircraft_images
+    return update_aircraft_images.main(['--data-dir', str(ctx.data_dir), '--thumbs'])
+
+
+def run_merge(ctx):
+    from merge_countries import merge_csvs
+    if merge_csvs(str(ctx.data_dir)) is None:
+        return 1
+    # Memory-mapped, so the later stages share the file without a copy
+    ctx.tables['global_merged'] = read_feather(ctx.data_dir / 'global_merged.feather')
+    return 0
+
+
+def run_convert(ctx):
+    import convert_to_feather
+    return convert_to_feather.main(['--data-dir', str(ctx.data_dir), '--jobs', str(ctx.jobs)])
+
+
+def run_summary(ctx):
+    from build_country_summary import build_summary, write_summary
+    write_summary(build_summary(ctx.data_dir, ctx.inputs(['global_merged', 'calcs'])), ctx.data_dir)
+    return 0
+
+
+def run_normalized(ctx):
+    from build_normalized_tables import build_tables, write_tables
+    tables, issues = build_tables(ctx.data_dir, ctx.inputs(['global_merged', 'calcs']))
+    for issue in issues:
+        print(f"⚠️  {issue}")
+    write_tables(tables, ctx.data_dir)
+    return 0
+
+
+def run_graph(ctx):
+    from build_crossref_graph import build_graph, write_graph
+    write_graph(build_graph(ctx.data_dir, ctx.inputs(['global_merged', 'calcs', 'products', 'company'])),
+                ctx.data_dir)
+    return 0
+
+
+def run_search(ctx):
+    from build_search_index import load_documents, write_search_index
+    inputs = ctx.inputs(['global_merged', 'calcs', 'products', 'company'])
+    write_search_index(load_documents(ctx.data_dir, inputs), ctx.data_dir)
+    return 0
+
+
+def run_snapshot(ctx):
+    from snapshot_history import snapshot
+    for name, counts in snapshot(ctx.data_dir, inputs=ctx.inputs(['global_merged', 'calcs'])).items():
+        print(f"{name}: {counts['added']} added, {counts['changed']} changed, {counts['removed']} removed")
+    return 0
+
+
+def run_publish(ctx):
+    from publish_data import publish
+    publish(ctx.data_dir, ctx.inputs(['global_merged']))
+    return 0
+
+
+# inputs/outputs: file names or globs under the data directory, or a
+# callable(data_dir) returning paths. Network stages ignore the manifest.
+STAGES = {
+    'scrape': {'after': [], 'run': run_scrape, 'network': True,
+               'inputs': [], 'outputs': ['*_aircraft.csv']},
+    'images': {'after': ['scrape'], 'run': run_images, 'network': True,
+               'inputs': [source_csvs], 'outputs': [source_csvs]},
+    'merge': {'after': ['images'], 'run': run_merge,
+              'inputs': [country_csvs], 'outputs': ['global_merged.csv', 'global_merged.feather']},
+    'convert': {'after': ['merge'], 'run': run_convert,
+                'inputs': [source_csvs], 'outputs': [feather_twins]},
+    'summary': {'after': ['merge'], 'run': run_summary,
+                'inputs': ['global_merged.feather', 'calcs.csv'], 'outputs': ['country_summary.feather']},
+    'normalized': {'after': ['merge'], 'run': run_normalized,
+                   'inputs': ['global_merged.feather', 'calcs.csv'],
+                   'outputs': ['loadouts.feather', 'missiles.feather', 'aew.feather',
+                               'aircraft_products.feather', 'aircraft_airports.feather']},
+    'graph': {'after': ['merge'], 'run': run_graph,
+              'inputs': DERIVED_INPUTS, 'outputs': ['graph_nodes.feather', 'graph_edges.feather']},
+    'search': {'after': ['merge'], 'run': run_search,
+               'inputs': DERIVED_INPUTS, 'outputs': ['search_index.bin']},
+    'snapshot': {'after': ['merge'], 'run': run_snapshot,
+                 'inputs': ['global_merged.feather', 'calcs.csv'], 'outputs': ['history/**/*']},
+    'publish': {'after': ['merge', 'convert'], 'run': run_publish,
+                'inputs': ['global_merged.feather', 'calcs.feather', 'products.feather', 'company.feather'],
+                'outputs': ['published/*']},
+}
+
+
+class Context:
+    """State shared by the stages of one run"""
+
+    def __init__(self, data_dir, jobs=1):
+        self.data_dir = pathlib.Path(data_dir)
+        self.jobs = jobs
+        # Arrow tables by data file stem, handed from stage to stage
+        self.tables = {}
+
+    def inputs(self, names):
+        """Tables for the given stems, loading (once) whatever no stage produced"""
+        self.tables.update(load_inputs(self.data_dir, names, self.tables))
+        return {name: self.tables[name] for name in names}
+
+
+class Hasher:
+    """SHA-256 of data files, memoized on (size, mtime) within a run"""
+
+    def __init__(self):
+        self.memo = {}
+
+    def __call__(self, path):
+        stat = path.stat()
+        key = (str(path), stat.st_size, stat.st_mtime_ns)
+        if key not in self.memo:
+            self.memo[key] = file_sha256(path)
+        return self.memo[key]
+
+    def files(self, data_dir, specs):
+        """{relative name: hash} for every existing file the specs match"""
+        paths = set()
+        for spec in specs:
+            if callable(spec):
+                paths.update(spec(data_dir))
+            elif any(ch in spec for ch in '*?['):
+                paths.update(data_dir.glob(spec))
+            else:
+                paths.add(data_dir / spec)
+        return {path.relative_to(data_dir).as_posix(): self(path)
+                for path in sorted(paths) if path.is_file()}
+
+
+def load_manifest(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if isinstance(manifest.get('stages'), dict):
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {'version': 1, 'stages': {}}
+
+
+def stale_reason(entry, inputs, hasher, data_dir, stage):
+    """Why a stage must run, or None when its last run is still current"""
+    if not entry:
+        return 'never run'
+    previous = entry.get('inputs', {})
+    changed = sorted(k for k in set(inputs) | set(previous) if inputs.get(k) != previous.get(k))
+    if changed:
+        return f"inputs changed ({', '.join(changed[:3])}{', ...' if len(changed) > 3 else ''})"
+    recorded = entry.get('outputs', {})
+    if not recorded or hasher.files(data_dir, stage['outputs']) != recorded:
+        return 'outputs missing or modified'
+    return None
+
+
+def select_stages(only=None, skip=None, offline=False):
+    """Stage names to consider, in dependency order"""
+    names = [name for name in graphlib.TopologicalSorter(
+        {name: stage['after'] for name, stage in STAGES.items()}).static_order()]
+    unknown = set(only or []) | set(skip or [])
+    unknown -= set(names)
+    if unknown:
+        raise ValueError(f"unknown stage(s): {', '.join(sorted(unknown))}; "
+                         f"expected {', '.join(names)}")
+    if only:
+        names = [name for name in names if name in only]
+    if skip:
+        names = [name for name in names if name not in skip]
+    if offline:
+        names = [name for name in names if not STAGES[name].get('network')]
+    return names
+
+
+def run_pipeline(data_dir=DATA_DIR, only=None, skip=None, offline=False, force=False,
+                 plan=False, jobs=1):
+    """Run the stale stages; returns [(stage, status, seconds, detail)]"""
+    data_dir = pathlib.Path(data_dir)
+    manifest_path = data_dir / MANIFEST_NAME
+    manifest = load_manifest(manifest_path)
+    ctx = Context(data_dir, jobs)
+    hasher = Hasher()
+
+    report = []
+    failed = set()
+    for name in select_stages(only, skip, offline):
+        stage = STAGES[name]
+        blocked = [dep for dep in stage['after'] if dep in failed]
+        if blocked:
+            failed.add(name)
+            report.append((name, 'blocked', 0.0, f"{', '.join(blocked)} failed"))
+            continue
+
+        inputs = hasher.files(data_dir, stage['inputs'])
+        if stage.get('network'):
+            reason = 'network stage'
+        elif force:
+            reason = 'forced'
+        else:
+            reason = stale_reason(manifest['stages'].get(name), inputs, hasher, data_dir, stage)
+        if reason is None:
+            report.append((name, 'unchanged', 0.0, ''))
+            continue
+        if plan:
+            report.append((name, 'would run', 0.0, reason))
+            continue
+
+        print(f"\n=== {name}: {reason}")
+        start = time.perf_counter()
+        with instrument.span(f"stage {name}", reason=reason) as attrs:
+            try:
+                status = stage['run'](ctx) or 0
+            except Exception as e:
+                print(f"{name} failed: {type(e).__name__}: {e}")
+                status = 1
+            attrs['status'] = status
+        seconds = time.perf_counter() - start
+        if stage.get('network'):
+            # CSVs may have been rewritten; drop anything read before
+            ctx.tables.clear()
+
+        if status:
+            failed.add(name)
+            report.append((name, 'failed', seconds, reason))
+            continue
+        manifest['stages'][name] = {
+            'inputs': inputs,
+            'outputs': hasher.files(data_dir, stage['outputs']),
+            'seconds': round(seconds, 3),
+        }
+        report.append((name, 'ran', seconds, reason))
+
+    if not plan:
+        save_manifest(manifest_path, manifest)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Incremental scrape/merge/convert/derive pipeline')
+    parser.add_argument('--data-dir', default=str(DATA_DIR))
+    parser.add_argument('--only', default='', help='Comma-separated stages to consider')
+    parser.add_argument('--skip', default='', help='Comma-separated stages to leave out')
+    parser.add_argument('--offline', action='store_true',
+                        help='Leave out the network stages (scrape, images)')
+    parser.add_argument('--force', action='store_true', help='Run selected stages even if current')
+    parser.add_argument('--plan', action='store_true', help='Only show which stages would run')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Workers for the scrape and convert stages')
+    instrument.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    data_dir = pathlib.Path(args.data_dir)
+    if not data_dir.exists():
+        print(f"{data_dir} directory not found!")
+        return 1
+    try:
+        select_stages([s for s in args.only.split(',') if s], [s for s in args.skip.split(',') if s])
+    except ValueError as e:
+        parser.error(str(e))
+    return instrument.run_main('pipeline', args, run, args)
+
+
+def run(args):
+    report = run_pipeline(args.data_dir, [s for s in args.only.split(',') if s],
+                          [s for s in args.skip.split(',') if s], args.offline,
+                          args.force, args.plan, args.jobs)
+
+    print(f"\n{'Stage':<12} {'Status':<10} {'Seconds':>8}  Detail")
+    for name, status, seconds, detail in report:
+        print(f"{name:<12} {status:<10} {seconds:>8.3f}  {detail}")
+    total = sum(seconds for _, _, seconds, _ in report)
+    ran = sum(1 for _, status, _, _ in report if status == 'ran')
+    print(f"\n{ran} stage(s) ran in {total:.2f}s")
+    return 1 if any(status in ('failed', 'blocked') for _, status, _, _ in report) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,276 @@
+"""
+Vectorized Lethality Index scoring over the A–G sub-scores in calcs.csv.
+
+LI is the weighted mean of the seven sub-scores, using the weights the
+pages show next to each subsystem, and FPS is LI × 60. The stored LI/FPS
+columns are entered by hand, so `check_calcs` recomputes both and flags
+rows that drift. `rank_stability` scores every country under a whole
+batch of weight vectors at once (one matrix product per chunk) and
+reports how stable each country's rank is.
+
+    python -m aircombat.scoring check
+    python -m aircombat.scoring sweep --samples 200000 --spread 0.25 --seed 1
+"""
+
+import argparse
+import pathlib
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = pathlib.Path("data")
+
+SUBSCORES = ['A', 'B', 'C', 'D', 'E', 'F', 'G']
+
+# Same weights as the subsystem labels on the pages
+DEFAULT_WEIGHTS = {
+    'A': 0.225,  # Sensor Reach
+    'B': 0.15,   # Signature Control
+    'C': 0.225,  # Missile Reach
+    'D': 0.15,   # Kill-Chain Network
+    'E': 0.10,   # ECM / Self-Protection
+    'F': 0.05,   # Sustained Sortie Rate
+    'G': 0.10,   # UCAV/Drone Production
+}
+
+FPS_SCALE = 60
+
+# LI is shown to one decimal; FPS is sometimes LI_exact × 60 and sometimes
+# the rounded LI × 60, so it gets 60 × the LI slack plus its own rounding.
+LI_TOLERANCE = 0.05
+FPS_TOLERANCE = FPS_SCALE * LI_TOLERANCE + 0.5
+
+# Weight vectors scored per matrix product; bounds memory at roughly
+# CHUNK_SIZE × countries × 8 bytes per intermediate array.
+CHUNK_SIZE = 20000
+
+
+def weight_vector(weights=None):
+    """A–G weights (dict or sequence) as a float64 vector summing to 1"""
+    if weights is None:
+        weights = DEFAULT_WEIGHTS
+    if isinstance(weights, dict):
+        unknown = set(weights) - set(SUBSCORES)
+        if unknown:
+            raise ValueError(f"unknown sub-score(s): {', '.join(sorted(unknown))}")
+        weights = [weights.get(name, 0.0) for name in SUBSCORES]
+    vector = np.asarray(weights, dtype=np.float64)
+    if vector.shape != (len(SUBSCORES),):
+        raise ValueError(f"expected {len(SUBSCORES)} weights, got {vector.shape}")
+    if (vector < 0).any() or vector.sum() <= 0:
+        raise ValueError("weights must be non-negative with a positive sum")
+    return vector / vector.sum()
+
+
+def parse_weights(text):
+    """'A=0.3,C=0.3,...' -> dict; sub-scores left out weigh 0"""
+    weights = {}
+    for part in text.split(','):
+        name, sep, value = part.partition('=')
+        if not sep:
+            raise ValueError(f"weights expect NAME=VALUE, got {part!r}")
+        weights[name.strip().upper()] = float(value)
+    return weights
+
+
+def load_calcs(calcs=None):
+    """calcs.csv as a DataFrame; accepts a path, a DataFrame or an Arrow table"""
+    if calcs is None:
+        calcs = DATA_DIR / 'calcs.csv'
+    if isinstance(calcs, pd.DataFrame):
+        return calcs
+    if hasattr(calcs, 'to_pandas'):
+        return calcs.to_pandas()
+    return pd.read_csv(calcs)
+
+
+def subscore_matrix(calcs):
+    """(countries × 7) float64 matrix of the A–G sub-scores"""
+    return calcs[SUBSCORES].apply(pd.to_numeric, errors='coerce').fillna(0).to_numpy(np.float64)
+
+
+def score(matrix, weights=None):
+    """LI for every row of the sub-score matrix under one weighting"""
+    return matrix @ weight_vector(weights)
+
+
+def check_calcs(calcs=None, weights=None, li_tolerance=LI_TOLERANCE, fps_tolerance=FPS_TOLERANCE):
+    """Recompute LI/FPS and compare with the stored columns.
+
+    Returns one row per country with the stored and computed values, the
+    differences and a `flagged` column for rows outside the tolerances.
+    """
+    calcs = load_calcs(calcs)
+    li = score(subscore_matrix(calcs), weights)
+    stored_li = pd.to_numeric(calcs['LI'], errors='coerce').to_numpy(np.float64)
+    stored_fps = pd.to_numeric(calcs['FPS'], errors='coerce').to_numpy(np.float64)
+
+    report = pd.DataFrame({
+        'Country': calcs['Country'],
+        'LI': stored_li,
+        'LI computed': li.round(3),
+        'LI diff': (stored_li - li).round(3),
+        'FPS': stored_fps,
+        'FPS computed': (li * FPS_SCALE).round(1),
+        'FPS diff': (stored_fps - li * FPS_SCALE).round(1),
+    })
+    # The epsilon keeps exact half-way cases like 95.85 -> 95.8 inside
+    report['flagged'] = ((report['LI diff'].abs() > li_tolerance + 1e-9)
+                         | (report['FPS diff'].abs() > fps_tolerance + 1e-9)
+                         | np.isnan(stored_li) | np.isnan(stored_fps))
+    return report
+
+
+def random_weights(samples, base=None, spread=0.2, seed=None):
+    """`samples` weight vectors scattered around `base`.
+
+    Each weight is scaled by an independent log-normal factor with sigma
+    `spread` and the vector renormalized, so zero weights stay zero and
+    spread=0 reproduces `base` exactly.
+    """
+    rng = np.random.default_rng(seed)
+    base = weight_vector(base)
+    factors = np.exp(rng.normal(0.0, spread, size=(samples, len(SUBSCORES))))
+    weights = base * factors
+    return weights / weights.sum(axis=1, keepdims=True)
+
+
+def score_batch(matrix, weight_matrix):
+    """(weightings × countries) LI matrix: one row per weight vector"""
+    weight_matrix = np.asarray(weight_matrix, dtype=np.float64)
+    return weight_matrix @ matrix.T
+
+
+def ranks_from_scores(scores):
+    """Rank (1 = best) of each column per row; ties keep the input order"""
+    order = np.argsort(-scores, axis=1, kind='stable')
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(1, scores.shape[1] + 1), axis=1)
+    return ranks
+
+
+def rank_stability(matrix, weight_matrix, baseline=None, top=3, chunk_size=CHUNK_SIZE):
+    """Rank statistics for every country across a batch of weightings.
+
+    Returns (per_country, summary). per_country is indexed like `matrix`
+    with the baseline rank, mean/std/min/max rank, the share of weightings
+    that keep the baseline rank, that rank the country first, and that
+    keep it in the top `top`. summary holds the Spearman correlation of
+    each weighting's ranking with the baseline (mean, min, 5th percentile)
+    and the share of weightings that leave the whole order unchanged.
+    """
+    weight_matrix = np.asarray(weight_matrix, dtype=np.float64)
+    samples, countries = len(weight_matrix), len(matrix)
+    if samples == 0:
+        raise ValueError('rank_stability needs at least one weighting')
+    base_ranks = ranks_from_scores(score(matrix, baseline)[None, :])[0]
+
+    rank_sum = np.zeros(countries)
+    rank_sq_sum = np.zeros(countries)
+    rank_min = np.full(countries, countries)
+    rank_max = np.zeros(countries, dtype=np.int64)
+    histogram = np.zeros(countries * countries, dtype=np.int64)
+    spearman = np.empty(samples)
+    unchanged = 0
+    offsets = np.arange(countries) * countries
+
+    for start in range(0, samples, chunk_size):
+        ranks = ranks_from_scores(score_batch(matrix, weight_matrix[start:start + chunk_size]))
+        rank_sum += ranks.sum(axis=0)
+        rank_sq_sum += (ranks.astype(np.float64) ** 2).sum(axis=0)
+        rank_min = np.minimum(rank_min, ranks.min(axis=0))
+        rank_max = np.maximum(rank_max, ranks.max(axis=0))
+        histogram += np.bincount((offsets + ranks - 1).ravel(), minlength=countries * countries)
+
+        d_squared = ((ranks - base_ranks) ** 2).sum(axis=1)
+        if countries > 1:
+            spearman[start:start + len(ranks)] = 1 - 6 * d_squared / (countries * (countries ** 2 - 1))
+        else:
+            spearman[start:start + len(ranks)] = 1.0
+        unchanged += int((d_squared == 0).sum())
+
+    histogram = histogram.reshape(countries, countries)
+    mean = rank_sum / samples
+    per_country = pd.DataFrame({
+        'baseline rank': base_ranks,
+        'mean rank': mean.round(3),
+        'rank std': np.sqrt(np.maximum(rank_sq_sum / samples - mean ** 2, 0)).round(3),
+        'best rank': rank_min,
+        'worst rank': rank_max,
+        'P(same rank)': histogram[np.arange(countries), base_ranks - 1] / samples,
+        'P(rank 1)': histogram[:, 0] / samples,
+        f'P(top {top})': histogram[:, :top].sum(axis=1) / samples,
+    })
+    summary = {
+        'samples': samples,
+        'spearman_mean': float(spearman.mean()),
+        'spearman_min': float(spearman.min()),
+        'spearman_p5': float(np.percentile(spearman, 5)),
+        'order_unchanged': unchanged / samples,
+    }
+    return per_country, summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Recompute and stress-test the Lethality Index')
+    parser.add_argument('--calcs', default=str(DATA_DIR / 'calcs.csv'))
+    parser.add_argument('--weights', default=None,
+                        help='Weights as A=0.225,B=0.15,... (default: the published weights)')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    check = sub.add_parser('check', help='Flag rows whose stored LI/FPS differ from A–G')
+    check.add_argument('--li-tolerance', type=float, default=LI_TOLERANCE)
+    check.add_argument('--fps-tolerance', type=float, default=FPS_TOLERANCE)
+    check.add_argument('--strict', action='store_true', help='Exit 1 when any row is flagged')
+
+    sweep = sub.add_parser('sweep', help='Rank stability under perturbed weightings')
+    sweep.add_argument('--samples', type=int, default=100000)
+    sweep.add_argument('--spread', type=float, default=0.2,
+                       help='Log-normal sigma applied to each weight')
+    sweep.add_argument('--seed', type=int, default=None)
+    sweep.add_argument('--top', type=int, default=3)
+    sweep.add_argument('--output', default=None, help='Write the per-country table as CSV')
+    args = parser.parse_args(argv)
+    if args.command == 'sweep' and args.samples < 1:
+        parser.error('--samples must be at least 1')
+
+    weights = None
+    if args.weights:
+        try:
+            weights = parse_weights(args.weights)
+            weight_vector(weights)
+        except ValueError as e:
+            parser.error(f'--weights: {e}')
+    calcs = load_calcs(args.calcs)
+
+    if args.command == 'check':
+        report = check_calcs(calcs, weights, args.li_tolerance, args.fps_tolerance)
+        print(report.to_string(index=False))
+        flagged = report[report['flagged']]
+        print(f"\n{len(flagged)} of {len(report)} row(s) differ from the recomputed LI/FPS")
+        return 1 if args.strict and len(flagged) else 0
+
+    matrix = subscore_matrix(calcs)
+    start = time.perf_counter()
+    batch = random_weights(args.samples, weights, args.spread, args.seed)
+    per_country, summary = rank_stability(matrix, batch, weights, args.top)
+    elapsed = time.perf_counter() - start
+
+    per_country.insert(0, 'Country', calcs['Country'])
+    per_country.insert(1, 'LI computed', score(matrix, weights).round(3))
+    per_country = per_country.sort_values('baseline rank')
+    print(per_country.to_string(index=False))
+    print(f"\n{summary['samples']} weightings in {elapsed:.2f}s; "
+          f"Spearman vs baseline mean {summary['spearman_mean']:.4f}, "
+          f"min {summary['spearman_min']:.4f}, p5 {summary['spearman_p5']:.4f}; "
+          f"order unchanged in {summary['order_unchanged']:.1%}")
+    if args.output:
+        per_country.to_csv(args.output, index=False)
+        print(f"Wrote {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
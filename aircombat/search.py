@@ -0,0 +1,265 @@
+"""
+BM25 full-text search over the descriptive columns.
+
+build_search_index.py tokenizes the kill-chain, missile, cueing and
+company-role text into data/search_index.bin: a small JSON header (terms,
+documents, field lengths) followed by flat little-endian postings arrays,
+read back with np.frombuffer and no per-posting parsing. BM25 impacts are
+computed once per load, so a query is a few array slices and a sum.
+
+Query syntax:
+
+    link-16 datalink            every term must match (--any for either)
+    "two-way datalink"          phrase
+    cueing:sat-links            term or phrase restricted to one field
+    AN/APG-82(V)1               punctuated tokens match as a phrase of
+                                their parts, so 'APG-82' finds it too
+
+    python -m aircombat.search 'cueing:"green pine"' --limit 5
+    python -m aircombat.search aim-260 --source products
+"""
+
+import argparse
+import json
+import pathlib
+import re
+import struct
+import sys
+import time
+
+import numpy as np
+
+DATA_DIR = pathlib.Path("data")
+INDEX_NAME = "search_index.bin"
+
+MAGIC = b'ACSI'
+FORMAT_VERSION = 1
+
+FIELDS = ['kill_chain', 'missile_design', 'integration', 'cueing', 'role']
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+TOKEN = re.compile(r'[^\W_]+')
+CLAUSE = re.compile(r'(?:(?P<field>\w+):)?(?:"(?P<phrase>[^"]*)"|(?P<term>\S+))')
+
+# Binary arrays after the header, name -> dtype, written in this order
+ARRAYS = {
+    'term_ptr': np.int32,      # postings range per term (n_terms + 1)
+    'post_doc': np.int32,      # document of each posting
+    'post_field': np.uint8,    # field of each posting
+    'post_tf': np.uint16,      # term frequency in that field
+    'pos_ptr': np.int32,       # positions range per posting (n_postings + 1)
+    'positions': np.uint16,    # token positions within the field
+    'field_len': np.uint16,    # tokens per (document, field), row-major
+}
+
+
+def tokenize(text):
+    """Case-folded alphanumeric runs; 'AN/APG-82(V)1' -> an apg 82 v 1"""
+    if not isinstance(text, str):
+        return []
+    return TOKEN.findall(text.casefold())
+
+
+def parse_query(query):
+    """Query string -> [(field or None, [tokens])]; one token is a term, more a phrase"""
+    clauses = []
+    for match in CLAUSE.finditer(query):
+        field = match.group('field')
+        if field and field not in FIELDS:
+            raise ValueError(f"unknown field {field!r}; expected one of {', '.join(FIELDS)}")
+        tokens = tokenize(match.group('phrase') if match.group('phrase') is not None
+                          else match.group('term'))
+        if tokens:
+            clauses.append((field, tokens))
+    return clauses
+
+
+def write_index(path, header, arrays):
+    """Serialize the header and postings arrays (see ARRAYS) to `path`"""
+    layout = {}
+    offset = 0
+    blobs = []
+    for name, dtype in ARRAYS.items():
+        data = np.ascontiguousarray(arrays[name], dtype=np.dtype(dtype).newbyteorder('<'))
+        layout[name] = [offset, len(data)]
+        blobs.append(data.tobytes())
+        offset += data.nbytes
+    header = dict(header, version=FORMAT_VERSION, arrays=layout)
+    encoded = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    # Pad so the arrays start 8-byte aligned
+    encoded += b' ' * (-(len(encoded) + 12) % 8)
+
+    path = pathlib.Path(path)
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC + struct.pack('<II', FORMAT_VERSION, len(encoded)) + encoded)
+        for blob in blobs:
+            f.write(blob)
+    tmp.replace(path)
+
+
+class SearchIndex:
+    """A loaded search_index.bin"""
+
+    def __init__(self, path=DATA_DIR / INDEX_NAME):
+        raw = pathlib.Path(path).read_bytes()
+        if raw[:4] != MAGIC:
+            raise ValueError(f"{path} is not a search index")
+        version, header_len = struct.unpack('<II', raw[4:12])
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path} has index format {version}, expected {FORMAT_VERSION}")
+        header = json.loads(raw[12:12 + header_len])
+        base = 12 + header_len
+        for name, dtype in ARRAYS.items():
+            offset, count = header['arrays'][name]
+            setattr(self, name, np.frombuffer(raw, dtype=np.dtype(dtype).newbyteorder('<'),
+                                              count=count, offset=base + offset))
+
+        self.sources = header['sources']
+        self.docs = header['docs']
+        self.doc_source = np.array([doc[0] for doc in self.docs], dtype=np.int32)
+        self.term_ids = {term: i for i, term in enumerate(header['terms'])}
+        self.impact = self._impacts()
+
+    def _impacts(self):
+        """BM25 weight of every posting, normalized by its own field's length"""
+        n_docs = len(self.docs)
+        lengths = self.field_len.reshape(n_docs, len(FIELDS)).astype(np.float64)
+        present = lengths > 0
+        avg = np.where(present.any(axis=0),
+                       lengths.sum(axis=0) / np.maximum(present.sum(axis=0), 1), 1.0)
+
+        # Postings run (term, document, field) in order; a term's document
+        # frequency counts its documents, not its (document, field) pairs
+        counts = np.diff(self.term_ptr)
+        term_of_posting = np.repeat(np.arange(len(counts)), counts)
+        new_doc = np.ones(len(self.post_doc), dtype=bool)
+        new_doc[1:] = (self.post_doc[1:] != self.post_doc[:-1]) | \
+            (term_of_posting[1:] != term_of_posting[:-1])
+        doc_freq = np.bincount(term_of_posting[new_doc], minlength=len(counts)).astype(np.float64)
+        idf = np.log(1 + (n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+
+        tf = self.post_tf.astype(np.float64)
+        field_len = lengths[self.post_doc, self.post_field]
+        norm = K1 * (1 - B + B * field_len / avg[self.post_field])
+        return (idf[term_of_posting] * tf * (K1 + 1) / (tf + norm)).astype(np.float32)
+
+    def _postings(self, token, field):
+        term = self.term_ids.get(token)
+        if term is None:
+            return np.empty(0, dtype=np.int64)
+        postings = np.arange(self.term_ptr[term], self.term_ptr[term + 1])
+        if field is not None:
+            postings = postings[self.post_field[postings] == FIELDS.index(field)]
+        return postings
+
+    def _occurrences(self, postings, offset):
+        """(doc, field, position - offset) keys for every occurrence in `postings`"""
+        counts = (self.pos_ptr[postings + 1] - self.pos_ptr[postings]).astype(np.int64)
+        first = np.repeat(self.pos_ptr[postings].astype(np.int64), counts)
+        within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        pairs = np.repeat(self._pair(postings), counts)
+        positions = self.positions[first + within].astype(np.int64)
+        keep = positions >= offset
+        return (pairs[keep] << 16) + positions[keep] - offset
+
+    def _pair(self, postings):
+        return self.post_doc[postings].astype(np.int64) * len(FIELDS) + self.post_field[postings]
+
+    def _phrase(self, tokens, field, scores, matched):
+        """Mark documents where `tokens` occur consecutively in one field"""
+        per_token = [self._postings(token, field) for token in tokens]
+        if any(len(p) == 0 for p in per_token):
+            return
+        # Keep only (doc, field) pairs every token occurs in before expanding positions
+        pairs = self._pair(per_token[0])
+        for postings in per_token[1:]:
+            pairs = np.intersect1d(pairs, self._pair(postings), assume_unique=True)
+        per_token = [p[np.isin(self._pair(p), pairs, assume_unique=True)] for p in per_token]
+        starts = self._occurrences(per_token[0], 0)
+        for offset, postings in enumerate(per_token[1:], start=1):
+            starts = np.intersect1d(starts, self._occurrences(postings, offset))
+        pairs = np.unique(starts >> 16)
+        for postings in per_token:
+            postings = postings[np.isin(self._pair(postings), pairs, assume_unique=True)]
+            np.add.at(scores, self.post_doc[postings], self.impact[postings])
+        matched[pairs // len(FIELDS)] = True
+
+    def match(self, query, field=None, sources=None, require_all=True):
+        """(document ids, BM25 scores) of every document matching `query`"""
+        clauses = parse_query(query)
+        n_docs = len(self.docs)
+        scores = np.zeros(n_docs, dtype=np.float32)
+        if not clauses:
+            return np.empty(0, dtype=np.int64), scores[:0]
+        required = np.ones(n_docs, dtype=bool) if require_all else np.zeros(n_docs, dtype=bool)
+
+        for clause_field, tokens in clauses:
+            clause_field = clause_field or field
+            matched = np.zeros(n_docs, dtype=bool)
+            if len(tokens) == 1:
+                postings = self._postings(tokens[0], clause_field)
+                docs = self.post_doc[postings]
+                np.add.at(scores, docs, self.impact[postings])
+                matched[docs] = True
+            else:
+                self._phrase(tokens, clause_field, scores, matched)
+            required = required & matched if require_all else required | matched
+
+        if sources:
+            wanted = [self.sources.index(s) for s in sources if s in self.sources]
+            required &= np.isin(self.doc_source, wanted)
+        hits = np.flatnonzero(required)
+        return hits, scores[hits]
+
+    def search(self, query, limit=10, field=None, sources=None, require_all=True):
+        """Ranked hits for `query` as dicts (score, source, title, country).
+
+        `field` restricts every clause without its own field prefix;
+        `sources` limits hits to some of 'fleet', 'products', 'calcs',
+        'company'.
+        """
+        hits, scores = self.match(query, field, sources, require_all)
+        if len(hits) > limit:
+            keep = np.argpartition(-scores, limit - 1)[:limit]
+            hits, scores = hits[keep], scores[keep]
+        order = np.argsort(-scores, kind='stable')
+        return [{'score': float(score), 'source': self.sources[self.docs[doc][0]],
+                 'title': self.docs[doc][1], 'country': self.docs[doc][2]}
+                for doc, score in zip(hits[order], scores[order])]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Search the kill-chain and description text')
+    parser.add_argument('query')
+    parser.add_argument('--index', default=str(DATA_DIR / INDEX_NAME))
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--field', choices=FIELDS, default=None,
+                        help='Restrict unprefixed terms to one field')
+    parser.add_argument('--source', action='append', choices=['fleet', 'products', 'calcs', 'company'],
+                        help='Only return hits from these tables (repeatable)')
+    parser.add_argument('--any', action='store_true', help='Match any term instead of all')
+    args = parser.parse_args(argv)
+
+    try:
+        parse_query(args.query)
+    except ValueError as e:
+        parser.error(str(e))
+
+    index = SearchIndex(args.index)
+    start = time.perf_counter()
+    hits = index.search(args.query, args.limit, args.field, args.source, not args.any)
+    elapsed = time.perf_counter() - start
+
+    for hit in hits:
+        country = f" [{hit['country']}]" if hit['country'] else ''
+        print(f"{hit['score']:7.3f}  {hit['source']:<8} {hit['title']}{country}")
+    print(f"\n{len(hits)} hit(s) in {elapsed * 1000:.3f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""
+Indexed, memory-mapped query API over the Feather files in data/.
+
+Tables are opened with Arrow memory mapping (the Feather files are written
+uncompressed for the JS reader, so columns are used in place without a
+copy). Hash indexes from key to row numbers are built once per store, so
+each lookup is a dict hit plus a `take` of the matching rows.
+
+    from aircombat.store import open_store
+    store = open_store('data')
+    store.fleet_by_country('rus')
+    store.aircraft_by_company('Lockheed Martin')
+    store.products_for_aircraft('F-35 Lightning II')
+"""
+
+import functools
+import pathlib
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+DATA_DIR = pathlib.Path("data")
+
+# Country CSV stems (the `country` column in global_merged) to the
+# flag codes used by calcs.csv and flagcdn; same map as the pages use.
+FILE_CODE_TO_FLAG = {
+    'us': 'us', 'rus': 'ru', 'chn': 'cn', 'isr': 'il', 'uk': 'gb',
+    'aus': 'au', 'jpn': 'jp', 'kor': 'kr', 'swe': 'se', 'ita': 'it',
+    'fra': 'fr', 'can': 'ca', 'de': 'de', 'tuk': 'tr', 'pk': 'pk',
+    'thai': 'th', 'spa': 'es', 'iran': 'ir', 'in': 'in', 'sau': 'sa',
+}
+FLAG_TO_FILE_CODE = {flag: code for code, flag in FILE_CODE_TO_FLAG.items()}
+
+
+def normalize_key(value):
+    """Index key for a cell: trimmed and case-folded, None for blanks"""
+    if value is None:
+        return None
+    key = str(value).strip().casefold()
+    return key or None
+
+
+def split_list(value):
+    """Split a comma-joined cell such as 'Associated products'"""
+    if not value:
+        return []
+    return [part.strip() for part in str(value).split(',') if part.strip()]
+
+
+def read_feather(path):
+    """Open a Feather file as a memory-mapped Arrow table"""
+    source = pa.memory_map(str(path), 'r')
+    return ipc.open_file(source).read_all()
+
+
+def build_index(table, column, multi=False):
+    """Map normalized values of `column` to the list of row numbers holding them.
+
+    With multi=True the cells are comma-joined lists and every element is
+    indexed separately.
+    """
+    index = {}
+    for row, value in enumerate(table.column(column).to_pylist()):
+        values = split_list(value) if multi else [value]
+        for item in values:
+            key = normalize_key(item)
+            if key is None:
+                continue
+            rows = index.setdefault(key, [])
+            if not rows or rows[-1] != row:
+                rows.append(row)
+    return index
+
+
+class DataStore:
+    """Memory-mapped tables from data/ with hash indexes on the join keys"""
+
+    def __init__(self, data_dir=DATA_DIR):
+        self.data_dir = pathlib.Path(data_dir)
+        self.fleet = read_feather(self.data_dir / 'global_merged.feather')
+        self.calcs = read_feather(self.data_dir / 'calcs.feather')
+        self.products = read_feather(self.data_dir / 'products.feather')
+        self.companies = read_feather(self.data_dir / 'company.feather')
+
+        self._fleet_by_country = build_index(self.fleet, 'country')
+        self._fleet_by_aircraft = build_index(self.fleet, 'Aircraft')
+        self._fleet_by_company = build_index(self.fleet, 'Company')
+        self._calcs_by_country = build_index(self.calcs, 'Country')
+        self._calcs_by_flag = build_index(self.calcs, 'Flag Abbrev')
+        self._products_by_name = build_index(self.products, 'Product')
+        self._products_by_company = build_index(self.products, 'Company')
+        self._products_by_associated = build_index(self.products, 'Associated products', multi=True)
+        self._companies_by_name = build_index(self.companies, 'Company')
+
+    @staticmethod
+    def _take(table, index, key):
+        rows = index.get(normalize_key(key), [])
+        return table.take(pa.array(rows, pa.int64()))
+
+    def country_code(self, country):
+        """Resolve a file code ('rus') or flag code ('ru') to the file code"""
+        key = normalize_key(country)
+        if key in self._fleet_by_country:
+            return key
+        return FLAG_TO_FILE_CODE.get(key, key)
+
+    def fleet_by_country(self, country):
+        """Fleet rows for a country, by file code ('rus') or flag code ('ru')"""
+        return self._take(self.fleet, self._fleet_by_country, self.country_code(country))
+
+    def fleet_by_aircraft(self, aircraft):
+        """Fleet rows (one per operating country) for an aircraft name"""
+        return self._take(self.fleet, self._fleet_by_aircraft, aircraft)
+
+    def aircraft_by_company(self, company):
+        """Fleet rows for aircraft built by `company`"""
+        return self._take(self.fleet, self._fleet_by_company, company)
+
+    def calcs_for_country(self, country):
+        """The calcs.csv row for a country name ('Russia') or flag/file code"""
+        key = normalize_key(country)
+        if key in self._calcs_by_country:
+            return self._take(self.calcs, self._calcs_by_country, key)
+        flag = FILE_CODE_TO_FLAG.get(key, key)
+        return self._take(self.calcs, self._calcs_by_flag, flag)
+
+    def product(self, name):
+        """The products.csv row(s) for a product name"""
+        return self._take(self.products, self._products_by_name, name)
+
+    def products_by_company(self, company):
+        """products.csv rows made by `company`"""
+        return self._take(self.products, self._products_by_company, company)
+
+    def company(self, name):
+        """The company.csv row(s) for a company name"""
+        return self._take(self.companies, self._companies_by_name, name)
+
+    def products_for_aircraft(self, aircraft):
+        """products.csv rows linked to an aircraft.
+
+        A product is linked when it appears in the aircraft's own
+        'Associated products' list, or lists the aircraft in its own.
+        """
+        rows = set(self._products_by_associated.get(normalize_key(aircraft), []))
+        fleet_rows = self._fleet_by_aircraft.get(normalize_key(aircraft), [])
+        associated = self.fleet.column('Associated products')
+        for fleet_row in fleet_rows:
+            for name in split_list(associated[fleet_row].as_py()):
+                rows.update(self._products_by_name.get(normalize_key(name), []))
+        return self.products.take(pa.array(sorted(rows), pa.int64()))
+
+
+@functools.lru_cache(maxsize=None)
+def _cached_store(data_dir):
+    return DataStore(data_dir)
+
+
+def open_store(data_dir=DATA_DIR):
+    """Return a shared DataStore for `data_dir`, built on first use"""
+    return _cached_store(str(pathlib.Path(data_dir).resolve()))
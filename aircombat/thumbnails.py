@@ -0,0 +1,216 @@
+"""
+Local thumbnail mirror for the aircraft photos.
+
+Each photo URL is downloaded once, hashed, and rendered into a few widths
+as WebP and JPEG under data/thumbs/:
+
+    data/thumbs/<key>-160.webp  <key>-160.jpg  <key>-640.webp  <key>-640.jpg
+    data/thumbs/manifest.json   {sources: {url: image}, images: {key: info}}
+
+<key> is the first 16 hex digits of the image's SHA-256, so rows that share
+an airframe photo (or different URLs serving the same bytes) share one set
+of files. URLs already in the manifest whose thumbnails exist are not
+fetched again; with refresh=True they are revalidated with a conditional
+GET (ETag / Last-Modified) and only re-rendered when the bytes changed.
+Images no longer referenced by any URL are removed.
+
+Rendering needs Pillow; `available()` reports whether it is installed.
+"""
+
+import hashlib
+import io
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+THUMB_DIR = 'thumbs'
+MANIFEST_NAME = 'manifest.json'
+KEY_LENGTH = 16
+# Fleet list icons and detail cards; the largest WebP is the default Thumb
+WIDTHS = (160, 640)
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 6}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+MAX_IMAGE_BYTES = 32 << 20
+HEADERS = {'User-Agent': 'AircraftImageUpdater/1.0 (Educational; GitHub Actions)'}
+
+
+def available():
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def thumb_name(key, width=max(WIDTHS), ext='webp'):
+    return f"{key}-{width}.{ext}"
+
+
+def thumb_names(key):
+    return [thumb_name(key, width, ext) for width in WIDTHS for ext in FORMATS]
+
+
+def load_manifest(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if isinstance(manifest.get('sources'), dict) and isinstance(manifest.get('images'), dict):
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {'version': 1, 'sources': {}, 'images': {}}
+
+
+def write_atomic(path, data):
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def render(data, out_dir, key):
+    """Write every width/format of one image; returns its original size"""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            # JPEG has no alpha; flatten transparent PNG/GIF photos onto white
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        width, height = image.size
+        for target in WIDTHS:
+            # Never upscale; small originals are just re-encoded
+            if width > target:
+                resized = image.resize((target, max(1, round(height * target / width))),
+                                       Image.LANCZOS)
+            else:
+                resized = image
+            for ext, (fmt, options) in FORMATS.items():
+                buffer = io.BytesIO()
+                resized.save(buffer, fmt, **options)
+                write_atomic(out_dir / thumb_name(key, target, ext), buffer.getvalue())
+    return width, height
+
+
+class Mirror:
+    """One mirroring run over a thumbnail directory; safe to share between threads"""
+
+    def __init__(self, out_dir, client, refresh=False, dry_run=False):
+        self.out_dir = Path(out_dir)
+        self.client = client
+        self.refresh = refresh
+        self.dry_run = dry_run
+        self.manifest = load_manifest(self.out_dir / MANIFEST_NAME)
+        self.stats = {'cached': 0, 'not_modified': 0, 'downloaded': 0, 'rendered': 0,
+                      'deduplicated': 0, 'failed': 0, 'would_fetch': 0}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _complete(self, key):
+        return key in self.manifest['images'] and all(
+            (self.out_dir / name).exists() for name in thumb_names(key))
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def fetch(self, url):
+        """Mirror one URL; returns its image key, or None when it can't be fetched"""
+        known = self.manifest['sources'].get(url)
+        if known and self._complete(known['key']):
+            if not self.refresh:
+                self._count('cached')
+                return known['key']
+        if self.dry_run:
+            self._count('would_fetch')
+            return known['key'] if known else None
+
+        headers = dict(HEADERS)
+        if known and self._complete(known['key']):
+            if known.get('etag'):
+                headers['If-None-Match'] = known['etag']
+            if known.get('last_modified'):
+                headers['If-Modified-Since'] = known['last_modified']
+        try:
+            response = self.client.get(url, headers=headers, timeout=30)
+        except Exception as e:
+            print(f"⚠️ Thumbnail download failed for {url}: {e}")
+            self._count('failed')
+            return None
+        if response.status_code == 304 and known:
+            self._count('not_modified')
+            return known['key']
+        content_type = response.headers.get('content-type', '').lower()
+        if response.status_code != 200 or 'image' not in content_type \
+                or len(response.content) > MAX_IMAGE_BYTES:
+            self._count('failed')
+            return None
+        self._count('downloaded')
+
+        data = response.content
+        key = hashlib.sha256(data).hexdigest()[:KEY_LENGTH]
+        # Rows sharing a photo render it once, even when fetched in parallel
+        with self._key_lock(key):
+            if self._complete(key):
+                self._count('deduplicated')
+            else:
+                try:
+                    width, height = render(data, self.out_dir, key)
+                except Exception as e:
+                    print(f"⚠️ Could not render {url}: {type(e).__name__}: {e}")
+                    self._count('failed')
+                    return None
+                with self._lock:
+                    self.manifest['images'][key] = {
+                        'width': width, 'height': height, 'bytes': len(data),
+                        'files': thumb_names(key),
+                    }
+                self._count('rendered')
+        with self._lock:
+            self.manifest['sources'][url] = {
+                'key': key,
+                'etag': response.headers.get('etag'),
+                'last_modified': response.headers.get('last-modified'),
+            }
+        return key
+
+    def run(self, urls, jobs=8):
+        """Mirror every URL; returns {url: key or None}"""
+        urls = list(dict.fromkeys(url for url in urls if url))
+        if not self.dry_run:
+            self.out_dir.mkdir(parents=True, exist_ok=True)
+        if jobs > 1 and len(urls) > 1:
+            with ThreadPoolExecutor(max_workers=jobs) as pool:
+                keys = list(pool.map(self.fetch, urls))
+        else:
+            keys = [self.fetch(url) for url in urls]
+        return dict(zip(urls, keys))
+
+    def save(self, urls):
+        """Keep only the given URLs and the images they use, then write the manifest"""
+        if self.dry_run:
+            return
+        sources = {url: entry for url, entry in self.manifest['sources'].items() if url in urls}
+        used = {entry['key'] for entry in sources.values()}
+        images = {key: info for key, info in self.manifest['images'].items() if key in used}
+        keep = {MANIFEST_NAME} | {name for key in images for name in thumb_names(key)}
+        for path in self.out_dir.iterdir():
+            if path.is_file() and path.name not in keep:
+                path.unlink()
+        self.manifest = {'version': 1, 'widths': list(WIDTHS), 'formats': list(FORMATS),
+                         'sources': dict(sorted(sources.items())), 'images': dict(sorted(images.items()))}
+        write_atomic(self.out_dir / MANIFEST_NAME,
+                     (json.dumps(self.manifest, indent=1, ensure_ascii=False) + '\n').encode('utf-8'))
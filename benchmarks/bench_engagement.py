@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the Monte Carlo BVR engagement model.
+
+Runs the full country × country matrix with each worker count given and
+reports trials per second. Every run uses the same seed, so the win
+matrices must come out identical regardless of the worker count.
+
+Run from the repository root:
+    python -m benchmarks.bench_engagement --trials 100000 --jobs 1 4 8
+"""
+
+import argparse
+
+from aircombat import engagement
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark aircombat.engagement')
+    parser.add_argument('--data-dir', default=str(engagement.DATA_DIR))
+    parser.add_argument('--trials', type=int, default=engagement.DEFAULT_TRIALS)
+    parser.add_argument('--jobs', type=int, nargs='+', default=[1])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    calcs, fleet = engagement.load_inputs(args.data_dir)
+    profiles = engagement.build_profiles(calcs, fleet)
+    pairs = len(profiles) * (len(profiles) - 1) // 2
+    print(f"{len(profiles)} countries, {pairs} pairs, {args.trials:,} trials per pair")
+
+    reference = None
+    for jobs in args.jobs:
+        result = engagement.win_matrix(profiles, args.trials, args.seed, jobs)
+        rate = result['trials'] / result['seconds']
+        print(f"jobs={jobs:<3} {result['seconds']:>8.2f}s  {rate:>14,.0f} trials/s")
+        if reference is None:
+            reference = result['win']
+        elif not reference.equals(result['win']):
+            print("MISMATCH: win matrix changed with the worker count")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
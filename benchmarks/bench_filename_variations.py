@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for generate_filename_variations.
+
+Times the precompiled, memoized generator in update_aircraft_images.py
+against the original one-re.sub-per-suffix implementation (kept below)
+over every Photo filename in data/ plus synthetic names built from the
+suffix table. tests/test_filename_variations.py checks that the new
+output equals the old one with repeats dropped, over the same corpus.
+
+Run from the repository root:
+    python -m benchmarks.bench_filename_variations
+"""
+
+import argparse
+import csv
+import itertools
+import pathlib
+import re
+import sys
+import time
+
+import update_aircraft_images as uai
+
+
+def legacy_generate_filename_variations(filename):
+    """The per-pattern re.sub implementation this benchmark replaced"""
+    if not filename:
+        return []
+
+    variations = [filename]
+    base_name = filename
+
+    air_force_patterns = [
+        r'\s+Turkish\s+Air\s+Force', r'\s+USAF', r'\s+US\s+Air\s+Force',
+        r'\s+Royal\s+Air\s+Force', r'\s+RAF', r'\s+Israeli\s+Air\s+Force',
+        r'\s+Indian\s+Air\s+Force', r'\s+Pakistan\s+Air\s+Force',
+        r'\s+Russian\s+Air\s+Force', r'\s+Chinese\s+Air\s+Force',
+        r'\s+PLAAF', r'\s+RAAF', r'\s+Australian\s+Air\s+Force',
+        r'\s+Canadian\s+Air\s+Force', r'\s+RCAF', r'\s+German\s+Air\s+Force',
+        r'\s+Luftwaffe', r'\s+French\s+Air\s+Force', r'\s+Spanish\s+Air\s+Force',
+        r'\s+Italian\s+Air\s+Force', r'\s+Japanese\s+Air\s+Force', r'\s+JASDF',
+        r'\s+Korean\s+Air\s+Force', r'\s+ROKAF', r'\s+Saudi\s+Air\s+Force',
+        r'\s+RSAF', r'\s+Swedish\s+Air\s+Force', r'\s+Thai\s+Air\s+Force',
+        r'\s+RTAF'
+    ]
+
+    for pattern in air_force_patterns:
+        cleaned = re.sub(pattern, '', base_name, flags=re.IGNORECASE)
+        cleaned = re.sub(r'\s+', ' ', cleaned).strip()
+        if cleaned and cleaned != base_name and cleaned not in variations:
+            variations.append(cleaned)
+
+    for pattern in [r'\s*\(\d{4}\)', r'_\d{4}', r'-\d{4}']:
+        cleaned = re.sub(pattern, '', base_name)
+        if cleaned and cleaned not in variations:
+            variations.append(cleaned)
+
+    if '(cropped)' in base_name:
+        cleaned = base_name.replace('(cropped)', '').strip()
+        if cleaned not in variations:
+            variations.append(cleaned)
+
+    cleaned = re.sub(r'_\d+(\.\w+)', r'\1', base_name)
+    if cleaned != base_name and cleaned not in variations:
+        variations.append(cleaned)
+
+    if '_' in base_name:
+        variations.append(base_name.replace('_', ' '))
+    if ' ' in base_name:
+        variations.append(base_name.replace(' ', '_'))
+
+    return variations
+
+
+def corpus(data_dir):
+    """Real Photo filenames from data/*.csv plus synthetic edge cases"""
+    names = []
+    for csv_path in sorted(pathlib.Path(data_dir).glob('*.csv')):
+        with open(csv_path, encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                filename = uai.extract_filename_from_wikimedia_url((row.get('Photo') or '').strip())
+                if filename:
+                    names.append(filename)
+
+    stems = ['F-16 Fighting Falcon', 'Eurofighter_Typhoon', 'Su-35S  Flanker-E', 'J-20 ']
+    decorations = ['', ' USAF', ' us air force', ' Royal Air Force RAF', ' RAFAEL',
+                   ' JASDF (2019)', '_2021', '-1999', ' (cropped)', '_3']
+    for stem, first, second in itertools.product(stems, decorations, decorations):
+        names.append(f'{stem}{first}{second}.jpg')
+    return names
+
+
+def timed(label, fn, names, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for name in names:
+            fn(name)
+    elapsed = time.perf_counter() - start
+    calls = repeat * len(names)
+    print(f"{label:<36} {elapsed:>8.4f}s  {elapsed / calls * 1e6:>8.2f} µs/call")
+    return elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args(argv)
+
+    distinct = sorted(set(corpus(args.data_dir)))
+    print(f"{len(distinct)} distinct names x {args.repeat} passes")
+    t_legacy = timed('legacy per-pattern re.sub', legacy_generate_filename_variations,
+                     distinct, args.repeat)
+
+    def uncached(name):
+        return uai._filename_variations.__wrapped__(name)
+
+    t_single = timed('single alternation (uncached)', uncached, distinct, args.repeat)
+    uai._filename_variations.cache_clear()
+    t_cached = timed('single alternation (memoized)', uai.generate_filename_variations,
+                     distinct, args.repeat)
+    print(f"\nSpeed-up uncached: {t_legacy / t_single:.1f}x, memoized: {t_legacy / t_cached:.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
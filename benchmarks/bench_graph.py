@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark cross-reference graph lookups against per-click table scans.
+
+The scan does what the pages do on a click: walk every fleet row for the
+company's aircraft. The graph answers from CSR slices.
+Every country the scan finds must also come back from the graph, which
+may add more through fuzzy maker names and products.csv makers.
+
+Run from the repository root (after build_crossref_graph.py):
+    python -m benchmarks.bench_graph --lookups 2000
+"""
+
+import argparse
+import random
+import time
+
+from aircombat.graph import CrossRefGraph, DATA_DIR
+from aircombat.store import FILE_CODE_TO_FLAG
+from aircombat.datafiles import read_strings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark aircombat.graph lookups')
+    parser.add_argument('--data-dir', default=str(DATA_DIR))
+    parser.add_argument('--lookups', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    graph = CrossRefGraph(args.data_dir)
+    print(f"Graph load: {time.perf_counter() - start:.4f}s ({len(graph)} nodes)")
+
+    fleet = read_strings(f"{args.data_dir}/global_merged.csv").to_pylist()
+    calcs = read_strings(f"{args.data_dir}/calcs.csv").to_pylist()
+    names = {row['Flag Abbrev']: row['Country'] for row in calcs}
+    country_name = {code: names.get(flag, code) for code, flag in FILE_CODE_TO_FLAG.items()}
+
+    companies = sorted({row['Company'].strip() for row in fleet if row.get('Company')})
+    rng = random.Random(args.seed)
+    queries = [rng.choice(companies) for _ in range(args.lookups)]
+
+    def scan(company):
+        return sorted({country_name.get(row['country'], row['country']) for row in fleet
+                       if (row.get('Company') or '').strip() == company and row.get('Aircraft')})
+
+    start = time.perf_counter()
+    scanned = [scan(company) for company in queries]
+    scan_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    found = [graph.operators_of_company(company) for company in queries]
+    graph_time = time.perf_counter() - start
+
+    missing = sum(1 for a, b in zip(scanned, found) if not set(a) <= set(b))
+    extended = sum(1 for a, b in zip(scanned, found) if set(b) - set(a))
+    print(f"{args.lookups} company -> operating countries lookups")
+    print(f"{'table scan per click':<28} {scan_time:>8.4f}s  {scan_time / args.lookups * 1e6:>9.1f} µs/lookup")
+    print(f"{'CSR graph':<28} {graph_time:>8.4f}s  {graph_time / args.lookups * 1e6:>9.1f} µs/lookup")
+    print(f"Speed-up: {scan_time / graph_time:.1f}x")
+    print(f"{missing} lookup(s) missing scanned countries; "
+          f"{extended} found extra operators via linked makers")
+    return 1 if missing else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark the snapshot history against keeping every snapshot whole.
+
+The fleet table (global_merged.feather, repeated --scale times with unique
+aircraft names) is snapshotted --weeks times, with --churn of the rows
+getting a new 'In Service' count each week. The baseline stores each
+week's full table and answers a query by reading the snapshots it needs
+(both ends for a diff, every week for a trend), the way a trend is built
+today from whole-file git revisions. The history side is
+aircombat.history. Both must give the same answers.
+
+Run from the repository root:
+    python -m benchmarks.bench_history --scale 100 --weeks 52
+"""
+
+import argparse
+import pathlib
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+
+from aircombat.history import History, plain_strings, row_keys
+from aircombat.store import read_feather
+from snapshot_history import fleet_from_csv
+
+DATA_DIR = pathlib.Path("data")
+
+
+def scaled_fleet(data_dir, scale):
+    fleet = plain_strings(feather.read_table(pathlib.Path(data_dir) / 'global_merged.feather'))
+    # Older committed files have 'In Service' as text; type it like merge_countries.py does
+    fleet = fleet_from_csv(fleet.cast(pa.schema([(name, pa.string()) for name in fleet.column_names])))
+    copies = []
+    for copy in range(scale):
+        table = fleet
+        if copy:
+            names = pa.array([f"{name} #{copy}" for name in table.column('Aircraft').to_pylist()], pa.string())
+            table = table.set_column(table.schema.get_field_index('Aircraft'), 'Aircraft', names)
+        copies.append(table)
+    return pa.concat_tables(copies)
+
+
+def weekly_tables(fleet, weeks, churn, seed):
+    """(date, table) per week; each week changes `churn` of the In Service counts"""
+    rng = random.Random(seed)
+    counts = fleet.column('In Service').to_pylist()
+    start = date(2026, 1, 4)
+    for week in range(weeks):
+        if week:
+            for row in rng.sample(range(len(counts)), max(1, int(len(counts) * churn))):
+                counts[row] = (counts[row] or 0) + rng.choice((-2, -1, 1, 2))
+        table = fleet.set_column(fleet.schema.get_field_index('In Service'), 'In Service',
+                                 pa.array(counts, pa.int32()))
+        yield (start + timedelta(weeks=week)).isoformat(), table
+
+
+def directory_bytes(path):
+    return sum(p.stat().st_size for p in pathlib.Path(path).rglob('*') if p.is_file())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark aircombat.history against full snapshots')
+    parser.add_argument('--data-dir', default=str(DATA_DIR))
+    parser.add_argument('--scale', type=int, default=10)
+    parser.add_argument('--weeks', type=int, default=52)
+    parser.add_argument('--churn', type=float, default=0.02, help='Share of rows changed per week')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    fleet = scaled_fleet(args.data_dir, args.scale)
+    with tempfile.TemporaryDirectory(prefix='bench_history_') as tmp:
+        tmp = pathlib.Path(tmp)
+        history = History(tmp / 'history')
+        full_dir = tmp / 'full'
+        full_dir.mkdir()
+        append_time = 0.0
+        dates = []
+        for day, table in weekly_tables(fleet, args.weeks, args.churn, args.seed):
+            dates.append(day)
+            start = time.perf_counter()
+            history.append('global_merged', table, day)
+            append_time += time.perf_counter() - start
+            feather.write_feather(table, full_dir / f'{day}.feather', compression='uncompressed')
+        print(f"{fleet.num_rows} rows x {args.weeks} weeks, churn {args.churn:.0%}; "
+              f"append {append_time / args.weeks * 1000:.1f} ms/snapshot")
+        print(f"storage: history {directory_bytes(tmp / 'history') / 1e6:.1f} MB, "
+              f"full snapshots {directory_bytes(full_dir) / 1e6:.1f} MB")
+
+        target_row = fleet.num_rows // 2
+        aircraft = fleet.column('Aircraft')[target_row].as_py()
+        country = fleet.column('country')[target_row].as_py()
+        since, until = dates[len(dates) // 4], dates[-1]
+
+        def timed(fn):
+            start = time.perf_counter()
+            result = fn()
+            return result, time.perf_counter() - start
+
+        def full_changes():
+            old, new = (read_feather(full_dir / f'{day}.feather') for day in (since, until))
+            old_rows = dict(zip(row_keys(old, ['country', 'Aircraft']), old.to_pylist()))
+            new_rows = dict(zip(row_keys(new, ['country', 'Aircraft']), new.to_pylist()))
+            return sorted(key for key in set(old_rows) | set(new_rows)
+                          if old_rows.get(key) != new_rows.get(key))
+
+        def full_trend():
+            values = []
+            for day in dates:
+                table = read_feather(full_dir / f'{day}.feather')
+                mask = pc.and_(pc.equal(table.column('Aircraft'), aircraft),
+                               pc.equal(table.column('country'), country))
+                values.append(table.filter(mask).column('In Service')[0].as_py())
+            return values
+
+        fresh = History(tmp / 'history')
+        history_diff, diff_time = timed(lambda: fresh.changes('global_merged', since, until))
+        baseline_diff, full_diff_time = timed(full_changes)
+        assert [change['key'] for change in history_diff] == baseline_diff, 'diffs differ'
+
+        fresh = History(tmp / 'history')
+        history_trend, trend_time = timed(lambda: fresh.trend(aircraft, country))
+        baseline_trend, full_trend_time = timed(full_trend)
+        assert [values.get(country) for _, values in history_trend] == baseline_trend, 'trends differ'
+
+    print(f"\n{'query':<34} {'history':>10} {'full':>10}")
+    print(f"{f'changes {since}..{until}':<34} {diff_time * 1000:>8.1f}ms {full_diff_time * 1000:>8.1f}ms"
+          f"  ({len(history_diff)} rows)")
+    print(f"{f'trend {aircraft[:20]}':<34} {trend_time * 1000:>8.1f}ms {full_trend_time * 1000:>8.1f}ms"
+          f"  ({len(history_trend)} dates)")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+End-to-end and per-stage timings of the data pipeline on synthetic data.
+
+For each scale, benchmarks.synth writes N× copies of the CSVs in data/ to
+a temporary directory, then this times:
+
+    merge_csvs, convert_to_feather.main (cold, then warm with the manifest),
+    each derived builder (summary, normalized, graph, search),
+    python -m aircombat.pipeline --offline (cold per stage, then warm),
+    update_csv_images via update_aircraft_images.main --dry-run against
+    benchmarks.mock_commons at the given latency, at each --image-concurrency,
+    then a real --thumbs run (cold, then warm) when Pillow is installed
+
+Results go to a JSON file (commit, environment, rows and seconds per
+scale) so runs on different commits can be compared with --compare.
+
+Run from the repository root:
+    python -m benchmarks.bench_pipeline --scales 10,100 --latency-ms 20
+    python -m benchmarks.bench_pipeline --scales 1000 --skip graph --image-rows 0
+    python -m benchmarks.bench_pipeline --compare bench_pipeline_abc1234.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import pathlib
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from benchmarks.mock_commons import MockCommons
+from benchmarks.synth import DATA_DIR, generate
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=pathlib.Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def timed(seconds, name, fn, *args, **kwargs):
+    """Run fn with its output swallowed; record and return its result"""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = fn(*args, **kwargs)
+    seconds[name] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def bench_scripts(data_dir, seconds, jobs, skip=()):
+    from build_country_summary import build_summary, write_summary
+    from build_crossref_graph import build_graph, write_graph
+    from build_normalized_tables import build_tables, write_tables
+    from build_search_index import load_documents, write_search_index
+    import convert_to_feather
+    from merge_countries import merge_csvs
+
+    timed(seconds, 'merge_csvs', merge_csvs, str(data_dir))
+    convert_args = ['--data-dir', str(data_dir), '--jobs', str(jobs)]
+    timed(seconds, 'convert (cold)', convert_to_feather.main, convert_args)
+    timed(seconds, 'convert (warm)', convert_to_feather.main, convert_args)
+    builders = {
+        'summary': lambda: write_summary(build_summary(data_dir), data_dir),
+        'normalized': lambda: write_tables(build_tables(data_dir)[0], data_dir),
+        'graph': lambda: write_graph(build_graph(data_dir), data_dir),
+        'search': lambda: write_search_index(load_documents(data_dir), data_dir),
+    }
+    for name, build in builders.items():
+        if name not in skip:
+            timed(seconds, name, build)
+
+
+def bench_pipeline(data_dir, seconds, jobs, skip=()):
+    from aircombat.pipeline import run_pipeline
+
+    for run in ('cold', 'warm'):
+        report = timed(seconds, f'pipeline ({run})', run_pipeline, data_dir, skip=list(skip),
+                       offline=True, jobs=jobs)
+        if run == 'cold':
+            for stage, status, stage_seconds, _ in report:
+                seconds[f'pipeline.{stage}'] = round(stage_seconds, 4)
+
+
+def bench_images(source_dir, work_dir, seconds, mock, rows, concurrency_levels):
+    """Image updater over the first `rows` photo rows of the scaled us.csv"""
+    import update_aircraft_images
+    from benchmarks.synth import read_rows, write_rows
+
+    fieldnames, all_rows = read_rows(source_dir / 'us.csv')
+    work_dir.mkdir(parents=True, exist_ok=True)
+    write_rows(work_dir / 'us.csv', fieldnames, all_rows[:rows])
+    requests = {}
+    for concurrency in concurrency_levels:
+        before = mock.requests
+        timed(seconds, f'images (concurrency {concurrency})', update_aircraft_images.main, [
+            '--data-dir', str(work_dir), '--api-url', mock.api_url, '--no-cache', '--dry-run',
+            '--rate', '0', '--per-host', str(concurrency), '--concurrency', str(concurrency)])
+        requests[str(concurrency)] = mock.requests - before
+
+    from aircombat import thumbnails
+    if thumbnails.available():
+        concurrency = max(concurrency_levels)
+        for run in ('cold', 'warm'):
+            before = mock.requests
+            timed(seconds, f'images+thumbs ({run})', update_aircraft_images.main, [
+                '--data-dir', str(work_dir), '--api-url', mock.api_url, '--no-cache', '--thumbs',
+                '--rate', '0', '--per-host', str(concurrency), '--concurrency', str(concurrency),
+                '--thumb-jobs', str(concurrency)])
+            requests[f'thumbs {run}'] = mock.requests - before
+    return min(rows, len(all_rows)), requests
+
+
+def compare(old_path, results):
+    old = json.loads(pathlib.Path(old_path).read_text(encoding='utf-8'))
+    print(f"\nCompared with {old_path} (commit {old.get('commit')}):")
+    print(f"{'scale':>6} {'step':<28} {'before':>10} {'after':>10} {'ratio':>7}")
+    for scale, entry in results['scales'].items():
+        before = old.get('scales', {}).get(scale, {}).get('seconds', {})
+        for name, after in entry['seconds'].items():
+            if name in before and before[name]:
+                print(f"{scale:>6} {name:<28} {before[name]:>9.3f}s {after:>9.3f}s "
+                      f"{after / before[name]:>6.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the data pipeline on synthetic data')
+    parser.add_argument('--data-dir', default=str(DATA_DIR), help='Real data the synthetic CSVs copy')
+    parser.add_argument('--scales', default='10,100', help='Comma-separated scales, e.g. 10,100,1000')
+    parser.add_argument('--jobs', type=int, default=1, help='Workers for convert_to_feather')
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='Mock Commons latency')
+    parser.add_argument('--dead-rate', type=float, default=0.3, help='Share of photos answering 404')
+    parser.add_argument('--image-rows', type=int, default=300,
+                        help='Rows fed to the image updater per scale (0 = skip it)')
+    parser.add_argument('--image-concurrency', default='1,8')
+    parser.add_argument('--skip', default='',
+                        help='Comma-separated derived stages to leave out (summary, normalized, graph, search)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None,
+                        help='JSON results path (default: bench_pipeline_<commit>.json)')
+    parser.add_argument('--compare', default=None, help='Earlier JSON results to compare against')
+    args = parser.parse_args(argv)
+
+    scales = [int(s) for s in args.scales.split(',') if s.strip()]
+    concurrency_levels = [int(c) for c in args.image_concurrency.split(',') if c.strip()]
+    skip = [name for name in args.skip.split(',') if name]
+    commit = git_commit()
+    results = {
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {'jobs': args.jobs, 'latency_ms': args.latency_ms, 'dead_rate': args.dead_rate,
+                     'image_rows': args.image_rows, 'image_concurrency': concurrency_levels,
+                     'seed': args.seed, 'skip': skip},
+        'scales': {},
+    }
+
+    with MockCommons(latency=args.latency_ms / 1000, dead_rate=args.dead_rate) as mock, \
+            tempfile.TemporaryDirectory(prefix='bench_pipeline_') as tmp:
+        for scale in scales:
+            root = pathlib.Path(tmp) / f'x{scale}'
+            seconds = {}
+            rows = timed(seconds, 'generate', generate, root / 'scripts', scale, args.data_dir,
+                         args.seed, mock.base_url)
+            shutil.copytree(root / 'scripts', root / 'pipeline')
+
+            bench_scripts(root / 'scripts', seconds, args.jobs, skip)
+            bench_pipeline(root / 'pipeline', seconds, args.jobs, skip)
+            entry = {'rows': rows, 'seconds': seconds}
+            if args.image_rows:
+                entry['image_rows'], entry['image_requests'] = bench_images(
+                    root / 'scripts', root / 'images', seconds, mock, args.image_rows,
+                    concurrency_levels)
+            results['scales'][str(scale)] = entry
+            shutil.rmtree(root)
+
+            print(f"\n{scale}× ({sum(rows.values())} CSV rows)")
+            for name, value in seconds.items():
+                print(f"  {name:<28} {value:>9.3f}s")
+
+    output = pathlib.Path(args.output or f'bench_pipeline_{commit}.json')
+    output.write_text(json.dumps(results, indent=2) + '\n', encoding='utf-8')
+    print(f"\nResults written to {output}")
+    if args.compare:
+        compare(args.compare, results)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark aircombat.scoring batch sweeps against a row-by-row loop.
+
+The loop scores one country under one weighting at a time, the way the
+spreadsheet does, then ranks each weighting with sorted(). Mean ranks
+from both paths must agree.
+
+Run from the repository root:
+    python -m benchmarks.bench_scoring --samples 200000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from aircombat import scoring
+
+
+def loop_mean_ranks(rows, weight_matrix):
+    totals = [0] * len(rows)
+    for weights in weight_matrix.tolist():
+        scores = [sum(w * s for w, s in zip(weights, row)) for row in rows]
+        order = sorted(range(len(rows)), key=lambda i: -scores[i])
+        for rank, i in enumerate(order, start=1):
+            totals[i] += rank
+    return np.array(totals) / len(weight_matrix)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark LI weight sweeps')
+    parser.add_argument('--calcs', default=str(scoring.DATA_DIR / 'calcs.csv'))
+    parser.add_argument('--samples', type=int, default=100000)
+    parser.add_argument('--loop-samples', type=int, default=5000,
+                        help='Weightings timed with the pure-Python loop')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    if args.samples < 1 or args.loop_samples < 1:
+        parser.error('--samples and --loop-samples must be at least 1')
+
+    matrix = scoring.subscore_matrix(scoring.load_calcs(args.calcs))
+    batch = scoring.random_weights(args.samples, spread=0.2, seed=args.seed)
+    print(f"{len(matrix)} countries, {args.samples} weightings")
+
+    start = time.perf_counter()
+    per_country, _ = scoring.rank_stability(matrix, batch)
+    vector_time = time.perf_counter() - start
+
+    loop_batch = batch[:args.loop_samples]
+    start = time.perf_counter()
+    loop_ranks = loop_mean_ranks(matrix.tolist(), loop_batch)
+    loop_time = time.perf_counter() - start
+    check, _ = scoring.rank_stability(matrix, loop_batch)
+
+    vector_rate = args.samples / vector_time
+    loop_rate = len(loop_batch) / loop_time
+    print(f"{'numpy rank_stability':<28} {vector_time:>8.3f}s  {vector_rate:>12,.0f} weightings/s")
+    print(f"{'python loop':<28} {loop_time:>8.3f}s  {loop_rate:>12,.0f} weightings/s "
+          f"(n={len(loop_batch)})")
+    print(f"Speed-up: {vector_rate / loop_rate:.0f}x")
+
+    if not np.allclose(check['mean rank'].to_numpy(), loop_ranks, atol=1e-3):
+        print("MISMATCH between the loop and the vectorized mean ranks")
+        return 1
+    print("Mean ranks identical on the shared sample")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
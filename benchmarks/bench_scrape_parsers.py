@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Benchmark and golden-output check for the scraper's HTML parser backends.
+
+Every backend in scrape_aircraft.PARSER_BACKENDS that is installed is
+timed against the original full-tree BeautifulSoup parse (kept below) on
+a synthetic Fandom-style page, plus any recorded pages passed with
+--pages. Rows from every backend must equal the original output exactly.
+
+Run from the repository root:
+    python -m benchmarks.bench_scrape_parsers --rows 2000
+    python -m benchmarks.bench_scrape_parsers --pages saved/us.html saved/uk.html
+"""
+
+import argparse
+import pathlib
+import random
+import sys
+import time
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+import scrape_aircraft as sa
+
+PAGE_URL = 'https://military-history.fandom.com/wiki/List_of_active_aircraft'
+
+
+def legacy_image_url(cell, page_url):
+    img = cell.find('img')
+    if not img:
+        return ''
+    src = img.get('src') or ''
+    if not src or src.startswith('data:'):
+        src = img.get('data-src') or src
+    if not src or src.startswith('data:'):
+        return ''
+    return urljoin(page_url, src)
+
+
+def legacy_parse_tables(html, source):
+    """The full-document BeautifulSoup parse this benchmark replaced"""
+    soup = BeautifulSoup(html, 'html.parser')
+    tables = soup.select(source.get('table_selector', sa.DEFAULT_TABLE_SELECTOR))
+    if not tables:
+        tables = soup.find_all('table')
+
+    aliases = sa.source_aliases(source)
+    rows = []
+    for table in tables:
+        trs = table.find_all('tr')
+        if not trs:
+            continue
+        header_cells = [cell.get_text(strip=True) for cell in trs[0].find_all(['th', 'td'])]
+        mapping = sa.resolve_columns(header_cells, aliases)
+        if mapping is None:
+            continue
+
+        for tr in trs[1:]:
+            cells = tr.find_all(['td', 'th'])
+            if len(cells) <= mapping['Aircraft']:
+                continue
+            aircraft = cells[mapping['Aircraft']].get_text(strip=True)
+            if not aircraft:
+                continue
+
+            row = {column: '' for column in sa.OUTPUT_COLUMNS}
+            for column, index in mapping.items():
+                if index >= len(cells):
+                    continue
+                if column == 'Photo':
+                    row[column] = legacy_image_url(cells[index], source['url'])
+                else:
+                    row[column] = cells[index].get_text(strip=True)
+            rows.append(row)
+    return rows
+
+
+def synthetic_page(rows, seed=0):
+    """A large wiki page: navigation chrome, scripts and comments around a
+    wikitable whose cells carry links, footnotes and lazy-loaded images"""
+    rng = random.Random(seed)
+    chrome = ''.join(
+        f'<div class="nav"><ul>{"".join(f"<li><a href=/wiki/P{i}_{j}>Page {j}</a></li>" for j in range(20))}'
+        f'</ul><script>var x{i} = "<td>not a cell</td>";</script></div>'
+        for i in range(rows // 10 + 1))
+    types = ['Fighter', 'Bomber', 'Transport', 'Trainer', 'Helicopter', 'UAV']
+    body_rows = []
+    for i in range(rows):
+        if i % 3:
+            photo = (f'<img src="data:image/gif;base64,R0lGOD" '
+                     f'data-src="https://static.wikia.nocookie.net/img/A{i}.jpg" alt="">')
+        else:
+            photo = f'<a href="/wiki/File:A{i}.jpg"><img src="/images/A{i}.jpg"></a>'
+        body_rows.append(
+            '<tr>'
+            f'<td><a href="/wiki/A{i}">Aircraft&nbsp;{i}</a><sup class="reference">[{i % 7}]</sup>'
+            f'<!-- note {i} --></td>'
+            f'<td>{photo}</td>'
+            f'<td><span>Country {rng.randint(1, 40)}</span></td>'
+            f'<td>{rng.choice(types)} <style>.c{i}{{}}</style></td>'
+            f'<td>V{i}-A, V{i}-B</td>'
+            f'<td>{rng.randint(0, 500)}<sup>[1]</sup></td>'
+            '</tr>')
+    table = ('<table class="wikitable sortable"><tbody><tr><th>Aircraft</th><th>Photo</th>'
+             '<th>Origin</th><th>Type</th><th>Versions</th><th>In service</th></tr>'
+             + ''.join(body_rows) + '</tbody></table>')
+    other_table = '<table class="infobox"><tr><td>Unrelated</td></tr></table>'
+    html = (f'<!DOCTYPE html><html><head><title>Aircraft</title><script>{"var a=1;" * 500}</script>'
+            f'</head><body>{chrome}{other_table}{table}{chrome}</body></html>')
+    return html.encode('utf-8')
+
+
+def best_of(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark scraper parser backends')
+    parser.add_argument('--rows', type=int, default=1000, help='Rows in the synthetic page')
+    parser.add_argument('--pages', nargs='*', default=[], help='Recorded HTML pages to include')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    pages = [('synthetic', synthetic_page(args.rows))]
+    pages += [(pathlib.Path(p).name, pathlib.Path(p).read_bytes()) for p in args.pages]
+    source = {'code': 'bench', 'url': PAGE_URL}
+
+    backends = []
+    for name in sa.PARSER_BACKENDS:
+        try:
+            backends.append(sa.get_parser_backend(name))
+        except ImportError:
+            print(f"{name}: not installed, skipped")
+
+    mismatches = 0
+    for label, html in pages:
+        legacy_time, expected = best_of(lambda: legacy_parse_tables(html, source), args.repeat)
+        print(f"\n{label}: {len(html) / 1e6:.2f} MB, {len(expected)} rows")
+        print(f"  {'legacy bs4 full tree':<22} {legacy_time:>8.4f}s")
+        for backend in backends:
+            elapsed, rows = best_of(lambda: sa.parse_tables(html, source, backend), args.repeat)
+            same = rows == expected
+            mismatches += not same
+            print(f"  {backend.name:<22} {elapsed:>8.4f}s  {legacy_time / elapsed:>6.1f}x  "
+                  f"{'identical' if same else 'MISMATCH'}")
+
+    if mismatches:
+        print(f"\n{mismatches} backend/page combination(s) differ from the legacy output")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
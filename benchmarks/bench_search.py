@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark the BM25 search index against pandas str.contains.
+
+The baseline is what a substring filter over the same columns costs:
+one case-insensitive str.contains per column per query. The index side
+is SearchIndex.match, which finds and scores every matching document.
+--scale repeats the corpus to see how both grow. Every row the substring
+scan finds on word boundaries must also come back from the index.
+
+Run from the repository root:
+    python -m benchmarks.bench_search --scale 10
+"""
+
+import argparse
+import pathlib
+import re
+import tempfile
+import time
+
+import pandas as pd
+
+from aircombat.search import FIELDS, SearchIndex, write_index
+from build_search_index import DATA_DIR, build_index, load_documents
+
+QUERIES = ['"AN/APG-82(V)1"', '"Link-16"', '"green pine"', '"two-way datalink"',
+           '"AIM-120D"', '"PL-15"', '"Meteor"', '"IRST"']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark aircombat.search against str.contains')
+    parser.add_argument('--data-dir', default=str(DATA_DIR))
+    parser.add_argument('--scale', type=int, default=1, help='Repeat the corpus this many times')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args(argv)
+
+    documents = load_documents(args.data_dir) * args.scale
+    start = time.perf_counter()
+    header, arrays = build_index(documents)
+    build_time = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = pathlib.Path(tmp) / 'search_index.bin'
+        write_index(path, header, arrays)
+        start = time.perf_counter()
+        index = SearchIndex(path)
+        load_time = time.perf_counter() - start
+        size = path.stat().st_size
+    print(f"{len(documents)} documents; build {build_time:.3f}s, load {load_time * 1000:.1f} ms, "
+          f"{size} bytes")
+
+    frame = pd.DataFrame([{field: fields.get(field) for field in FIELDS}
+                          for _, _, _, fields in documents])
+
+    def scan(text):
+        pattern = re.escape(text)
+        found = pd.Series(False, index=frame.index)
+        for field in FIELDS:
+            found |= frame[field].str.contains(pattern, case=False, regex=True, na=False)
+        return set(found[found].index)
+
+    missing = 0
+    print(f"\n{'query':<22} {'hits':>6} {'str.contains':>14} {'index':>12} {'speed-up':>9}")
+    for query in QUERIES:
+        text = query.strip('"')
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            expected = scan(text)
+        scan_time = (time.perf_counter() - start) / args.repeat
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            hits, _ = index.match(query)
+        search_time = (time.perf_counter() - start) / args.repeat
+
+        titles = {tuple(documents[doc][:3]) for doc in hits}
+        # Substring hits inside longer words ('IRST' in 'first') are not tokens
+        word = re.compile(rf'(?<![^\W_]){re.escape(text)}(?![^\W_])', re.IGNORECASE)
+        expected = {tuple(documents[doc][:3]) for doc in expected
+                    if any(word.search(value) for value in documents[doc][3].values())}
+        missing += len(expected - titles)
+        print(f"{query:<22} {len(hits):>6} {scan_time * 1000:>11.3f} ms {search_time * 1000:>9.3f} ms "
+              f"{scan_time / search_time:>8.1f}x")
+    print(f"\n{missing} word-boundary substring hit(s) missing from the index")
+    return 1 if missing else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark aircombat.store lookups against naive pandas filtering.
+
+Run from the repository root:
+    python -m benchmarks.bench_store --lookups 5000
+"""
+
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from aircombat.store import DataStore, DATA_DIR
+
+
+def timed(label, fn, lookups):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {elapsed:>9.4f}s  {elapsed / lookups * 1e6:>10.1f} µs/lookup")
+    return elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark aircombat.store against pandas')
+    parser.add_argument('--data-dir', default=str(DATA_DIR))
+    parser.add_argument('--lookups', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    merged_csv = f"{args.data_dir}/global_merged.csv"
+
+    build_start = time.perf_counter()
+    store = DataStore(args.data_dir)
+    print(f"Store open + index build: {time.perf_counter() - build_start:.4f}s")
+
+    countries = sorted(set(store.fleet.column('country').to_pylist()))
+    companies = sorted({c for c in store.fleet.column('Company').to_pylist() if c})
+    queries = [(rng.choice(countries), rng.choice(companies)) for _ in range(args.lookups)]
+
+    def store_lookups():
+        for country, company in queries:
+            store.fleet_by_country(country)
+            store.aircraft_by_company(company)
+
+    df = pd.read_csv(merged_csv)
+
+    def pandas_preloaded():
+        for country, company in queries:
+            df[df['country'] == country]
+            df[df['Company'] == company]
+
+    reload_queries = queries[:max(1, args.lookups // 50)]
+
+    def pandas_reload():
+        # What the ad-hoc tooling does today: re-read the CSV per lookup
+        for country, company in reload_queries:
+            frame = pd.read_csv(merged_csv)
+            frame[frame['country'] == country]
+            frame[frame['Company'] == company]
+
+    print(f"\n{args.lookups} country + company lookup pairs")
+    t_store = timed('aircombat.store (hash index)', store_lookups, args.lookups)
+    t_pandas = timed('pandas boolean mask (preloaded)', pandas_preloaded, args.lookups)
+    t_reload = timed(f'pandas read_csv per lookup (n={len(reload_queries)})',
+                     pandas_reload, len(reload_queries))
+    print(f"\nSpeed-up vs preloaded pandas: {t_pandas / t_store:.1f}x")
+    print(f"Speed-up vs read_csv per lookup: "
+          f"{(t_reload / len(reload_queries)) / (t_store / args.lookups):.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for Wikimedia Commons, for benchmarking update_aircraft_images.
+
+Serves the two things the updater talks to, with a fixed per-request
+latency:
+
+    /w/api.php                          imageinfo (batched titles) and search
+    /upload.wikimedia.org/wikipedia/... photo HEAD/GET; a deterministic
+                                        `dead_rate` share answer 404
+
+Photos are real PNGs (so the thumbnail mirror can decode them) with an
+ETag honoured by If-None-Match. Synthetic copies of one photo ('_s7')
+get identical bytes, like rows that share an airframe picture.
+
+Photo URLs in synthetic CSVs point here via `python -m benchmarks.synth
+--photo-base http://127.0.0.1:PORT`; the path keeps 'upload.wikimedia.org'
+so the updater still treats them as Wikimedia photos. URLs the API hands
+out are always live.
+
+    python -m benchmarks.mock_commons --port 8770 --latency-ms 50
+"""
+
+import argparse
+import functools
+import hashlib
+import json
+import re
+import struct
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlparse
+
+UPLOAD_PREFIX = '/upload.wikimedia.org/wikipedia/commons/'
+IMAGE_SIZE = (960, 640)
+SYNTH_COPY = re.compile(r'_s\d+(?=\.\w+$)')
+
+
+@functools.lru_cache(maxsize=1024)
+def png_image(seed, size=IMAGE_SIZE):
+    """A gradient PNG whose colours depend on `seed`"""
+    width, height = size
+    digest = hashlib.sha1(seed.encode('utf-8')).digest()
+    rows = []
+    for y in range(height):
+        row = bytearray(b'\0')
+        shade = y * 255 // max(1, height - 1)
+        for x in range(width):
+            row += bytes(((digest[0] + x) & 255, (digest[1] + shade) & 255, (digest[2] + x + shade) & 255))
+        rows.append(bytes(row))
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(b''.join(rows), 6))
+            + chunk(b'IEND', b''))
+
+
+class MockCommons:
+    """Threaded mock server; use as a context manager or start()/stop()"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, dead_rate=0.3):
+        self.latency = latency
+        self.dead_rate = dead_rate
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_url(self):
+        return f"{self.base_url}/w/api.php"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def is_dead(self, path):
+        if '/thumb/mock/' in path:
+            return False
+        digest = int(hashlib.sha1(path.encode('utf-8')).hexdigest()[:8], 16)
+        return digest % 1000 < self.dead_rate * 1000
+
+    def live_url(self, filename):
+        name = quote(filename.replace(' ', '_'))
+        return f"{self.base_url}{UPLOAD_PREFIX}thumb/mock/{name}/1280px-{name}"
+
+    def api(self, params):
+        query = {}
+        if params.get('list') == 'search':
+            term = params.get('srsearch', '').strip('"').split('"')[0]
+            query['search'] = [{'title': f"File:{term.replace(' ', '_')}_mock.jpg"}]
+        elif params.get('prop') == 'imageinfo':
+            titles = params.get('titles', '').split('|')
+            # Like the real API: titles come back normalized with spaces
+            query['normalized'] = [{'from': t, 'to': t.replace('_', ' ')} for t in titles if '_' in t]
+            query['pages'] = {
+                str(-i - 1): {'title': t.replace('_', ' '),
+                              'imageinfo': [{'url': self.live_url(t[5:]), 'thumburl': self.live_url(t[5:])}]}
+                for i, t in enumerate(titles)}
+        return {'batchcomplete': '', 'query': query}
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, content_type, body, head=False, etag=None):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                if etag:
+                    self.send_header('ETag', etag)
+                self.end_headers()
+                if not head:
+                    self.wfile.write(body)
+
+            def _serve(self, head):
+                with mock.lock:
+                    mock.requests += 1
+                if mock.latency:
+                    time.sleep(mock.latency)
+                url = urlparse(self.path)
+                if url.path == '/w/api.php':
+                    params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                    body = json.dumps(mock.api(params)).encode('utf-8')
+                    self._reply(200, 'application/json', body, head)
+                elif url.path.startswith(UPLOAD_PREFIX) and not mock.is_dead(url.path):
+                    body = png_image(SYNTH_COPY.sub('', url.path.rsplit('/', 1)[-1]))
+                    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                    if self.headers.get('If-None-Match') == etag:
+                        self._reply(304, 'image/png', b'', head=True, etag=etag)
+                    else:
+                        self._reply(200, 'image/png', body, head, etag)
+                else:
+                    self._reply(404, 'text/html', b'Not Found', head)
+
+            def do_GET(self):
+                self._serve(head=False)
+
+            def do_HEAD(self):
+                self._serve(head=True)
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve a mock Wikimedia Commons')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8770)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--dead-rate', type=float, default=0.3,
+                        help='Share of original photo URLs that answer 404')
+    args = parser.parse_args(argv)
+
+    mock = MockCommons(args.host, args.port, args.latency_ms / 1000, args.dead_rate)
+    print(f"Mock Commons on {mock.base_url} (API {mock.api_url}); Ctrl-C to stop")
+    try:
+        mock.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Schema-faithful synthetic data at N× the size of data/.
+
+Every country CSV, calcs.csv, products.csv and company.csv is written with
+its real header and column order; rows are the real rows repeated `scale`
+times with the identifying names made unique (' #7' suffixes, '_s7' photo
+filenames, new calcs countries and flag codes), so parsers, joins and the
+text grammar see the same shapes at a bigger size. The A–G sub-scores of
+repeated calcs rows get a little noise (LI and FPS recomputed to match) so
+rankings are not all ties.
+
+Run from the repository root:
+    python -m benchmarks.synth --scale 100 --output /tmp/synth100
+"""
+
+import argparse
+import csv
+import pathlib
+import random
+import re
+
+from aircombat.scoring import DEFAULT_WEIGHTS, FPS_SCALE, SUBSCORES
+
+DATA_DIR = pathlib.Path("data")
+SCALES = [10, 100, 1000]
+
+COUNTRY_CSV = re.compile(r'^[a-z]{2,4}\.csv$')
+SUPPORT_CSVS = {'calcs.csv': 'Country', 'products.csv': 'Product', 'company.csv': 'Company'}
+WIKIMEDIA = 'https://upload.wikimedia.org'
+PHOTO_FILE = re.compile(r'([^/]+?)(\.\w+)$')
+
+
+def read_rows(path):
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.DictReader(f)
+        return reader.fieldnames, list(reader)
+
+
+def write_rows(path, fieldnames, rows):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def synthetic_photo(url, copy, photo_base=None):
+    """Give copy N its own filename; optionally point the host at photo_base"""
+    if not url:
+        return url
+    if copy:
+        url = PHOTO_FILE.sub(lambda m: f'{m.group(1)}_s{copy}{m.group(2)}', url)
+    if photo_base and url.startswith(WIKIMEDIA):
+        url = f"{photo_base.rstrip('/')}/upload.wikimedia.org{url[len(WIKIMEDIA):]}"
+    return url
+
+
+def scale_rows(rows, scale, key, photo_base=None):
+    """rows repeated `scale` times; copy N > 0 gets ' #N' on its key column"""
+    scaled = []
+    for copy in range(scale):
+        for row in rows:
+            row = dict(row)
+            if copy and row.get(key):
+                row[key] = f"{row[key]} #{copy}"
+            if 'Photo' in row:
+                row['Photo'] = synthetic_photo(row['Photo'], copy, photo_base)
+            scaled.append(row)
+    return scaled
+
+
+def scale_calcs(rows, scale, rng):
+    """calcs rows for `scale`× as many countries, each with its own flag code"""
+    scaled = []
+    for copy in range(scale):
+        for row in rows:
+            row = dict(row)
+            if copy:
+                row['Country'] = f"{row['Country']} #{copy}"
+                row['Flag Abbrev'] = f"{(row.get('Flag Abbrev') or 'xx').strip()}{copy}"
+                try:
+                    values = [min(round(float(row[name]) * rng.uniform(0.9, 1.1)), 100)
+                              for name in SUBSCORES]
+                except (KeyError, TypeError, ValueError):
+                    values = None
+                if values:
+                    # Keep LI/FPS consistent with the new sub-scores, as check_calcs expects
+                    li = sum(DEFAULT_WEIGHTS[name] * value for name, value in zip(SUBSCORES, values))
+                    row.update(zip(SUBSCORES, map(str, values)))
+                    row['LI'] = f"{li:.1f}"
+                    row['FPS'] = str(round(li * FPS_SCALE))
+            row['ID'] = str(len(scaled) + 1)
+            scaled.append(row)
+    return scaled
+
+
+def generate(output, scale, data_dir=DATA_DIR, seed=0, photo_base=None):
+    """Write the scaled CSVs to `output`; returns {file name: rows written}"""
+    data_dir = pathlib.Path(data_dir)
+    output = pathlib.Path(output)
+    output.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+
+    written = {}
+    for path in sorted(data_dir.glob('*.csv')):
+        if path.name in SUPPORT_CSVS:
+            fieldnames, rows = read_rows(path)
+            if path.name == 'calcs.csv':
+                rows = scale_calcs(rows, scale, rng)
+            else:
+                rows = scale_rows(rows, scale, SUPPORT_CSVS[path.name])
+        elif COUNTRY_CSV.match(path.name):
+            fieldnames, rows = read_rows(path)
+            rows = scale_rows(rows, scale, 'Aircraft', photo_base)
+        else:
+            continue
+        write_rows(output / path.name, fieldnames, rows)
+        written[path.name] = len(rows)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate scaled synthetic CSVs from data/')
+    parser.add_argument('--data-dir', default=str(DATA_DIR))
+    parser.add_argument('--scale', type=int, default=10)
+    parser.add_argument('--output', required=True)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--photo-base', default=None,
+                        help='Rewrite upload.wikimedia.org photos to this base URL (e.g. a mock server)')
+    args = parser.parse_args(argv)
+
+    written = generate(args.output, args.scale, args.data_dir, args.seed, args.photo_base)
+    for name, rows in written.items():
+        print(f"{name:<16} {rows:>9} rows")
+    print(f"\n{sum(written.values())} rows in {len(written)} file(s) at {args.scale}× → {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Per-country summary builder
+Precomputes what the globe/ranking pages derive on every load from
+global_merged.feather and calcs.feather: manned and unmanned fleet totals,
+the aircraft-type breakdown, LI rank and the file-code → flag-code map.
+Writes a small uncompressed data/country_summary.feather.
+"""
+
+import argparse
+import os
+import pathlib
+import sys
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+
+from aircombat.store import FILE_CODE_TO_FLAG, FLAG_TO_FILE_CODE
+from merge_countries import LEADING_INT
+
+DATA_DIR = pathlib.Path("data")
+OUTPUT_NAME = "country_summary.feather"
+
+TYPE_BREAKDOWN = pa.list_(pa.struct([('Type', pa.string()), ('count', pa.int32())]))
+
+
+def in_service_counts(column):
+    """In Service as int32, whether the merged file is typed or all-string"""
+    if pa.types.is_integer(column.type):
+        return pc.cast(column, pa.int32())
+    column = pc.cast(column, pa.string())
+    return pc.cast(pc.struct_field(pc.extract_regex(column, LEADING_INT), 'n'), pa.int32())
+
+
+def fleet_totals(fleet):
+    """Per file code: manned/unmanned counts and {type: count} breakdown.
+
+    Mirrors the pages: rows need an Aircraft and an In Service count (0 is
+    kept, so planned types still appear), and only Manned == 'Yes' counts
+    toward the fleet total.
+    """
+    codes = pc.cast(fleet.column('country'), pa.string()).to_pylist()
+    aircraft = fleet.column('Aircraft').to_pylist()
+    counts = in_service_counts(fleet.column('In Service')).to_pylist()
+    manned = fleet.column('Manned').to_pylist()
+    types = fleet.column('Type').to_pylist()
+
+    totals = {}
+    for code, name, count, is_manned, ac_type in zip(codes, aircraft, counts, manned, types):
+        entry = totals.setdefault(code, {'manned': 0, 'unmanned': 0, 'types': {}})
+        if not name or count is None:
+            continue
+        if is_manned == 'Yes':
+            entry['manned'] += count
+        else:
+            entry['unmanned'] += count
+        ac_type = (ac_type or 'Unknown').strip()
+        entry['types'][ac_type] = entry['types'].get(ac_type, 0) + count
+    return totals
+
+
+def build_summary(data_dir=DATA_DIR, inputs=None):
+    """Return the per-country summary as an Arrow table, ordered by rank.
+
+    `inputs` may hold already-loaded 'global_merged' and 'calcs' tables
+    (typed or all-string); anything missing is read from data_dir.
+    """
+    data_dir = pathlib.Path(data_dir)
+    inputs = inputs or {}
+    fleet = inputs['global_merged'] if 'global_merged' in inputs else \
+        feather.read_table(data_dir / 'global_merged.feather')
+    calcs = inputs['calcs'] if 'calcs' in inputs else feather.read_table(data_dir / 'calcs.feather')
+
+    totals = fleet_totals(fleet)
+
+    calcs_by_flag = {}
+    for name, flag, li in zip(calcs.column('Country').to_pylist(),
+                              calcs.column('Flag Abbrev').to_pylist(),
+                              calcs.column('LI').to_pylist()):
+        if flag:
+            calcs_by_flag[flag.strip().lower()] = ((name or '').strip(), float(li or 0))
+
+    codes = list(FILE_CODE_TO_FLAG)
+    codes += sorted(set(totals) - set(codes))
+    codes += sorted(FLAG_TO_FILE_CODE.get(f, f) for f in calcs_by_flag
+                    if FLAG_TO_FILE_CODE.get(f, f) not in codes)
+
+    rows = []
+    for code in codes:
+        flag = FILE_CODE_TO_FLAG.get(code, code)
+        name, li = calcs_by_flag.get(flag, ('', 0.0))
+        entry = totals.get(code, {'manned': 0, 'unmanned': 0, 'types': {}})
+        breakdown = sorted(entry['types'].items(), key=lambda kv: (-kv[1], kv[0]))
+        rows.append({
+            'country': code,
+            'flag_code': flag,
+            'Country': name,
+            'LI': li,
+            'manned_count': entry['manned'],
+            'unmanned_count': entry['unmanned'],
+            'types': [{'Type': t, 'count': n} for t, n in breakdown],
+        })
+
+    # Same ordering as the pages: LI descending, stable on ties
+    rows.sort(key=lambda r: -r['LI'])
+    for rank, row in enumerate(rows, start=1):
+        row['rank'] = rank
+
+    schema = pa.schema([
+        ('rank', pa.int32()),
+        ('country', pa.string()),
+        ('flag_code', pa.string()),
+        ('Country', pa.string()),
+        ('LI', pa.float64()),
+        ('manned_count', pa.int32()),
+        ('unmanned_count', pa.int32()),
+        ('types', TYPE_BREAKDOWN),
+    ])
+    return pa.Table.from_pylist(rows, schema=schema)
+
+
+def write_summary(summary, data_dir=DATA_DIR):
+    output_path = pathlib.Path(data_dir) / OUTPUT_NAME
+    tmp = output_path.with_name(output_path.name + '.tmp')
+    # Uncompressed for the Arrow JS reader, like every other Feather file here
+    feather.write_feather(summary, tmp, compression='uncompressed')
+    os.replace(tmp, output_path)
+    print(f"Wrote {summary.num_rows} countries to {output_path} "
+          f"({output_path.stat().st_size} bytes)")
+    return output_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the per-country summary Feather file')
+    parser.add_argument('--data-dir', default=str(DATA_DIR))
+    args = parser.parse_args(argv)
+
+    data_dir = pathlib.Path(args.data_dir)
+    if not data_dir.exists():
+        print(f"{data_dir} directory not found!")
+        return 1
+
+    write_summary(build_summary(data_dir), data_dir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
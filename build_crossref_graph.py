@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Aircraft–product–company–country cross-reference graph builder
+Resolves every relationship the pages work out at click time (fleet rows,
+'Associated products' lists, makers, company home countries and the calcs
+Sell/Buy lists) once, with fuzzy name matching ('AIM-120D-3' is the
+'AIM-120D-3 AMRAAM' product), and writes the CSR adjacency artifact read
+by aircombat/graph.py:
+
+    data/graph_nodes.feather   id, kind, name, key, code, offset, degree
+    data/graph_edges.feather   target, kind
+
+Runs after merge_countries.py.
+"""
+
+import argparse
+import os
+import pathlib
+import re
+import sys
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+
+from aircombat.datafiles import load_inputs
+from aircombat.graph import EDGE_KINDS, NODE_KINDS, new_resolvers, normalize_name
+from aircombat.parsing import parse_list
+from aircombat.store import FLAG_TO_FILE_CODE
+
+DATA_DIR = pathlib.Path("data")
+
+# 'Dassault Aviation / Airbus (FCAS)', 'France / Germany / Spain'; a slash
+# inside parentheses ('AVIC (CAIG / parent)') does not split
+SLASH_LIST = re.compile(r'\s+/\s+(?![^(]*\))')
+# calcs Sell/Buy: 'Australia-Canada-South Korea'
+DASH_LIST = re.compile(r'\s*-\s*')
+
+
+def split(pattern, text):
+    return [part.strip() for part in pattern.split(text or '') if part.strip()]
+
+
+class GraphBuilder:
+    """Accumulates nodes and edges; names go through one resolver per kind"""
+
+    def __init__(self):
+        self.kinds = []
+        self.names = []
+        self.codes = []
+        self.edges = set()
+        self.resolvers = new_resolvers()
+        self.stats = {'resolved': 0, 'created': 0}
+
+    def add(self, kind, name, code=None):
+        node = len(self.names)
+        self.kinds.append(kind)
+        self.names.append(name)
+        self.codes.append(code)
+        self.resolvers[kind].add(name, node)
+        return node
+
+    def resolve(self, name, kinds, create=None):
+        """Resolve `name` against the resolvers for `kinds`, in order;
+        when nothing matches, add it as a new `create` node (or return None)"""
+        for kind in kinds:
+            node = self.resolvers[kind].resolve(name)
+            if node is not None:
+                self.stats['resolved'] += 1
+                return node
+        if create is None:
+            return None
+        self.stats['created'] += 1
+        return self.add(create, name)
+
+    def link(self, source, kind, target):
+        if source is None or target is None or source == target:
+            return
+        self.edges.add((source, kind, target))
+        self.edges.add((target, EDGE_KINDS[kind], source))
+
+    def tables(self):
+        """(nodes, edges) Arrow tables in CSR order"""
+        ordered = sorted(self.edges)
+        degree = [0] * len(self.names)
+        for source, _, _ in ordered:
+            degree[source] += 1
+        offsets, total = [], 0
+        for count in degree:
+            offsets.append(total)
+            total += count
+
+        nodes = pa.table({
+            'id': pa.array(range(len(self.names)), pa.int32()),
+            'kind': pa.DictionaryArray.from_arrays(
+                pa.array([NODE_KINDS.index(k) for k in self.kinds], pa.int8()), pa.array(NODE_KINDS)),
+            'name': pa.array(self.names, pa.string()),
+            'key': pa.array([normalize_name(n) for n in self.names], pa.string()),
+            'code': pa.array(self.codes, pa.string()),
+            'offset': pa.array(offsets, pa.int32()),
+            'degree': pa.array(degree, pa.int32()),
+        })
+        edge_kinds = list(EDGE_KINDS)
+        edges = pa.table({
+            'target': pa.array([target for _, _, target in ordered], pa.int32()),
+            'kind': pa.DictionaryArray.from_arrays(
+                pa.array([edge_kinds.index(kind) for _, kind, _ in ordered], pa.int8()),
+                pa.array(edge_kinds)),
+        })
+        return nodes, edges
+
+
+def build_graph(data_dir=DATA_DIR, inputs=None):
+    """Return a populated GraphBuilder for the CSVs in data_dir.
+
+    `inputs` may hold already-loaded calcs, products, company and
+    global_merged tables.
+    """
+    loaded = load_inputs(data_dir, ['calcs', 'products', 'company', 'global_merged'], inputs)
+    calcs = loaded['calcs'].to_pylist()
+    products = loaded['products'].to_pylist()
+    companies = loaded['company'].to_pylist()
+    fleet = loaded['global_merged']
+    fleet = fleet.set_column(fleet.schema.get_field_index('country'), 'country',
+                             pc.cast(fleet.column('country'), pa.string())).to_pylist()
+
+    graph = GraphBuilder()
+
+    # Canonical entities first, so mentions resolve onto them
+    countries = {}
+    calcs_codes = []
+    for row in calcs:
+        flag = (row.get('Flag Abbrev') or '').strip().lower()
+        code = FLAG_TO_FILE_CODE.get(flag, flag)
+        countries[code] = graph.add('country', row['Country'].strip(), code)
+        calcs_codes.append(code)
+    for row in fleet:
+        if row['country'] not in countries:
+            countries[row['country']] = graph.add('country', row['country'], row['country'])
+
+    for row in companies:
+        node = graph.add('company', row['Company'].strip())
+        for name in split(SLASH_LIST, row.get('Country')):
+            graph.link(node, 'based_in', graph.resolve(name, ['country'], create='country'))
+
+    aircraft_rows = []
+    for row in fleet:
+        name = (row.get('Aircraft') or '').strip()
+        if not name:
+            continue
+        # Fleet names are already canonical; only exact repeats merge
+        node = graph.resolvers['aircraft'].resolve(name, fuzzy=False)
+        if node is None:
+            node = graph.add('aircraft', name)
+        aircraft_rows.append((node, row))
+
+    product_rows = []
+    for row in products:
+        name = (row.get('Product') or '').strip()
+        if name:
+            # Platforms listed as products ('F-35 Lightning II') join the aircraft node
+            node = graph.resolve(name, ['aircraft', 'product'], create='product')
+            product_rows.append((node, row))
+
+    # Then the links, resolving free-text mentions
+    for node, row in aircraft_rows:
+        graph.link(countries[row['country']], 'operates', node)
+        for maker in split(SLASH_LIST, row.get('Company')):
+            graph.link(node, 'made_by', graph.resolve(maker, ['company'], create='company'))
+        for name in parse_list(row.get('Associated products')):
+            graph.link(node, 'associated', graph.resolve(name, ['product', 'aircraft'], create='product'))
+
+    for node, row in product_rows:
+        for maker in split(SLASH_LIST, row.get('Company')):
+            graph.link(node, 'made_by', graph.resolve(maker, ['company'], create='company'))
+        for name in parse_list(row.get('Associated products')):
+            graph.link(node, 'associated', graph.resolve(name, ['product', 'aircraft'], create='product'))
+
+    for row, code in zip(calcs, calcs_codes):
+        for name in split(DASH_LIST, row.get('Sell')):
+            graph.link(countries[code], 'exports_to', graph.resolve(name, ['country'], create='country'))
+        for name in split(DASH_LIST, row.get('Buy')):
+            graph.link(countries[code], 'imports_from', graph.resolve(name, ['country'], create='country'))
+    return graph
+
+
+def write_graph(graph, data_dir=DATA_DIR):
+    nodes, edges = graph.tables()
+    for name, table in (('graph_nodes.feather', nodes), ('graph_edges.feather', edges)):
+        path = pathlib.Path(data_dir) / name
+        tmp = path.with_name(path.name + '.tmp')
+        # Uncompressed for the Arrow JS reader, like every other Feather file here
+        feather.write_feather(table, tmp, compression='uncompressed')
+        os.replace(tmp, path)
+
+    counts = {kind: graph.kinds.count(kind) for kind in NODE_KINDS}
+    print(f"Graph: {nodes.num_rows} nodes ({', '.join(f'{n} {k}' for k, n in counts.items())}), "
+          f"{edges.num_rows} directed edges")
+    print(f"Name mentions: {graph.stats['resolved']} resolved to existing nodes, "
+          f"{graph.stats['created']} new")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the cross-reference graph artifact')
+    parser.add_argument('--data-dir', default=str(DATA_DIR))
+    args = parser.parse_args(argv)
+
+    data_dir = pathlib.Path(args.data_dir)
+    if not data_dir.exists():
+        print(f"{data_dir} directory not found!")
+        return 1
+
+    write_graph(build_graph(data_dir), data_dir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
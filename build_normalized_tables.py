@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Normalized long-form tables from the free-text columns
+Parses calcs.csv `60`, `BVR` and `AEW` and the comma lists in the merged
+fleet once per build (grammar in aircombat/parsing.py) and writes:
+
+    loadouts.feather           country, platform, count
+    missiles.feather           country, missile, range_km
+    aew.feather                country, system, range_km
+    aircraft_products.feather  country, aircraft, product
+    aircraft_airports.feather  country, aircraft, airport
+
+`country` is the file code used by global_merged. String columns are
+dictionary-encoded and files are uncompressed for the Arrow JS reader.
+Runs after merge_countries.py; --strict fails the build on any cell that
+does not parse or any row that fails validation.
+"""
+
+import argparse
+import os
+import pathlib
+import sys
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+
+from aircombat.datafiles import load_inputs
+from aircombat.parsing import GrammarError, parse_airports, parse_items, parse_list
+from aircombat.store import FLAG_TO_FILE_CODE
+
+DATA_DIR = pathlib.Path("data")
+
+# The `60` column describes a 60-aircraft package
+PACKAGE_SIZE = 60
+
+TABLES = {
+    'loadouts.feather': [('country', 'str'), ('platform', 'str'), ('count', 'int')],
+    'missiles.feather': [('country', 'str'), ('missile', 'str'), ('range_km', 'int')],
+    'aew.feather': [('country', 'str'), ('system', 'str'), ('range_km', 'int')],
+    'aircraft_products.feather': [('country', 'str'), ('aircraft', 'str'), ('product', 'str')],
+    'aircraft_airports.feather': [('country', 'str'), ('aircraft', 'str'), ('airport', 'str')],
+}
+
+
+def extract_calcs(calcs, issues):
+    """(loadouts, missiles, aew) row lists from calcs"""
+    loadouts, missiles, aew = [], [], []
+    for record in calcs.to_pylist():
+        flag = (record.get('Flag Abbrev') or '').strip().lower()
+        code = FLAG_TO_FILE_CODE.get(flag, flag)
+        for column, rows in (('60', loadouts), ('BVR', missiles), ('AEW', aew)):
+            try:
+                items = parse_items(record.get(column))
+            except GrammarError as e:
+                issues.append(f"calcs {record.get('Country')} [{column}]: {e}")
+                items = parse_items(record.get(column), strict=False)
+            if not items:
+                issues.append(f"calcs {record.get('Country')} [{column}]: nothing parsed")
+            rows.extend((code, name, number) for name, number in items)
+
+        total = sum(count for c, _, count in loadouts if c == code)
+        if total != PACKAGE_SIZE:
+            issues.append(f"calcs {record.get('Country')} [60]: package adds up to {total}, "
+                          f"not {PACKAGE_SIZE}")
+    return loadouts, missiles, aew
+
+
+def extract_fleet(fleet):
+    """(aircraft_products, aircraft_airports) row lists from the merged fleet"""
+    products, airports = [], []
+    columns = [fleet.column(name).to_pylist()
+               for name in ('country', 'Aircraft', 'Associated products', 'Airport')]
+    for code, aircraft, associated, based in zip(*columns):
+        aircraft = (aircraft or '').strip()
+        if not aircraft:
+            continue
+        products.extend((code, aircraft, product) for product in parse_list(associated))
+        airports.extend((code, aircraft, airport) for airport in parse_airports(based))
+    return products, airports
+
+
+def validate(name, rows, issues):
+    """Drop rows with blank names or non-positive numbers, and duplicates"""
+    seen = set()
+    kept = []
+    for row in rows:
+        if any(value in (None, '') for value in row) or \
+                any(isinstance(value, int) and value <= 0 for value in row):
+            issues.append(f"{name}: invalid row {row}")
+            continue
+        if row in seen:
+            issues.append(f"{name}: duplicate row {row}")
+            continue
+        seen.add(row)
+        kept.append(row)
+    return kept
+
+
+def to_table(columns, rows):
+    """Row tuples -> Arrow table, strings dictionary-encoded"""
+    arrays = []
+    for index, (_, kind) in enumerate(columns):
+        values = [row[index] for row in rows]
+        if kind == 'int':
+            arrays.append(pa.array(values, pa.int32()))
+        else:
+            arrays.append(pc.dictionary_encode(pa.array(values, pa.string())))
+    return pa.Table.from_arrays(arrays, names=[name for name, _ in columns])
+
+
+def build_tables(data_dir=DATA_DIR, inputs=None):
+    """Return ({output name: Arrow table}, [validation issues]).
+
+    `inputs` may hold already-loaded 'calcs' and 'global_merged' tables.
+    """
+    issues = []
+    loaded = load_inputs(data_dir, ['calcs', 'global_merged'], inputs)
+    calcs, fleet = loaded['calcs'], loaded['global_merged']
+    fleet = fleet.set_column(fleet.schema.get_field_index('country'), 'country',
+                             pc.cast(fleet.column('country'), pa.string()))
+
+    extracted = dict(zip(TABLES, (*extract_calcs(calcs, issues), *extract_fleet(fleet))))
+    tables = {}
+    for name, columns in TABLES.items():
+        tables[name] = to_table(columns, validate(name, extracted[name], issues))
+    return tables, issues
+
+
+def write_tables(tables, data_dir=DATA_DIR):
+    for name, table in tables.items():
+        path = pathlib.Path(data_dir) / name
+        tmp = path.with_name(path.name + '.tmp')
+        # Uncompressed for the Arrow JS reader, like every other Feather file here
+        feather.write_feather(table, tmp, compression='uncompressed')
+        os.replace(tmp, path)
+        print(f"Wrote {table.num_rows} rows to {path} ({path.stat().st_size} bytes)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build normalized long-form Feather tables')
+    parser.add_argument('--data-dir', default=str(DATA_DIR))
+    parser.add_argument('--strict', action='store_true',
+                        help='Exit 1 (and write nothing) if any cell fails to parse or validate')
+    args = parser.parse_args(argv)
+
+    data_dir = pathlib.Path(args.data_dir)
+    if not data_dir.exists():
+        print(f"{data_dir} directory not found!")
+        return 1
+
+    tables, issues = build_tables(data_dir)
+    for issue in issues:
+        print(f"⚠️  {issue}")
+    if issues and args.strict:
+        print(f"{len(issues)} validation issue(s); nothing written")
+        return 1
+
+    write_tables(tables, data_dir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Full-text search index builder
+Tokenizes the descriptive columns once per build and writes the BM25
+inverted index read by aircombat/search.py:
+
+    fleet      global_merged  'BVR kill chain'                  -> kill_chain
+    products   products.csv   'BVR kill chain'                  -> kill_chain
+    calcs      calcs.csv      'Missile Design and Performance'  -> missile_design
+                              'Platform Integration'            -> integration
+                              'Cueing and Detection'            -> cueing
+    company    company.csv    'Main BVR Role (precise product)' -> role
+
+Output is data/search_index.bin. Runs after merge_countries.py.
+"""
+
+import argparse
+import pathlib
+import sys
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from aircombat.datafiles import load_inputs
+from aircombat.search import ARRAYS, FIELDS, INDEX_NAME, tokenize, write_index
+from aircombat.store import FILE_CODE_TO_FLAG
+
+DATA_DIR = pathlib.Path("data")
+
+# source -> (title column, {field: column})
+SOURCES = {
+    'fleet': ('Aircraft', {'kill_chain': 'BVR kill chain'}),
+    'products': ('Product', {'kill_chain': 'BVR kill chain'}),
+    'calcs': ('Country', {'missile_design': 'Missile Design and Performance',
+                          'integration': 'Platform Integration',
+                          'cueing': 'Cueing and Detection'}),
+    'company': ('Company', {'role': 'Main BVR Role (precise product)'}),
+}
+
+# Positions and field lengths are stored as uint16
+MAX_FIELD_TOKENS = np.iinfo(np.uint16).max
+
+
+def load_documents(data_dir=DATA_DIR, inputs=None):
+    """[(source, title, country, {field: text})] for every row with any text.
+
+    `inputs` may hold already-loaded calcs, products, company and
+    global_merged tables.
+    """
+    loaded = load_inputs(data_dir, ['calcs', 'products', 'company', 'global_merged'], inputs)
+    calcs = loaded['calcs'].to_pylist()
+    fleet = loaded['global_merged']
+    fleet = fleet.set_column(fleet.schema.get_field_index('country'), 'country',
+                             pc.cast(fleet.column('country'), pa.string()))
+    names = {(row.get('Flag Abbrev') or '').strip().lower(): row['Country'] for row in calcs}
+    country_name = {code: names.get(flag, code) for code, flag in FILE_CODE_TO_FLAG.items()}
+
+    tables = {
+        'fleet': [dict(row, Country=country_name.get(row['country'], row['country']))
+                  for row in fleet.to_pylist()],
+        'products': loaded['products'].to_pylist(),
+        'calcs': calcs,
+        'company': loaded['company'].to_pylist(),
+    }
+
+    documents = []
+    for source, (title_column, columns) in SOURCES.items():
+        for row in tables[source]:
+            title = (row.get(title_column) or '').strip()
+            fields = {field: row.get(column) for field, column in columns.items()
+                      if (row.get(column) or '').strip()}
+            if title and fields:
+                documents.append((source, title, (row.get('Country') or '').strip(), fields))
+    return documents
+
+
+def build_index(documents):
+    """(header, arrays) for write_index from load_documents() output"""
+    sources = list(SOURCES)
+    # term -> [(doc, field, positions)], appended in (doc, field) order
+    postings = {}
+    field_len = np.zeros((len(documents), len(FIELDS)), dtype=np.uint16)
+    for doc, (_, _, _, fields) in enumerate(documents):
+        for field, text in fields.items():
+            field_id = FIELDS.index(field)
+            tokens = tokenize(text)[:MAX_FIELD_TOKENS]
+            field_len[doc, field_id] = len(tokens)
+            occurrences = {}
+            for position, token in enumerate(tokens):
+                occurrences.setdefault(token, []).append(position)
+            for token, positions in occurrences.items():
+                postings.setdefault(token, []).append((doc, field_id, positions))
+
+    terms = sorted(postings)
+    term_ptr, post_doc, post_field, post_tf, pos_ptr, positions = [0], [], [], [], [0], []
+    for term in terms:
+        for doc, field_id, places in postings[term]:
+            post_doc.append(doc)
+            post_field.append(field_id)
+            post_tf.append(len(places))
+            positions.extend(places)
+            pos_ptr.append(len(positions))
+        term_ptr.append(len(post_doc))
+
+    header = {
+        'fields': FIELDS,
+        'sources': sources,
+        'docs': [[sources.index(source), title, country] for source, title, country, _ in documents],
+        'terms': terms,
+    }
+    arrays = dict(zip(ARRAYS, (term_ptr, post_doc, post_field, post_tf, pos_ptr, positions,
+                               field_len.ravel())))
+    return header, arrays
+
+
+def write_search_index(documents, data_dir=DATA_DIR):
+    header, arrays = build_index(documents)
+    path = pathlib.Path(data_dir) / INDEX_NAME
+    write_index(path, header, arrays)
+    print(f"Indexed {len(documents)} documents: {len(header['terms'])} terms, "
+          f"{len(arrays['post_doc'])} postings, {len(arrays['positions'])} positions")
+    print(f"Wrote {path} ({path.stat().st_size} bytes)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the full-text search index')
+    parser.add_argument('--data-dir', default=str(DATA_DIR))
+    args = parser.parse_args(argv)
+
+    data_dir = pathlib.Path(args.data_dir)
+    if not data_dir.exists():
+        print(f"{data_dir} directory not found!")
+        return 1
+
+    write_search_index(load_documents(data_dir), data_dir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,45 +2,202 @@
 """
 Weekly CSV → Feather converter
 Forces Uncompressed Feather format for browser/JS compatibility.
+Incremental: a manifest of CSV content hashes, schemas and output hashes
+lets unchanged files be skipped. Use --force for a full rebuild.
+Use --jobs N to convert files in parallel across a process pool.
+Per-file rows, bytes and timings go into the run report (aircombat.instrument).
 """
 
+import argparse
+import json
 import pathlib
+import sys
+import time
 import pandas as pd
 import os
+from concurrent.futures import ProcessPoolExecutor
+
+from aircombat import instrument
+from aircombat.datafiles import SKIP_CSVS, file_sha256, save_manifest
 
 DATA_DIR = pathlib.Path("data")
+MANIFEST_NAME = ".feather_manifest.json"
+
+
+def load_manifest(manifest_path):
+    """Load the conversion manifest, or an empty one if missing/corrupt"""
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if isinstance(manifest.get('files'), dict):
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {'version': 1, 'files': {}}
+
+
+def is_up_to_date(entry, csv_hash, feather_path):
+    """True if the recorded entry matches the CSV and the Feather file on disk"""
+    if not entry or entry.get('csv_sha256') != csv_hash:
+        return False
+    if not feather_path.exists():
+        return False
+    return file_sha256(feather_path) == entry.get('feather_sha256')
+
+
+def convert_file(csv_path, feather_path):
+    """Convert one CSV to Feather and return a result record.
+
+    Runs inside worker processes, so errors are captured in the record
+    instead of raised; one bad file must not abort the batch.
+    """
+    start = time.perf_counter()
+    result = {
+        'csv': str(csv_path),
+        'feather': str(feather_path),
+        'rows': 0,
+        'bytes_in': 0,
+        'bytes_out': 0,
+        'seconds': 0.0,
+        'schema': None,
+        'feather_sha256': None,
+        'error': None,
+    }
+    feather_path = pathlib.Path(feather_path)
+    tmp_path = feather_path.with_name(feather_path.name + '.tmp')
+    try:
+        result['bytes_in'] = os.path.getsize(csv_path)
+        df = pd.read_csv(csv_path)
+
+        # CRITICAL FIX: compression='uncompressed'
+        # The JavaScript Apache Arrow reader cannot handle LZ4 (default) compression.
+        # Written aside and moved into place, so an interrupted run never
+        # leaves a half-written file behind the hash the manifest records.
+        df.to_feather(tmp_path, compression='uncompressed')
+
+        result['rows'] = len(df)
+        result['bytes_out'] = os.path.getsize(tmp_path)
+        result['schema'] = [[str(name), str(dtype)] for name, dtype in df.dtypes.items()]
+        result['feather_sha256'] = file_sha256(tmp_path)
+        os.replace(tmp_path, feather_path)
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+        tmp_path.unlink(missing_ok=True)
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def run_conversions(jobs_list, jobs=1):
+    """Convert (csv_path, feather_path) pairs, serially or in a process pool"""
+    if jobs <= 1 or len(jobs_list) <= 1:
+        return [convert_file(csv_path, feather_path) for csv_path, feather_path in jobs_list]
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(convert_file, csv_path, feather_path)
+                   for csv_path, feather_path in jobs_list]
+        return [future.result() for future in futures]
 
-def main():
-    if not DATA_DIR.exists():
-        print(f"{DATA_DIR} directory not found!")
+
+def print_summary(results):
+    """Print a per-file table of rows, bytes in/out and wall time"""
+    if not results:
         return
+    name_width = max(len(pathlib.Path(r['csv']).name) for r in results)
+    name_width = max(name_width, len('File'))
+    print(f"\n{'File':<{name_width}}  {'Rows':>8}  {'Bytes in':>12}  {'Bytes out':>12}  {'Seconds':>8}  Status")
+    for r in results:
+        status = 'ERROR ' + r['error'] if r['error'] else 'ok'
+        print(f"{pathlib.Path(r['csv']).name:<{name_width}}  {r['rows']:>8}  "
+              f"{r['bytes_in']:>12}  {r['bytes_out']:>12}  {r['seconds']:>8.3f}  {status}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert data/*.csv to uncompressed Feather')
+    parser.add_argument('--data-dir', default=str(DATA_DIR))
+    parser.add_argument('--force', action='store_true',
+                        help='Re-convert every CSV, ignoring the manifest')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Number of worker processes (default: 1, serial)')
+    instrument.add_arguments(parser)
+    args = parser.parse_args(argv)
+    return instrument.run_main('convert_to_feather', args, convert, args)
 
-    csv_files = list(DATA_DIR.rglob("*.csv"))
+
+def convert(args):
+    data_dir = pathlib.Path(args.data_dir)
+    if not data_dir.exists():
+        print(f"{data_dir} directory not found!")
+        return 1
+
+    csv_files = sorted(p for p in data_dir.rglob("*.csv") if p.name not in SKIP_CSVS)
     print(f"Found {len(csv_files)} CSV file(s)")
 
+    manifest_path = data_dir / MANIFEST_NAME
+    manifest = load_manifest(manifest_path)
+    entries = manifest['files']
+
+    pending = []
+    source_hashes = {}
+    unchanged = 0
+    with instrument.span('hash', files=len(csv_files)):
+        for csv_path in csv_files:
+            feather_path = csv_path.with_suffix(".feather")
+            key = csv_path.relative_to(data_dir).as_posix()
+
+            # Content hashes rather than mtimes: a fresh checkout resets mtimes,
+            # which is why the old timestamp check could not be trusted.
+            csv_hash = file_sha256(csv_path)
+            if not args.force and is_up_to_date(entries.get(key), csv_hash, feather_path):
+                unchanged += 1
+                continue
+            source_hashes[key] = csv_hash
+            pending.append((csv_path, feather_path))
+    instrument.count('convert.files.unchanged', unchanged)
+
+    wall_start = time.perf_counter()
+    with instrument.span('convert', files=len(pending), jobs=max(args.jobs, 1)):
+        results = run_conversions(pending, jobs=args.jobs)
+        # Workers may be other processes, so their timings come back in the results
+        for r in results:
+            instrument.add_span('file', r['seconds'], file=pathlib.Path(r['csv']).name, rows=r['rows'],
+                                bytes_in=r['bytes_in'], bytes_out=r['bytes_out'], error=r['error'])
+    wall_time = time.perf_counter() - wall_start
+
     converted = 0
-    for csv_path in csv_files:
-        feather_path = csv_path.with_suffix(".feather")
-
-        # --- TIMESTAMP CHECK REMOVED TO FORCE UPDATE ---
-        # We are disabling this check to ensure all files are re-saved 
-        # as 'uncompressed' to fix the browser error.
-        # if feather_path.exists() and feather_path.stat().st_mtime >= csv_path.stat().st_mtime:
-        #     continue
-
-        try:
-            df = pd.read_csv(csv_path)
-            
-            # CRITICAL FIX: compression='uncompressed'
-            # The JavaScript Apache Arrow reader cannot handle LZ4 (default) compression.
-            df.to_feather(feather_path, compression='uncompressed')
-            
-            print(f"Converted: {csv_path.name} → {feather_path.name}")
-            converted += 1
-        except Exception as e:
-            print(f"ERROR on {csv_path.name}: {e}")
-
-    print(f"Done! {converted} file(s) converted/updated.")
+    failed = 0
+    for r in results:
+        csv_path = pathlib.Path(r['csv'])
+        key = csv_path.relative_to(data_dir).as_posix()
+        if r['error']:
+            print(f"ERROR on {csv_path.name}: {r['error']}")
+            failed += 1
+            continue
+        entries[key] = {
+            'csv_sha256': source_hashes[key],
+            'schema': r['schema'],
+            'rows': r['rows'],
+            'feather_sha256': r['feather_sha256'],
+        }
+        print(f"Converted: {csv_path.name} → {pathlib.Path(r['feather']).name}")
+        converted += 1
+        instrument.count('convert.rows', r['rows'])
+        instrument.count('convert.bytes_in', r['bytes_in'])
+        instrument.count('convert.bytes_out', r['bytes_out'])
+    instrument.count('convert.files.converted', converted)
+    instrument.count('convert.files.failed', failed)
+
+    # Forget CSVs that no longer exist so the manifest doesn't grow stale
+    live_keys = {p.relative_to(data_dir).as_posix() for p in csv_files}
+    for key in list(entries):
+        if key not in live_keys:
+            del entries[key]
+
+    save_manifest(manifest_path, manifest)
+
+    print_summary(results)
+    print(f"\nDone! {converted} file(s) converted/updated, {unchanged} unchanged, "
+          f"{failed} failed in {wall_time:.2f}s (jobs={max(args.jobs, 1)}).")
+    return 1 if failed else 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
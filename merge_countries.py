@@ -1,57 +1,185 @@
-import pandas as pd
-import glob
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.ipc as ipc
+import argparse
+import csv
 import os
-import re
-
-def merge_csvs():
-    # Define the data directory
-    data_dir = 'data'
-    
-    # path to look for csvs (e.g., data/*.csv)
-    search_path = os.path.join(data_dir, "*.csv")
-    all_files = glob.glob(search_path)
-    
-    # Regex to match filenames that are exactly 2 or 3 letters long
-    # We check os.path.basename to ignore the 'data/' folder prefix in the regex
-    country_pattern = re.compile(r'^[a-zA-Z]{2,3}\.csv$')
-    
-    dataframes = []
-    
+
+from aircombat import instrument
+from aircombat.datafiles import country_csvs
+
+# Declared schema for the merged table. Country CSVs list their columns in
+# different orders (e.g. 'Company' moves around), so every batch is
+# projected onto this order instead of letting concat widen the result.
+MERGED_COLUMNS = [
+    'Aircraft', 'Company', 'Photo', 'Thumb', 'Origin', 'Type', 'Versions',
+    'In Service', 'Airport', 'Manned', 'BVR kill chain', 'Associated products',
+]
+
+# Rows are read in blocks of this many bytes so memory stays bounded no
+# matter how many or how large the country files get.
+READ_BLOCK_SIZE = 1 << 20
+
+# Leading integer, the same thing the pages get from parseInt('100+')
+LEADING_INT = r'^\s*(?P<n>\d+)'
+# In Service cells that round-trip through int32 unchanged
+PLAIN_INT = r'^(0|[1-9][0-9]*)$'
+# Feather-only column keeping In Service cells that aren't PLAIN_INT
+# ('100+'); null for plain counts. The CSV keeps the original text instead.
+IN_SERVICE_TEXT = 'In Service text'
+
+
+def merged_schema(countries):
+    """Arrow schema for the merged output; `country` is dictionary-encoded"""
+    fields = [pa.field(name, pa.string()) for name in MERGED_COLUMNS]
+    fields[MERGED_COLUMNS.index('In Service')] = pa.field('In Service', pa.int32())
+    fields.append(pa.field(IN_SERVICE_TEXT, pa.string()))
+    fields.append(pa.field('country', pa.dictionary(pa.int32(), pa.string())))
+    return pa.schema(fields)
+
+
+def split_in_service(column):
+    """(int32 counts, text of the cells that aren't plain counts) of a string column"""
+    text = pc.if_else(pc.match_substring_regex(column, PLAIN_INT), pa.scalar(None, pa.string()), column)
+    digits = pc.struct_field(pc.extract_regex(column, LEADING_INT), 'n')
+    return pc.cast(digits, pa.int32()), text
+
+
+def conform_batch(batch, country_index, dictionary, schema):
+    """Project a raw all-string batch onto the merged schema"""
+    arrays = []
+    text = None
+    for name in MERGED_COLUMNS:
+        if name in batch.schema.names:
+            column = batch.column(name)
+        else:
+            column = pa.nulls(batch.num_rows, pa.string())
+
+        if name == 'In Service':
+            column, text = split_in_service(column)
+        arrays.append(column)
+    arrays.append(text)
+
+    indices = pa.array([country_index] * batch.num_rows, pa.int32())
+    arrays.append(pa.DictionaryArray.from_arrays(indices, dictionary))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def csv_rows(batch):
+    """Rows of a conformed batch as written to global_merged.csv: In Service
+    as its original text and the country as its file code"""
+    columns = [batch.column(name).to_pylist() for name in MERGED_COLUMNS + ['country']]
+    in_service = MERGED_COLUMNS.index('In Service')
+    columns[in_service] = [
+        text if text is not None else count
+        for count, text in zip(columns[in_service], batch.column(IN_SERVICE_TEXT).to_pylist())
+    ]
+    return zip(*columns)
+
+
+def read_batches(filepath):
+    """Stream a CSV as record batches with every column read as a string"""
+    with open(filepath, 'r', encoding='utf-8-sig', newline='') as f:
+        column_names = next(csv.reader(f), [])
+
+    reader = pacsv.open_csv(
+        filepath,
+        read_options=pacsv.ReadOptions(block_size=READ_BLOCK_SIZE),
+        convert_options=pacsv.ConvertOptions(
+            column_types={name: pa.string() for name in column_names},
+            strings_can_be_null=True,
+        ),
+    )
+    for batch in reader:
+        yield batch
+
+
+def merge_csvs(data_dir='data'):
+    """Merge the country CSVs in data_dir into global_merged.csv/.feather;
+    returns the number of rows merged, or None if there were no files"""
+
+    # Files named with exactly 2 or 3 letters (e.g., data/us.csv, data/rus.csv)
+    country_files = [str(path) for path in country_csvs(data_dir)]
+
     print(f"Scanning '{data_dir}' folder...")
-    
-    for filepath in all_files:
-        filename = os.path.basename(filepath)
-        
-        if country_pattern.match(filename):
-            print(f"- Processing {filename}...")
-            
-            try:
-                # Read the CSV
-                df = pd.read_csv(filepath)
-                
-                # Extract filename without extension for the column (e.g., 'aus')
-                country_name = os.path.splitext(filename)[0]
-                
-                # Add the new column
-                df['country'] = country_name
-                
-                dataframes.append(df)
-            except Exception as e:
-                print(f"Error processing {filename}: {e}")
-
-    if dataframes:
-        # Merge all dataframes
-        merged_df = pd.concat(dataframes, ignore_index=True)
-        
-        # Save to data folder
-        output_path = os.path.join(data_dir, "global_merged.csv")
-        merged_df.to_csv(output_path, index=False)
-        
-        print(f"Successfully merged {len(dataframes)} files into {output_path}")
-    else:
+
+    if not country_files:
         print("No matching country CSV files found in /data/.")
-        # Create an empty file or raise error to ensure git has something to touch? 
+        # Create an empty file or raise error to ensure git has something to touch?
         # Better to just print error so user checks logs.
+        return None
+
+    # The country dictionary is fixed up front so every batch shares it;
+    # the Feather (Arrow IPC file) format can't replace dictionaries mid-file.
+    countries = [os.path.splitext(os.path.basename(f))[0] for f in country_files]
+    dictionary = pa.array(countries, pa.string())
+    schema = merged_schema(countries)
+
+    csv_path = os.path.join(data_dir, "global_merged.csv")
+    feather_path = os.path.join(data_dir, "global_merged.feather")
+    csv_tmp = csv_path + '.tmp'
+    feather_tmp = feather_path + '.tmp'
+
+    merged_files = 0
+    total_rows = 0
+    try:
+        # Uncompressed IPC file == Feather v2 that the Arrow JS reader accepts.
+        # The CSV is written with minimal quoting, as pandas' to_csv did, so
+        # the committed file only changes where the data does.
+        with open(csv_tmp, 'w', encoding='utf-8', newline='') as csv_file, \
+                ipc.new_file(feather_tmp, schema,
+                             options=ipc.IpcWriteOptions(compression=None)) as feather_writer:
+            csv_writer = csv.writer(csv_file, lineterminator='\n')
+            csv_writer.writerow(MERGED_COLUMNS + ['country'])
+            for country_index, filepath in enumerate(country_files):
+                filename = os.path.basename(filepath)
+                print(f"- Processing {filename}...")
+
+                with instrument.span('file', file=filename, bytes=os.path.getsize(filepath)) as attrs:
+                    try:
+                        batches = [conform_batch(batch, country_index, dictionary, schema)
+                                   for batch in read_batches(filepath)]
+                    except Exception as e:
+                        print(f"Error processing {filename}: {e}")
+                        attrs['error'] = str(e)
+                        instrument.count('merge.files.failed')
+                        continue
+
+                    # Batches for one file are conformed before any are written,
+                    # so a bad file is skipped whole rather than half-merged.
+                    for batch in batches:
+                        feather_writer.write_batch(batch)
+                        csv_writer.writerows(csv_rows(batch))
+                        total_rows += batch.num_rows
+                    attrs['rows'] = sum(batch.num_rows for batch in batches)
+                    merged_files += 1
+
+        os.replace(csv_tmp, csv_path)
+        os.replace(feather_tmp, feather_path)
+    finally:
+        for tmp in (csv_tmp, feather_tmp):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    instrument.count('merge.files', merged_files)
+    instrument.count('merge.rows', total_rows)
+    instrument.count('merge.bytes_out', os.path.getsize(csv_path) + os.path.getsize(feather_path))
+    print(f"Successfully merged {merged_files} files ({total_rows} rows) into {csv_path} and {feather_path}")
+    return total_rows
+
+
+def run(args):
+    return 0 if merge_csvs(args.data_dir) is not None else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Merge the country CSVs into global_merged.csv/.feather')
+    parser.add_argument('--data-dir', default='data')
+    instrument.add_arguments(parser)
+    args = parser.parse_args(argv)
+    return instrument.run_main('merge_countries', args, run, args)
+
 
 if __name__ == "__main__":
-    merge_csvs()
+    exit(main())
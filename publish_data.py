@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Content-addressed publishing stage for the pages
+Writes the tables the pages load into data/published/ under content-hashed
+names, so they can be cached forever and only the small manifest has to be
+fetched fresh:
+
+    data/published/manifest.json                 {table: {variant: file info}}
+    data/published/global_merged.globe.<hash>.feather  (+ .gz, .br)
+
+Each table has per-page column projections (the globe never renders
+'BVR kill chain' or 'Versions', so its variant leaves them out), repeated
+string columns are dictionary-encoded, pandas schema metadata is dropped,
+and every file gets precompressed .gz and .br siblings for hosts that serve
+them. The Feather files themselves stay uncompressed for Arrow JS.
+Files from the previous manifest are kept one generation so pages holding
+the old manifest still load; older ones are removed.
+
+Runs after merge_countries.py and convert_to_feather.py. The .br files need
+the `brotli` package and are skipped without it.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import pathlib
+import sys
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+
+DATA_DIR = pathlib.Path("data")
+PUBLISH_DIR = "published"
+MANIFEST_NAME = "manifest.json"
+HASH_LENGTH = 12
+
+# table -> variant -> columns (None = every column)
+VARIANTS = {
+    'global_merged': {
+        'full': None,
+        # merged7.html globe: fleet cards, airports and product links
+        'globe': ['Aircraft', 'Company', 'Photo', 'Thumb', 'Type', 'In Service', 'In Service text',
+                  'Airport', 'Manned', 'Associated products', 'country'],
+    },
+    'calcs': {'full': None},
+    'products': {'full': None},
+    'company': {'full': None},
+}
+
+# Low-cardinality text repeated on many rows
+DICTIONARY_COLUMNS = {'Origin', 'Type', 'Manned', 'country', 'Company', 'Country', 'Flag',
+                      'Country Code'}
+
+
+def slim(table, columns=None):
+    """Project, dictionary-encode repeated strings, use 32-bit offsets, drop metadata"""
+    if columns is not None:
+        table = table.select([name for name in columns if name in table.column_names])
+    arrays = []
+    for name, column in zip(table.column_names, table.columns):
+        if pa.types.is_large_string(column.type):
+            column = pc.cast(column, pa.string())
+        if name in DICTIONARY_COLUMNS and pa.types.is_string(column.type):
+            column = pc.dictionary_encode(column)
+        arrays.append(column)
+    return pa.Table.from_arrays(arrays, names=table.column_names)
+
+
+def feather_bytes(table):
+    sink = pa.BufferOutputStream()
+    # Uncompressed for the Arrow JS reader, like every other Feather file here
+    feather.write_feather(table, sink, compression='uncompressed')
+    return sink.getvalue().to_pybytes()
+
+
+def compressors():
+    """{suffix: compress(bytes)}; brotli only when installed"""
+    found = {'.gz': lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+    try:
+        import brotli
+        found['.br'] = lambda data: brotli.compress(data, quality=11)
+    except ImportError:
+        pass
+    return found
+
+
+def write_atomic(path, data):
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def load_tables(data_dir, inputs=None):
+    """Source tables by name; `inputs` may hold an in-memory global_merged"""
+    tables = {}
+    for name in VARIANTS:
+        if inputs and name in inputs:
+            tables[name] = inputs[name]
+        else:
+            tables[name] = feather.read_table(data_dir / f'{name}.feather')
+    return tables
+
+
+def publish(data_dir=DATA_DIR, inputs=None):
+    """Write every variant and the manifest; returns the manifest"""
+    data_dir = pathlib.Path(data_dir)
+    out_dir = data_dir / PUBLISH_DIR
+    out_dir.mkdir(exist_ok=True)
+    manifest_path = out_dir / MANIFEST_NAME
+    try:
+        previous = json.loads(manifest_path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        previous = {}
+
+    encoders = compressors()
+    manifest = {'version': 1, 'tables': {}}
+    for name, table in load_tables(data_dir, inputs).items():
+        source = data_dir / f'{name}.feather'
+        source_bytes = source.stat().st_size if source.exists() else None
+        for variant, columns in VARIANTS[name].items():
+            projected = slim(table, columns)
+            data = feather_bytes(projected)
+            digest = hashlib.sha256(data).hexdigest()
+            filename = f"{name}.{variant}.{digest[:HASH_LENGTH]}.feather"
+            entry = {
+                'file': filename,
+                'sha256': digest,
+                'rows': projected.num_rows,
+                'columns': projected.column_names,
+                'bytes': len(data),
+                'source_bytes': source_bytes,
+            }
+            path = out_dir / filename
+            if not path.exists():
+                write_atomic(path, data)
+            for suffix, compress in encoders.items():
+                sibling = out_dir / (filename + suffix)
+                if not sibling.exists():
+                    write_atomic(sibling, compress(data))
+                entry[f'{suffix[1:]}_bytes'] = sibling.stat().st_size
+            manifest['tables'].setdefault(name, {})[variant] = entry
+
+    write_atomic(manifest_path, (json.dumps(manifest, indent=2, sort_keys=True) + '\n').encode('utf-8'))
+
+    # Keep this generation and the previous one; drop anything older
+    keep = {MANIFEST_NAME}
+    for generation in (manifest, previous):
+        for variants in generation.get('tables', {}).values():
+            for entry in variants.values():
+                keep.update(entry['file'] + suffix for suffix in ('', '.gz', '.br'))
+    for path in out_dir.iterdir():
+        if path.is_file() and path.name not in keep:
+            path.unlink()
+    return manifest
+
+
+def print_report(manifest):
+    print(f"{'File':<44} {'Rows':>6} {'Cols':>4} {'Source':>9} {'Feather':>9} {'gzip':>8} {'brotli':>8}")
+    for variants in manifest['tables'].values():
+        for entry in variants.values():
+            source = entry['source_bytes']
+            br = entry.get('br_bytes')
+            print(f"{entry['file']:<44} {entry['rows']:>6} {len(entry['columns']):>4} "
+                  f"{source if source is not None else '-':>9} {entry['bytes']:>9} "
+                  f"{entry['gz_bytes']:>8} {br if br is not None else '-':>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Publish content-hashed Feather variants for the pages')
+    parser.add_argument('--data-dir', default=str(DATA_DIR))
+    args = parser.parse_args(argv)
+
+    data_dir = pathlib.Path(args.data_dir)
+    if not data_dir.exists():
+        print(f"{data_dir} directory not found!")
+        return 1
+
+    manifest = publish(data_dir)
+    print_report(manifest)
+    if '.br' not in compressors():
+        print("brotli not installed; .br siblings skipped")
+    print(f"\nWrote {data_dir / PUBLISH_DIR / MANIFEST_NAME}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
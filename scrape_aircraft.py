@@ -0,0 +1,558 @@
+#!/usr/bin/env python3
+"""
+Multi-source military aircraft scraper
+Each country is a declarative entry in SOURCES (URL, table selector and
+optional header aliases). Tables are mapped onto the us.csv columns by
+header name rather than position, sources are fetched concurrently over
+one pooled session with per-host rate limits, and every source gets its
+own data/<code>_aircraft.csv in a single run.
+Raw pages are cached in data/.cache/ with their ETag/Last-Modified; pages
+that answer 304 or come back byte-identical skip parsing and CSV writes.
+Pages are parsed with selectolax or lxml when installed (only the matching
+tables are walked), falling back to BeautifulSoup's html.parser.
+
+    python scrape_aircraft.py                 # every source
+    python scrape_aircraft.py --only us,uk    # a subset
+    python scrape_aircraft.py --source-url us=http://127.0.0.1:8000/us.html
+    python scrape_aircraft.py --only uk --source-url uk=https://...   # try a new source
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urljoin
+
+import pandas as pd
+from bs4 import BeautifulSoup, SoupStrainer, UnicodeDammit
+
+from aircombat import instrument
+from aircombat.http import HttpClient
+
+# Same columns, same order as data/us.csv, plus the scrape timestamp
+OUTPUT_COLUMNS = [
+    'Aircraft', 'Photo', 'Origin', 'Company', 'Type', 'Versions', 'In Service',
+    'Airport', 'Manned', 'BVR kill chain', 'Associated products', 'Scraped_Date',
+]
+
+# Header text (normalized) that maps onto each output column. A source can
+# extend or override these with its own 'columns' entry.
+HEADER_ALIASES = {
+    'Aircraft': ['aircraft', 'name', 'model'],
+    'Photo': ['photo', 'image', 'picture'],
+    'Origin': ['origin', 'country of origin', 'origin country'],
+    'Company': ['manufacturer', 'company', 'builder'],
+    'Type': ['type', 'role'],
+    'Versions': ['versions', 'version', 'variants', 'variant'],
+    'In Service': ['in service', 'in-service', 'quantity', 'number', 'active'],
+    'Airport': ['airport', 'base', 'bases', 'air base', 'air bases'],
+}
+
+FANDOM_WIKI = "https://military-history.fandom.com/wiki/"
+
+# Only pages that have been checked to exist and hold a matching table are
+# listed. Try a new country with --source-url CODE=URL and add it here once
+# its page is verified. A page that fails to load or has no matching table
+# is reported and its CSV left untouched.
+SOURCES = [
+    {'code': 'us', 'url': FANDOM_WIKI + 'List_of_active_United_States_military_aircraft'},
+]
+SOURCES_BY_CODE = {source['code']: source for source in SOURCES}
+
+DEFAULT_TABLE_SELECTOR = 'table.wikitable'
+
+# Browser-like headers; the fandom wiki answers 403 to bare clients
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+    'Cache-Control': 'max-age=0',
+}
+
+# The old scraper slept 2 s before its single request; keep that spacing
+# per host while different hosts proceed in parallel.
+DEFAULT_HOST_RATE = 0.5
+DEFAULT_JOBS = 8
+
+FOOTNOTE_RE = re.compile(r'\[[^\]]*\]')
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_header(text):
+    """'In service[1] ' -> 'in service'"""
+    text = FOOTNOTE_RE.sub('', text or '')
+    return WHITESPACE_RE.sub(' ', text).strip().strip(':').casefold()
+
+
+def source_aliases(source):
+    """Alias table for a source: the defaults overlaid with its own 'columns'"""
+    aliases = {column: list(names) for column, names in HEADER_ALIASES.items()}
+    for column, names in source.get('columns', {}).items():
+        aliases[column] = list(names)
+    return aliases
+
+
+def resolve_columns(header_cells, aliases):
+    """Map output column -> cell index for one table, or None without an Aircraft column"""
+    lookup = {}
+    for column, names in aliases.items():
+        for name in names:
+            lookup.setdefault(normalize_header(name), column)
+
+    mapping = {}
+    for index, text in enumerate(header_cells):
+        column = lookup.get(normalize_header(text))
+        if column and column not in mapping:
+            mapping[column] = index
+    return mapping if 'Aircraft' in mapping else None
+
+
+def image_url(attrs, page_url):
+    """Absolute URL from a cell's first <img> attributes, or ''"""
+    if not attrs:
+        return ''
+    # Fandom lazy-loads: src is a data: placeholder and the real URL is in data-src
+    src = attrs.get('src') or ''
+    if not src or src.startswith('data:'):
+        src = attrs.get('data-src') or src
+    if not src or src.startswith('data:'):
+        return ''
+    return urljoin(page_url, src)
+
+
+# Text inside these never shows up in BeautifulSoup's get_text(), so the
+# faster backends skip it too to produce identical cells.
+HIDDEN_TEXT_TAGS = {'script', 'style', 'template'}
+
+
+def decode_html(html):
+    """Bytes -> str with BeautifulSoup's charset detection, so every backend
+    sees the same text"""
+    if isinstance(html, str):
+        return html
+    return UnicodeDammit(html, is_html=True).unicode_markup
+
+
+class SoupBackend:
+    """BeautifulSoup + html.parser; always available, the reference output"""
+
+    name = 'html.parser'
+
+    def tables(self, html, selector):
+        # Only <table> subtrees are built when the selector targets tables
+        strainer = SoupStrainer('table') if selector.split()[0].startswith('table') else None
+        soup = BeautifulSoup(decode_html(html), 'html.parser', parse_only=strainer)
+        return soup.select(selector) or soup.find_all('table')
+
+    def rows(self, table):
+        return table.find_all('tr')
+
+    def cells(self, row):
+        return row.find_all(['td', 'th'])
+
+    def text(self, cell):
+        return cell.get_text(strip=True)
+
+    def image(self, cell):
+        img = cell.find('img')
+        return dict(img.attrs) if img else None
+
+
+class LxmlBackend:
+    """lxml.html; CSS selectors via cssselect, or plain 'tag.class' without it"""
+
+    name = 'lxml'
+
+    def __init__(self):
+        import lxml.html
+        self._html = lxml.html
+
+    @staticmethod
+    def _xpath(selector):
+        try:
+            from cssselect import GenericTranslator
+            return GenericTranslator().css_to_xpath(selector)
+        except ImportError:
+            match = re.fullmatch(r'([a-zA-Z][\w-]*)?((?:\.[\w-]+)*)', selector.strip())
+            if not match:
+                raise ValueError(f"selector {selector!r} needs the cssselect package")
+            tag = match.group(1) or '*'
+            tests = [f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')"
+                     for cls in match.group(2).split('.') if cls]
+            return f"descendant-or-self::{tag}" + ''.join(f'[{t}]' for t in tests)
+
+    def tables(self, html, selector):
+        text = decode_html(html)
+        # lxml refuses str input that still carries an XML encoding declaration
+        if text.lstrip().startswith('<?xml'):
+            text = text.split('?>', 1)[1]
+        root = self._html.document_fromstring(text)
+        return root.xpath(self._xpath(selector)) or list(root.iter('table'))
+
+    def rows(self, table):
+        return list(table.iter('tr'))
+
+    def cells(self, row):
+        return list(row.iter('td', 'th'))
+
+    def text(self, cell):
+        parts = []
+        stack = [cell]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                parts.append(node)
+                continue
+            # Comments and processing instructions have a non-str tag
+            if isinstance(node.tag, str) and node.tag not in HIDDEN_TEXT_TAGS and node.text:
+                parts.append(node.text)
+            for child in reversed(node):
+                if child.tail:
+                    stack.append(child.tail)
+                stack.append(child)
+        return ''.join(p.strip() for p in parts if p.strip())
+
+    def image(self, cell):
+        for img in cell.iter('img'):
+            return dict(img.attrib)
+        return None
+
+
+class SelectolaxBackend:
+    """selectolax's lexbor engine: the fastest option when installed"""
+
+    name = 'selectolax'
+
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+        self._parser = LexborHTMLParser
+
+    def tables(self, html, selector):
+        tree = self._parser(decode_html(html))
+        return tree.css(selector) or tree.css('table')
+
+    def rows(self, table):
+        return table.css('tr')
+
+    def cells(self, row):
+        return row.css('td, th')
+
+    def text(self, cell):
+        parts = []
+        for node in cell.traverse(include_text=True):
+            if node.tag == '-text' and node.parent.tag not in HIDDEN_TEXT_TAGS:
+                piece = node.text_content.strip()
+                if piece:
+                    parts.append(piece)
+        return ''.join(parts)
+
+    def image(self, cell):
+        img = cell.css_first('img')
+        return dict(img.attributes) if img else None
+
+
+PARSER_BACKENDS = {
+    'selectolax': SelectolaxBackend,
+    'lxml': LxmlBackend,
+    'html.parser': SoupBackend,
+}
+
+
+def get_parser_backend(name='auto'):
+    """Instantiate a backend by name; 'auto' takes the fastest one installed"""
+    if name != 'auto':
+        return PARSER_BACKENDS[name]()
+    for backend in PARSER_BACKENDS.values():
+        try:
+            return backend()
+        except ImportError:
+            continue
+    return SoupBackend()
+
+
+def parse_tables(html, source, backend=None):
+    """Extract output rows from every matching table on a page"""
+    backend = backend or get_parser_backend()
+    selector = source.get('table_selector', DEFAULT_TABLE_SELECTOR)
+    aliases = source_aliases(source)
+
+    rows = []
+    for table in backend.tables(html, selector):
+        trs = backend.rows(table)
+        if not trs:
+            continue
+        # Headers resolve to output columns once per table, not per row
+        header_cells = [backend.text(cell) for cell in backend.cells(trs[0])]
+        mapping = resolve_columns(header_cells, aliases)
+        if mapping is None:
+            continue
+        aircraft_index = mapping['Aircraft']
+        columns = list(mapping.items())
+
+        for tr in trs[1:]:
+            cells = backend.cells(tr)
+            if len(cells) <= aircraft_index:
+                continue
+            aircraft = backend.text(cells[aircraft_index])
+            if not aircraft:
+                continue
+
+            row = dict.fromkeys(OUTPUT_COLUMNS, '')
+            row['Aircraft'] = aircraft
+            for column, index in columns:
+                if column == 'Aircraft' or index >= len(cells):
+                    continue
+                if column == 'Photo':
+                    row[column] = image_url(backend.image(cells[index]), source['url'])
+                else:
+                    row[column] = backend.text(cells[index])
+            rows.append(row)
+    return rows
+
+
+class PageCache:
+    """Per-URL store of validators and zlib-compressed raw HTML (SQLite)"""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS pages ('
+            ' url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT,'
+            ' sha256 TEXT NOT NULL, body BLOB NOT NULL, fetched_at REAL NOT NULL)'
+        )
+        self._db.commit()
+
+    def get(self, url):
+        """The cached entry for url as a dict (body decompressed), or None"""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT etag, last_modified, sha256, body FROM pages WHERE url = ?', (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'etag': row[0], 'last_modified': row[1], 'sha256': row[2],
+                'body': zlib.decompress(row[3])}
+
+    def put(self, url, page):
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO pages (url, etag, last_modified, sha256, body, fetched_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?)',
+                (url, page['etag'], page['last_modified'], page['sha256'],
+                 zlib.compress(page['body'], 9), time.time())
+            )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def fetch_page(client, url, cached=None, timeout=30):
+    """GET a page, conditionally when a cached entry has validators.
+
+    Returns (status, page, bytes_downloaded), where status is 'not-modified'
+    (304), 'unchanged' (200 with the cached body) or 'changed'. Raises on
+    HTTP errors.
+    """
+    headers = dict(REQUEST_HEADERS)
+    if cached:
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+
+    response = client.get(url, headers=headers, timeout=timeout)
+    if response.status_code == 304 and cached:
+        page = dict(cached)
+        page['etag'] = response.headers.get('ETag', cached.get('etag'))
+        page['last_modified'] = response.headers.get('Last-Modified', cached.get('last_modified'))
+        return 'not-modified', page, 0
+    response.raise_for_status()
+
+    body = response.content
+    page = {
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'sha256': hashlib.sha256(body).hexdigest(),
+        'body': body,
+    }
+    status = 'unchanged' if cached and cached['sha256'] == page['sha256'] else 'changed'
+    return status, page, len(body)
+
+
+def scrape_source(source, client, cache=None, force_parse=False, backend=None):
+    """Fetch and parse one source. Returns a result dict; never raises.
+
+    With a cache, a page that is not modified (or byte-identical) is not
+    parsed unless force_parse is set; result['status'] says which case hit.
+    """
+    start = time.perf_counter()
+    result = {'source': source, 'rows': [], 'error': None, 'seconds': 0.0,
+              'status': None, 'page': None, 'bytes': 0}
+    try:
+        cached = cache.get(source['url']) if cache else None
+        status, page, downloaded = fetch_page(client, source['url'], cached)
+        result.update(status=status, page=page, bytes=downloaded)
+        if status == 'changed' or force_parse:
+            parse_start = time.perf_counter()
+            result['rows'] = parse_tables(page['body'], source, backend)
+            instrument.observe('scrape.parse', time.perf_counter() - parse_start)
+            if not result['rows']:
+                result['error'] = 'no matching tables'
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def scrape_sources(sources, client=None, jobs=DEFAULT_JOBS, cache=None, force_parse=(),
+                   backend=None):
+    """Scrape several sources concurrently; results come back in source order.
+
+    force_parse is a collection of source codes to parse even when unchanged.
+    """
+    if client is None:
+        client = HttpClient(per_host=2, host_rate=DEFAULT_HOST_RATE, pool_size=max(10, jobs))
+    # Backends hold no per-page state, so one instance serves every worker
+    backend = backend or get_parser_backend()
+
+    def run(source):
+        return scrape_source(source, client, cache, source['code'] in force_parse, backend)
+
+    if jobs <= 1 or len(sources) <= 1:
+        return [run(source) for source in sources]
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(run, sources))
+
+
+def output_path(source, data_dir):
+    return os.path.join(data_dir, source.get('output', f"{source['code']}_aircraft.csv"))
+
+
+def write_source_csv(source, rows, data_dir, scraped_date):
+    """Write one source's rows in the us.csv column order"""
+    df = pd.DataFrame(rows, columns=OUTPUT_COLUMNS)
+    df['Scraped_Date'] = scraped_date
+    path = output_path(source, data_dir)
+    df.to_csv(path, index=False)
+    return path
+
+
+def parse_source_urls(values):
+    """['us=http://...'] -> {'us': 'http://...'}"""
+    overrides = {}
+    for value in values or []:
+        code, sep, url = value.partition('=')
+        if not sep:
+            raise ValueError(f"--source-url expects CODE=URL, got {value!r}")
+        overrides[code.strip()] = url.strip()
+    return overrides
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Scrape active military aircraft lists into data/')
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--only', default='', help='Comma-separated source codes (default: all)')
+    parser.add_argument('--source-url', action='append', metavar='CODE=URL',
+                        help='Override a source URL (e.g. to scrape a local fixture) or try an unlisted one')
+    parser.add_argument('--jobs', type=int, default=DEFAULT_JOBS,
+                        help='Sources fetched in parallel')
+    parser.add_argument('--host-rate', type=float, default=DEFAULT_HOST_RATE,
+                        help='Max requests per second to any one host (0 = unlimited)')
+    parser.add_argument('--cache-dir', default=None,
+                        help='Page cache directory (default: <data-dir>/.cache)')
+    parser.add_argument('--no-page-cache', action='store_true',
+                        help='Always download and re-parse every page')
+    parser.add_argument('--parser', default='auto', choices=['auto', *PARSER_BACKENDS],
+                        help='HTML parser backend (default: fastest installed)')
+    instrument.add_arguments(parser)
+    args = parser.parse_args(argv)
+    return instrument.run_main('scrape_aircraft', args, scrape, args)
+
+
+def scrape(args):
+    overrides = parse_source_urls(args.source_url)
+    codes = [c.strip() for c in args.only.split(',') if c.strip()] or list(SOURCES_BY_CODE)
+    unknown = [c for c in codes if c not in SOURCES_BY_CODE and c not in overrides]
+    if unknown:
+        print(f"Unknown source code(s): {', '.join(unknown)} (give a URL with --source-url)")
+        return 1
+    sources = [dict(SOURCES_BY_CODE.get(c, {'code': c}), **({'url': overrides[c]} if c in overrides else {}))
+               for c in codes]
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    backend = get_parser_backend(args.parser)
+    print(f"Scraping {len(sources)} source(s) with {args.jobs} worker(s), "
+          f"{backend.name} parser...")
+
+    cache = None
+    if not args.no_page_cache:
+        cache_dir = args.cache_dir or os.path.join(args.data_dir, '.cache')
+        cache = PageCache(os.path.join(cache_dir, 'scraped_pages.sqlite'))
+    # A source whose CSV is missing must be parsed even if its page is cached
+    force_parse = {s['code'] for s in sources if not os.path.exists(output_path(s, args.data_dir))}
+
+    client = HttpClient(per_host=2, host_rate=args.host_rate, pool_size=max(10, args.jobs))
+    wall_start = time.perf_counter()
+    with instrument.span('fetch', sources=len(sources), jobs=args.jobs):
+        results = scrape_sources(sources, client, jobs=args.jobs, cache=cache,
+                                 force_parse=force_parse, backend=backend)
+    wall_time = time.perf_counter() - wall_start
+
+    scraped_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    written = 0
+    stats = {'changed': 0, 'unchanged': 0, 'not-modified': 0, 'error': 0}
+    downloaded = 0
+    for result in results:
+        source = result['source']
+        downloaded += result['bytes']
+        # Sources run on worker threads; their timings are recorded here
+        instrument.add_span('source', result['seconds'], code=source['code'], status=result['status'],
+                            rows=len(result['rows']), bytes=result['bytes'], error=result['error'])
+        instrument.count(f"scrape.pages.{'error' if result['error'] else result['status']}")
+        if result['error']:
+            stats['error'] += 1
+            # Nothing is written for a failed source: an existing CSV is kept
+            # and a missing one stays missing rather than appearing empty
+            print(f"- {source['code']}: ERROR {result['error']} ({result['seconds']:.2f}s)")
+            continue
+
+        stats[result['status']] += 1
+        if result['status'] != 'changed' and source['code'] not in force_parse:
+            print(f"- {source['code']}: {result['status']}, CSV left as is ({result['seconds']:.2f}s)")
+        else:
+            path = write_source_csv(source, result['rows'], args.data_dir, scraped_date)
+            print(f"- {source['code']}: {len(result['rows'])} aircraft → {path} ({result['seconds']:.2f}s)")
+            written += 1
+        # Stored only after the CSV is safely written, so a failed run retries
+        if cache:
+            cache.put(source['url'], result['page'])
+
+    if cache:
+        cache.close()
+        print(f"\nPage cache: {stats['not-modified']} not modified (304), "
+              f"{stats['unchanged']} unchanged body, {stats['changed']} changed, "
+              f"{stats['error']} failed; {downloaded} bytes downloaded")
+    print(f"\nDone! {written}/{len(sources)} source(s) written in {wall_time:.2f}s")
+    return 1 if stats['error'] else 0
+
+
+if __name__ == "__main__":
+    exit(main())
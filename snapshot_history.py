@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Append today's merged fleet and calcs tables to the snapshot history
+Runs after merge_countries.py. Only rows that changed since the previous
+snapshot are stored (see aircombat/history.py for the layout and queries):
+
+    python snapshot_history.py                    # snapshot dated today (UTC)
+    python snapshot_history.py --date 2026-01-04
+    python snapshot_history.py --from-git         # backfill from committed CSVs
+
+--from-git replays every commit of data/global_merged.csv and
+data/calcs.csv (the last one of each day) into the history, so trends
+cover the time before the store existed.
+"""
+
+import argparse
+import pathlib
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+from aircombat.datafiles import load_inputs, read_strings
+from aircombat.history import HISTORY_DIR, KEY_COLUMNS, History
+
+DATA_DIR = pathlib.Path("data")
+
+
+def fleet_from_csv(table):
+    """A committed global_merged.csv with 'In Service' split as in global_merged.feather"""
+    from merge_countries import IN_SERVICE_TEXT, split_in_service
+    if 'In Service' in table.column_names:
+        counts, text = split_in_service(table.column('In Service'))
+        table = table.set_column(table.schema.get_field_index('In Service'), 'In Service', counts)
+        if IN_SERVICE_TEXT not in table.column_names:
+            table = table.append_column(IN_SERVICE_TEXT, text)
+    return table
+
+
+def load_tables(data_dir, inputs=None):
+    """{table name: Arrow table} for the current data, reusing in-memory tables"""
+    return load_inputs(data_dir, list(KEY_COLUMNS), inputs)
+
+
+def snapshot(data_dir=DATA_DIR, date=None, inputs=None, history_dir=None):
+    """Append the current tables; returns {table name: counts}"""
+    data_dir = pathlib.Path(data_dir)
+    date = date or datetime.now(timezone.utc).strftime('%Y-%m-%d')
+    history = History(history_dir or data_dir / 'history')
+    return {name: history.append(name, table, date)
+            for name, table in load_tables(data_dir, inputs).items()}
+
+
+def git_versions(path):
+    """[(date, commit)] of the last commit each day that touched `path`, oldest first"""
+    log = subprocess.run(['git', 'log', '--format=%H %cs', '--', str(path)],
+                         capture_output=True, text=True, check=True).stdout.split('\n')
+    latest = {}
+    for line in reversed([line for line in log if line.strip()]):
+        commit, date = line.split()
+        latest[date] = commit
+    return sorted(latest.items())
+
+
+def backfill_from_git(data_dir=DATA_DIR, history_dir=None):
+    """Replay committed CSVs into the history; returns the number of snapshots added"""
+    data_dir = pathlib.Path(data_dir)
+    history = History(history_dir or data_dir / 'history')
+    added = 0
+    for name in KEY_COLUMNS:
+        path = data_dir / f'{name}.csv'
+        known = history.dates(name)
+        for date, commit in git_versions(path):
+            if known and date <= known[-1]:
+                continue
+            blob = subprocess.run(['git', 'show', f'{commit}:{path.as_posix()}'],
+                                  capture_output=True, check=True).stdout
+            table = read_strings(blob)
+            if name == 'global_merged':
+                table = fleet_from_csv(table)
+            counts = history.append(name, table, date)
+            print(f"{date} {name}: +{counts['added']} ~{counts['changed']} -{counts['removed']}")
+            added += 1
+    return added
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Append the fleet and calcs tables to the snapshot history')
+    parser.add_argument('--data-dir', default=str(DATA_DIR))
+    parser.add_argument('--history-dir', default=None, help=f'Default: {HISTORY_DIR}')
+    parser.add_argument('--date', default=None, help='Snapshot date, YYYY-MM-DD (default: today, UTC)')
+    parser.add_argument('--from-git', action='store_true',
+                        help='Backfill from the git history of the committed CSVs')
+    args = parser.parse_args(argv)
+
+    data_dir = pathlib.Path(args.data_dir)
+    if not data_dir.exists():
+        print(f"{data_dir} directory not found!")
+        return 1
+    try:
+        if args.from_git:
+            print(f"Backfilled {backfill_from_git(data_dir, args.history_dir)} snapshot(s)")
+            return 0
+        if args.date:
+            datetime.strptime(args.date, '%Y-%m-%d')
+        results = snapshot(data_dir, args.date, history_dir=args.history_dir)
+    except ValueError as e:
+        print(f"Snapshot failed: {e}")
+        return 1
+
+    for name, counts in results.items():
+        print(f"{name}: {counts['rows']} rows, {counts['added']} added, {counts['changed']} changed, "
+              f"{counts['removed']} removed, {counts['unchanged']} unchanged")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
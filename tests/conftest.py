@@ -0,0 +1,29 @@
+import pathlib
+import shutil
+import sys
+
+import pytest
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+# The scripts live at the repository root, next to the aircombat package
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """A scratch copy of the CSVs in data/, for tests that build from them"""
+    target = tmp_path / 'data'
+    target.mkdir()
+    for path in (ROOT / 'data').glob('*.csv'):
+        shutil.copy2(path, target / path.name)
+    return target
+
+
+@pytest.fixture
+def mock_commons():
+    """The local Commons stand-in from the benchmarks, without added latency"""
+    from benchmarks.mock_commons import MockCommons
+    with MockCommons() as mock:
+        yield mock
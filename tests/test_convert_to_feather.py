@@ -0,0 +1,130 @@
+import json
+import os
+
+import pyarrow.feather as feather
+
+import convert_to_feather as ctf
+from aircombat.datafiles import file_sha256
+
+
+def convert(data_dir, *extra):
+    return ctf.main(['--data-dir', str(data_dir), *extra])
+
+
+def read_report(data_dir):
+    return json.loads((data_dir / '.reports' / 'convert_to_feather.json').read_text(encoding='utf-8'))
+
+
+def age_feathers(data_dir):
+    """Backdate every Feather file so a rewrite shows in its mtime"""
+    for path in data_dir.glob('*.feather'):
+        os.utime(path, (1_000_000_000, 1_000_000_000))
+    return {path.name for path in data_dir.glob('*.feather')}
+
+
+def rewritten(data_dir):
+    return {path.name for path in data_dir.glob('*.feather') if path.stat().st_mtime != 1_000_000_000}
+
+
+def test_every_csv_gets_a_recorded_feather(data_dir):
+    assert convert(data_dir) == 0
+
+    csvs = sorted(path.name for path in data_dir.glob('*.csv') if path.name not in ctf.SKIP_CSVS)
+    manifest = ctf.load_manifest(data_dir / ctf.MANIFEST_NAME)
+    assert sorted(manifest['files']) == csvs
+    for name, entry in manifest['files'].items():
+        feather_path = (data_dir / name).with_suffix('.feather')
+        assert entry['csv_sha256'] == file_sha256(data_dir / name)
+        assert entry['feather_sha256'] == file_sha256(feather_path)
+        assert entry['rows'] == feather.read_table(feather_path).num_rows
+    assert not (data_dir / 'global_merged.feather').exists()
+    assert not list(data_dir.glob('*.tmp'))
+
+
+def test_unchanged_files_are_not_rewritten(data_dir):
+    assert convert(data_dir) == 0
+    before = age_feathers(data_dir)
+
+    assert convert(data_dir) == 0
+    assert rewritten(data_dir) == set()
+    counters = read_report(data_dir)['counters']
+    assert counters['convert.files.unchanged'] == len(before)
+    assert counters['convert.files.converted'] == 0
+
+
+def test_only_edited_files_are_reconverted(data_dir):
+    assert convert(data_dir) == 0
+    age_feathers(data_dir)
+    with open(data_dir / 'swe.csv', 'a', encoding='utf-8') as f:
+        f.write('Saab JAS 39E Gripen,,Sweden,Saab,Fighter,E,1,,Yes,,\n')
+    # A hand-edited output is rebuilt too
+    (data_dir / 'uk.feather').write_bytes(b'not a feather file')
+
+    assert convert(data_dir) == 0
+    assert rewritten(data_dir) == {'swe.feather', 'uk.feather'}
+    assert read_report(data_dir)['counters']['convert.files.converted'] == 2
+    assert feather.read_table(data_dir / 'uk.feather').num_rows > 0
+
+
+def test_force_rebuilds_everything(data_dir):
+    assert convert(data_dir) == 0
+    before = age_feathers(data_dir)
+
+    assert convert(data_dir, '--force') == 0
+    assert rewritten(data_dir) == before
+    assert read_report(data_dir)['counters']['convert.files.converted'] == len(before)
+
+
+def test_deleted_csvs_leave_the_manifest(data_dir):
+    assert convert(data_dir) == 0
+    (data_dir / 'thai.csv').unlink()
+    assert convert(data_dir) == 0
+    assert 'thai.csv' not in ctf.load_manifest(data_dir / ctf.MANIFEST_NAME)['files']
+
+
+def test_failed_conversion_keeps_the_previous_file(data_dir):
+    assert convert(data_dir) == 0
+    content = (data_dir / 'pk.feather').read_bytes()
+    (data_dir / 'pk.csv').write_bytes(b'')
+
+    assert convert(data_dir) == 1
+    assert (data_dir / 'pk.feather').read_bytes() == content
+    assert not list(data_dir.glob('*.tmp'))
+
+
+def test_parallel_conversion_matches_serial(data_dir, tmp_path):
+    serial = tmp_path / 'serial'
+    serial.mkdir()
+    for path in data_dir.glob('*.csv'):
+        (serial / path.name).write_bytes(path.read_bytes())
+
+    assert convert(serial, '--jobs', '1') == 0
+    assert convert(data_dir, '--jobs', '4') == 0
+    names = sorted(path.name for path in serial.glob('*.feather'))
+    assert names == sorted(path.name for path in data_dir.glob('*.feather'))
+    for name in names:
+        assert (data_dir / name).read_bytes() == (serial / name).read_bytes()
+    assert ctf.load_manifest(data_dir / ctf.MANIFEST_NAME) == ctf.load_manifest(serial / ctf.MANIFEST_NAME)
+
+
+def test_parallel_errors_are_collected(data_dir, capsys):
+    (data_dir / 'broken.csv').write_bytes(b'')
+    (data_dir / 'unterminated.csv').write_bytes(b'a,b\n"unterminated\n')
+
+    assert convert(data_dir, '--jobs', '4') == 1
+    out = capsys.readouterr().out
+    assert 'ERROR on broken.csv' in out and 'ERROR on unterminated.csv' in out
+    # The other files are converted and recorded; the failures are not
+    manifest = ctf.load_manifest(data_dir / ctf.MANIFEST_NAME)['files']
+    assert 'broken.csv' not in manifest and 'unterminated.csv' not in manifest
+    assert 'us.csv' in manifest and (data_dir / 'us.feather').exists()
+    assert not (data_dir / 'broken.feather').exists()
+    counters = read_report(data_dir)['counters']
+    assert counters['convert.files.failed'] == 2
+    assert counters['convert.files.converted'] == len(manifest)
+
+    # Once fixed, only the failed files are converted
+    (data_dir / 'broken.csv').write_text('a,b\n1,2\n', encoding='utf-8')
+    (data_dir / 'unterminated.csv').write_text('a,b\n3,4\n', encoding='utf-8')
+    assert convert(data_dir, '--jobs', '4') == 0
+    assert read_report(data_dir)['counters']['convert.files.converted'] == 2
@@ -0,0 +1,78 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pytest
+
+import build_country_summary as bcs
+import merge_countries
+from aircombat.datafiles import read_strings
+from aircombat.store import FILE_CODE_TO_FLAG
+
+
+@pytest.fixture
+def merged_dir(data_dir):
+    merge_countries.merge_csvs(str(data_dir))
+    feather.write_feather(read_strings(data_dir / 'calcs.csv'), data_dir / 'calcs.feather',
+                          compression='uncompressed')
+    return data_dir
+
+
+def test_fleet_totals():
+    fleet = pa.table({
+        'country': ['us', 'us', 'us', 'us', 'uk'],
+        'Aircraft': ['F-35A', 'MQ-9', 'B-21', '', 'Typhoon'],
+        'In Service': ['100+', '50', '0', '7', None],
+        'Manned': ['Yes', 'No', 'Yes', 'Yes', 'Yes'],
+        'Type': ['Fighter', None, 'Bomber', 'Fighter', 'Fighter'],
+    })
+    assert bcs.fleet_totals(fleet) == {
+        # Blank names and missing counts are skipped; a count of 0 still lists the type
+        'us': {'manned': 100, 'unmanned': 50, 'types': {'Fighter': 100, 'Unknown': 50, 'Bomber': 0}},
+        'uk': {'manned': 0, 'unmanned': 0, 'types': {}},
+    }
+
+
+def test_totals_match_the_pages(merged_dir):
+    summary = bcs.build_summary(merged_dir).to_pylist()
+
+    fleet = pd.read_csv(merged_dir / 'global_merged.csv', dtype=str)
+    # parseInt() of the In Service cell, as the pages compute it
+    fleet['count'] = pd.to_numeric(fleet['In Service'].str.extract(r'^\s*(\d+)')[0])
+    fleet = fleet[fleet['Aircraft'].notna() & fleet['count'].notna()]
+    manned = fleet[fleet['Manned'] == 'Yes'].groupby('country')['count'].sum()
+    unmanned = fleet[fleet['Manned'] != 'Yes'].groupby('country')['count'].sum()
+    for row in summary:
+        assert row['manned_count'] == manned.get(row['country'], 0)
+        assert row['unmanned_count'] == unmanned.get(row['country'], 0)
+        assert sum(t['count'] for t in row['types']) == row['manned_count'] + row['unmanned_count']
+        counts = [t['count'] for t in row['types']]
+        assert counts == sorted(counts, reverse=True)
+
+
+def test_ranks_and_flags(merged_dir):
+    summary = bcs.build_summary(merged_dir).to_pylist()
+    calcs = pd.read_csv(merged_dir / 'calcs.csv')
+
+    assert [row['rank'] for row in summary] == list(range(1, len(summary) + 1))
+    assert [row['LI'] for row in summary] == sorted((row['LI'] for row in summary), reverse=True)
+    by_flag = {row['flag_code']: row for row in summary}
+    for record in calcs.to_dict('records'):
+        row = by_flag[record['Flag Abbrev'].strip().lower()]
+        assert (row['Country'], row['LI']) == (record['Country'].strip(), float(record['LI']))
+    for code, flag in FILE_CODE_TO_FLAG.items():
+        assert any(row['country'] == code and row['flag_code'] == flag for row in summary)
+
+
+def test_string_and_typed_inputs_agree(merged_dir):
+    typed = bcs.build_summary(merged_dir)
+    strings = bcs.build_summary(merged_dir, {'global_merged': read_strings(merged_dir / 'global_merged.csv'),
+                                             'calcs': read_strings(merged_dir / 'calcs.csv')})
+    assert strings.equals(typed)
+
+
+def test_main_writes_the_summary(merged_dir, tmp_path):
+    assert bcs.main(['--data-dir', str(merged_dir)]) == 0
+    written = feather.read_table(merged_dir / bcs.OUTPUT_NAME)
+    assert written.equals(bcs.build_summary(merged_dir))
+    assert not list(merged_dir.glob('*.tmp'))
+    assert bcs.main(['--data-dir', str(tmp_path / 'missing')]) == 1
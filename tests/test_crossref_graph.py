@@ -0,0 +1,122 @@
+import pyarrow as pa
+import pytest
+
+import build_crossref_graph as bcg
+import merge_countries
+from aircombat.graph import CrossRefGraph, NameResolver, name_aliases, normalize_name
+
+
+def table(names, *rows):
+    return pa.table({name: [row[i] for row in rows] for i, name in enumerate(names)})
+
+
+@pytest.fixture
+def inputs():
+    return {
+        'calcs': table(['Country', 'Flag Abbrev', 'Sell', 'Buy'],
+                       ('United States', 'US', 'United Kingdom-Korea', ''),
+                       ('United Kingdom', 'GB', '', 'United States')),
+        'company': table(['Company', 'Country'],
+                         ('RTX Corporation (Raytheon)', 'United States'),
+                         ('MBDA', 'France / United Kingdom')),
+        'products': table(['Product', 'Company', 'Associated products'],
+                          ('AIM-120D-3 AMRAAM', 'Raytheon', 'F-35A'),
+                          ('Meteor', 'MBDA', 'Typhoon')),
+        'global_merged': table(['country', 'Aircraft', 'Company', 'Associated products'],
+                               ('us', 'F-35A', 'Lockheed Martin', 'AIM-120D-3, AN/APG-81 (implied)'),
+                               ('uk', 'Typhoon', 'BAE Systems', 'Meteor long-range BVR missile, AIM-120D-3'),
+                               ('uk', 'F-35A', 'Lockheed Martin', ''),
+                               ('uk', '', 'Nobody', 'Ghost')),
+    }
+
+
+def test_normalize_name_and_aliases():
+    assert normalize_name('  AIM-120D-3  AMRAAM (implied)') == 'aim-120d-3 amraam'
+    # Only a spaced-off parenthetical is dropped; '(V)' stays part of the key
+    assert normalize_name('AN/APG-77(V)1') == 'an/apg-77 v 1'
+    assert normalize_name("Boeing, Inc.; \"Super\"") == "boeing inc. super"
+    assert name_aliases('RTX Corporation (Raytheon)') == ['rtx corporation', 'raytheon']
+    assert name_aliases('AN/APG-81 (implied)') == ['an/apg-81']
+    assert name_aliases(None) == name_aliases(' ( ) ') == []
+
+
+def test_resolver_rules():
+    resolver = NameResolver()
+    for node, name in enumerate(['AIM-120D-3 AMRAAM', 'AIM-120C-7', 'Meteor', 'PL-15',
+                                 'Saab AB', 'RTX Corporation (Raytheon)']):
+        resolver.add(name, node)
+    assert resolver.resolve('aim-120d-3 amraam') == 0
+    assert resolver.resolve('Raytheon') == 5
+    assert resolver.resolve('PL-15 long-range BVR missile') == 3   # generic words dropped
+    assert resolver.resolve('AIM-120D-3') == 0                     # token prefix of a node name
+    assert resolver.resolve('Saab') == 4
+    assert resolver.resolve('AIM-120C-7 AMRAAM') == 1              # extends a designator
+    assert resolver.resolve('Meteor seeker') is None               # but not a plain word
+    assert resolver.resolve('AIM-120D-3', fuzzy=False) is None
+    assert resolver.resolve('') is None
+
+
+def test_resolver_leaves_ambiguous_names_alone():
+    resolver = NameResolver(contains=True)
+    for node, name in enumerate(['South Korea', 'North Korea', 'United Kingdom', 'UAC (Sukhoi)', 'UAC (MiG)']):
+        resolver.add(name, node)
+    assert resolver.resolve('Kingdom') == 2          # a word run, with contains=True
+    assert resolver.resolve('Korea') is None
+    assert resolver.resolve('UAC') is None
+    assert resolver.resolve('Sukhoi') == 3
+    assert NameResolver().resolve('Kingdom') is None
+
+
+def test_build_graph_resolves_mentions(inputs, tmp_path):
+    graph = bcg.build_graph(inputs=inputs)
+    nodes = {(kind, name): node for node, (kind, name) in enumerate(zip(graph.kinds, graph.names))}
+    links = {(graph.names[s], kind, graph.names[t]) for s, kind, t in graph.edges}
+
+    # 'GB' maps to the fleet's 'uk' file code, so the fleet adds no second UK node
+    assert graph.codes[nodes['country', 'United Kingdom']] == 'uk'
+    assert {name for kind, name in nodes if kind == 'country'} == {
+        'United States', 'United Kingdom', 'France', 'Korea'}
+    assert graph.names.count('F-35A') == 1
+    assert ('company', 'Ghost') not in nodes and ('product', 'Ghost') not in nodes
+    assert {
+        ('United States', 'operates', 'F-35A'),
+        ('United Kingdom', 'operates', 'F-35A'),
+        ('F-35A', 'associated', 'AIM-120D-3 AMRAAM'),
+        ('Typhoon', 'associated', 'Meteor'),
+        ('AIM-120D-3 AMRAAM', 'made_by', 'RTX Corporation (Raytheon)'),
+        ('MBDA', 'based_in', 'United Kingdom'),
+        ('United States', 'exports_to', 'Korea'),
+        ('United Kingdom', 'imports_from', 'United States'),
+    } <= links
+    for source, kind, target in graph.edges:
+        assert (target, bcg.EDGE_KINDS[kind], source) in graph.edges
+    assert ('product', 'AN/APG-81 (implied)') in nodes
+
+    bcg.write_graph(graph, tmp_path)
+    assert not list(tmp_path.glob('*.tmp'))
+    loaded = CrossRefGraph(tmp_path)
+    assert loaded.node('uk') == loaded.node('United Kingdom') == nodes['country', 'United Kingdom']
+    assert loaded.node('AIM-120D-3') == nodes['product', 'AIM-120D-3 AMRAAM']
+    assert loaded.operators_of_company('Raytheon') == []
+    assert loaded.operators_of_company('Raytheon', hops=3) == ['United States', 'United Kingdom']
+    assert loaded.operators_of_company('MBDA') == []
+    assert loaded.operators_of_company('MBDA', hops=3) == ['United Kingdom']
+    assert loaded.operators_of_company('Nobody at all') == []
+
+
+def test_csr_matches_the_edges(data_dir):
+    merge_countries.merge_csvs(str(data_dir))
+    assert bcg.main(['--data-dir', str(data_dir)]) == 0
+    graph = CrossRefGraph(data_dir)
+    built = bcg.build_graph(data_dir)
+    assert graph.names == built.names
+    expected = {}
+    for source, kind, target in built.edges:
+        expected.setdefault(source, set()).add((target, kind))
+    for node in range(len(graph)):
+        start, end = graph.indptr[node], graph.indptr[node + 1]
+        stored = {(int(graph.targets[i]), graph.edge_kind_names[graph.edge_kinds[i]]) for i in range(start, end)}
+        assert stored == expected.get(node, set())
+    # Every country with a file code is found by it
+    for code, node in graph.by_code.items():
+        assert graph.node(code) == node and graph.kind(node) == 'country'
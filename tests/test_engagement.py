@@ -0,0 +1,80 @@
+import pathlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from aircombat import engagement
+
+DATA_DIR = pathlib.Path(__file__).resolve().parent.parent / 'data'
+TRIALS = 2000
+
+
+@pytest.fixture(scope='module')
+def profiles():
+    calcs, fleet = engagement.load_inputs(DATA_DIR)
+    return engagement.build_profiles(calcs, fleet).head(6)
+
+
+def test_same_seed_same_result_for_any_jobs(profiles):
+    serial = engagement.win_matrix(profiles, TRIALS, seed=11, jobs=1)
+    for jobs in (2, 3):
+        parallel = engagement.win_matrix(profiles, TRIALS, seed=11, jobs=jobs)
+        for name in ('win', 'draw', 'ci_low', 'ci_high'):
+            pd.testing.assert_frame_equal(parallel[name], serial[name])
+    assert not engagement.win_matrix(profiles, TRIALS, seed=12, jobs=1)['win'].equals(serial['win'])
+
+
+def test_win_matrix_is_consistent(profiles):
+    result = engagement.win_matrix(profiles, TRIALS, seed=1, jobs=1)
+    win = result['win'].to_numpy()
+    # Draws count half to each side, so every pair sums to one
+    assert np.allclose(win + win.T, 1.0)
+    assert np.allclose(np.diag(result['draw']), 1.0)
+    assert (result['ci_low'].to_numpy() <= result['ci_high'].to_numpy()).all()
+    assert result['trials'] == TRIALS * len(profiles) * (len(profiles) - 1) // 2
+
+
+def test_mirror_match_is_even(profiles):
+    side = profiles.to_dict('records')[0]
+    wins, draws, losses = engagement.simulate_pair(side, side, 20000, seed=5)
+    assert wins + draws + losses == 20000
+    assert abs(wins - losses) / 20000 < 0.03
+
+
+def test_wilson_interval():
+    low, high = engagement.wilson_interval(np.array([0, 50, 100]), 100)
+    assert low[0] == pytest.approx(0, abs=1e-12) and high[2] == pytest.approx(1)
+    assert low[1] == pytest.approx(0.4038, abs=1e-4) and high[1] == pytest.approx(0.5962, abs=1e-4)
+
+
+def test_empty_packages_are_left_out(capsys):
+    calcs, fleet = engagement.load_inputs(DATA_DIR)
+    calcs = calcs.head(4).copy()
+    calcs.loc[1, '60'] = ''
+    calcs.loc[2, '60'] = 'not a loadout'
+    profiles = engagement.build_profiles(calcs, fleet)
+    assert list(profiles['Country']) == [calcs.loc[0, 'Country'], calcs.loc[3, 'Country']]
+    assert (profiles['package'] > 0).all()
+    assert 'no aircraft parsed from column 60' in capsys.readouterr().out
+
+    result = engagement.win_matrix(profiles, 500, seed=1, jobs=1)
+    assert np.isfinite(result['win'].to_numpy()).all()
+
+
+def test_an_empty_side_loses(profiles):
+    side = profiles.to_dict('records')[0]
+    assert engagement.simulate_pair(dict(side, package=0), side, 100, seed=1) == (0, 0, 100)
+
+
+def test_package_is_capped_by_the_fleet():
+    calcs = pd.DataFrame([{'Country': 'X', 'Flag Abbrev': 'us', '60': 'F-22A (40) + F-35A (20)',
+                           'BVR': 'AIM-120D (160)', 'AEW': 'E-7 (400)', 'BVR limit km': 120,
+                           **{name: 80 for name in 'ABCDE'}}])
+    fleet = pd.DataFrame({'country': ['us', 'us'], 'Aircraft': ['F-22A', 'C-17'],
+                          'In Service': ['25', '200'], 'Manned': ['Yes', 'Yes'],
+                          'Type': ['Fighter', 'Transport']})
+    profile = engagement.build_profiles(calcs, fleet).iloc[0]
+    assert (profile['package'], profile['fleet']) == (25, 60)
+    assert (profile['missile_km'], profile['engage_km'], profile['detect_km']) == (160, 120, 400)
+    assert engagement.build_profiles(calcs).iloc[0]['package'] == 60
@@ -0,0 +1,26 @@
+import pathlib
+
+import pytest
+
+import update_aircraft_images as uai
+from benchmarks.bench_filename_variations import corpus, legacy_generate_filename_variations
+
+DATA_DIR = pathlib.Path(__file__).resolve().parent.parent / 'data'
+NAMES = sorted(set(corpus(DATA_DIR)))
+
+
+@pytest.mark.parametrize('name', NAMES)
+def test_matches_legacy_without_repeats(name):
+    expected = list(dict.fromkeys(legacy_generate_filename_variations(name)))
+    assert uai.generate_filename_variations(name) == expected
+
+
+def test_empty_filename():
+    assert uai.generate_filename_variations('') == []
+    assert uai.generate_filename_variations(None) == []
+
+
+def test_results_are_independent_copies():
+    first = uai.generate_filename_variations('F-16 USAF (2019).jpg')
+    first.append('mutated')
+    assert 'mutated' not in uai.generate_filename_variations('F-16 USAF (2019).jpg')
@@ -0,0 +1,114 @@
+import pyarrow as pa
+import pyarrow.feather as feather
+import pytest
+
+import merge_countries
+import snapshot_history
+from aircombat.datafiles import read_strings
+from aircombat.history import History, row_hashes, row_keys
+
+
+def fleet(*rows):
+    return pa.table({'country': [row[0] for row in rows], 'Aircraft': [row[1] for row in rows],
+                     'In Service': pa.array([row[2] for row in rows], pa.int64())})
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = History(tmp_path / 'history')
+    history.append('global_merged', fleet(('us', 'F-35A', 300), ('uk', 'F-35B', 30), ('uk', 'Typhoon', 130)),
+                   '2026-01-04')
+    history.append('global_merged', fleet(('us', 'F-35A', 320), ('uk', 'F-35B', 30), ('fr', 'Rafale', 100)),
+                   '2026-02-01')
+    history.append('global_merged', fleet(('us', 'F-35A', 320), ('uk', 'F-35B', 34), ('uk', 'Typhoon', 120),
+                                          ('fr', 'Rafale', 100)), '2026-03-01')
+    return history
+
+
+def partition_keys(history, date):
+    return feather.read_table(history.partition('global_merged', date)).column('_key').to_pylist()
+
+
+def test_row_keys_and_hashes():
+    table = pa.table({'country': ['us', 'us', 'uk'], 'Aircraft': ['F-35A ', 'F-35A', None]})
+    assert row_keys(table, ['country', 'Aircraft']) == ['us|F-35A', 'us|F-35A|2', 'uk|']
+    # A column of nulls does not change any hash
+    wider = table.append_column('Notes', pa.array([None] * 3, pa.string()))
+    assert row_hashes(wider) == row_hashes(table)
+    assert row_hashes(table)[0] != row_hashes(table)[1]
+
+
+def test_only_changes_are_stored(history):
+    assert history.dates() == ['2026-01-04', '2026-02-01', '2026-03-01']
+    assert history.manifest['snapshots']['2026-02-01']['global_merged'] == {
+        'rows': 3, 'added': 1, 'changed': 1, 'removed': 1, 'unchanged': 1}
+    assert partition_keys(history, '2026-01-04') == ['us|F-35A', 'uk|F-35B', 'uk|Typhoon']
+    assert partition_keys(history, '2026-02-01') == ['us|F-35A', 'fr|Rafale']
+    # Typhoon came back with a new count, so it is stored again
+    assert partition_keys(history, '2026-03-01') == ['uk|F-35B', 'uk|Typhoon']
+
+    assert history.state('global_merged', '2026-02-15') == {
+        'us|F-35A': {'country': 'us', 'Aircraft': 'F-35A', 'In Service': 320},
+        'uk|F-35B': {'country': 'uk', 'Aircraft': 'F-35B', 'In Service': 30},
+        'fr|Rafale': {'country': 'fr', 'Aircraft': 'Rafale', 'In Service': 100},
+    }
+    assert history.state('global_merged', '2025-12-31') == {}
+
+
+def test_changes(history):
+    changes = history.changes('global_merged', '2026-01-04', '2026-02-01')
+    assert [(c['key'], c['change'], c['columns']) for c in changes] == [
+        ('fr|Rafale', 'added', []),
+        ('uk|Typhoon', 'removed', []),
+        ('us|F-35A', 'changed', ['In Service']),
+    ]
+    assert (changes[2]['before']['In Service'], changes[2]['after']['In Service']) == (300, 320)
+    assert changes[0]['before'] is None and changes[1]['after'] is None
+
+    # Across both steps Typhoon is a change, not a removal and an addition
+    changes = history.changes('global_merged', '2026-01-04', '2026-03-01')
+    assert [(c['key'], c['change']) for c in changes] == [
+        ('fr|Rafale', 'added'), ('uk|F-35B', 'changed'), ('uk|Typhoon', 'changed'), ('us|F-35A', 'changed')]
+    assert history.changes('global_merged', '2026-03-01', '2026-03-01') == []
+
+
+def test_trend(history):
+    assert history.trend('f-35a') == [('2026-01-04', {'us': 300}), ('2026-02-01', {'us': 320}),
+                                      ('2026-03-01', {'us': 320})]
+    assert history.trend('Typhoon', country='uk') == [('2026-01-04', {'uk': 130}), ('2026-02-01', {}),
+                                                      ('2026-03-01', {'uk': 120})]
+    assert history.trend('Typhoon', country='fr') == []
+    assert history.trend('F-22A') == []
+
+
+def test_append_rules(history, tmp_path):
+    with pytest.raises(ValueError):
+        history.append('global_merged', fleet(('us', 'F-35A', 1)), '2026-02-15')
+    with pytest.raises(ValueError):
+        history.append('products', fleet(('us', 'F-35A', 1)), '2026-04-01')
+
+    # Snapshotting the latest date again replaces it
+    history.append('global_merged', fleet(('us', 'F-35A', 330)), '2026-03-01')
+    reopened = History(tmp_path / 'history')
+    assert reopened.state('global_merged', '2026-03-01') == {
+        'us|F-35A': {'country': 'us', 'Aircraft': 'F-35A', 'In Service': 330}}
+    assert reopened.manifest['snapshots']['2026-03-01']['global_merged']['removed'] == 2
+    assert not list((tmp_path / 'history').rglob('*.tmp'))
+
+
+def test_snapshot_of_the_data(data_dir):
+    merge_countries.merge_csvs(str(data_dir))
+    first = snapshot_history.snapshot(data_dir, '2026-01-04')
+    for name, counts in first.items():
+        assert counts['added'] == counts['rows'] and counts['unchanged'] == 0
+
+    # The feather and a committed CSV of the same data hash the same, so nothing changes
+    inputs = {'global_merged': snapshot_history.fleet_from_csv(read_strings(data_dir / 'global_merged.csv'))}
+    second = snapshot_history.snapshot(data_dir, '2026-01-05', inputs=inputs)
+    for name, counts in second.items():
+        assert counts['unchanged'] == counts['rows']
+    history = History(data_dir / 'history')
+    assert not history.partition('global_merged', '2026-01-05').exists()
+    assert history.changes('calcs', '2026-01-04', '2026-01-05') == []
+
+    assert snapshot_history.main(['--data-dir', str(data_dir), '--date', '01/06/2026']) == 1
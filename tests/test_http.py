@@ -0,0 +1,94 @@
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from aircombat import instrument
+from aircombat.http import HttpClient
+
+
+class FlakyServer:
+    """Answers `failures` requests with `status`, then 200"""
+
+    def __init__(self, failures, status=503):
+        self.failures = failures
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.requests += 1
+                failed = server.requests <= server.failures
+                body = b'busy' if failed else b'ok'
+                self.send_response(status if failed else 200)
+                if failed:
+                    self.send_header('Retry-After', '0')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def counters(monkeypatch):
+    recorder = instrument.Recorder()
+    monkeypatch.setattr(instrument, '_recorder', recorder)
+    return recorder.counters
+
+
+@pytest.mark.parametrize('status', [429, 503])
+def test_transient_answers_are_retried(counters, status):
+    server = FlakyServer(2, status)
+    try:
+        response = HttpClient(retries=2, backoff=0).get(server.url)
+    finally:
+        server.close()
+    assert response.status_code == 200 and response.content == b'ok'
+    assert server.requests == 3
+    assert counters['http.retries'] == 2
+    assert counters['http.requests'] == 3
+    assert counters['http.bytes'] == 2
+
+
+def test_retries_are_bounded(counters):
+    server = FlakyServer(10)
+    try:
+        response = HttpClient(retries=2, backoff=0).get(server.url)
+    finally:
+        server.close()
+    assert response.status_code == 503
+    assert server.requests == 3
+    assert counters['http.retries'] == 2
+
+
+def test_client_errors_are_not_retried(counters):
+    server = FlakyServer(1, status=404)
+    try:
+        response = HttpClient(backoff=0).get(server.url)
+    finally:
+        server.close()
+    assert response.status_code == 404
+    assert server.requests == 1
+    assert 'http.retries' not in counters
+
+
+def test_connection_errors_are_retried_then_raised(counters):
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    with pytest.raises(requests.ConnectionError):
+        HttpClient(retries=1, backoff=0).get(f"http://127.0.0.1:{port}/", timeout=1)
+    assert counters['http.retries'] == 1
+    assert counters['http.errors'] == 2
@@ -0,0 +1,89 @@
+import pandas as pd
+import pyarrow.feather as feather
+import pytest
+
+import merge_countries as mc
+from aircombat.datafiles import COUNTRY_CSV, country_csvs
+
+
+def baseline_csv(data_dir):
+    """The original pandas merge: read each country file whole and concat"""
+    frames = []
+    for path in country_csvs(data_dir):
+        frame = pd.read_csv(path)
+        frame['country'] = path.stem
+        frames.append(frame)
+    merged = pd.concat(frames, ignore_index=True).reindex(columns=mc.MERGED_COLUMNS + ['country'])
+    return merged.to_csv(index=False)
+
+
+def test_csv_matches_the_pandas_merge(data_dir):
+    expected = baseline_csv(data_dir)
+    assert mc.merge_csvs(str(data_dir)) == expected.count('\n') - 1
+    assert (data_dir / 'global_merged.csv').read_text(encoding='utf-8') == expected
+
+
+def test_small_blocks_give_the_same_output(data_dir, monkeypatch):
+    mc.merge_csvs(str(data_dir))
+    csv_bytes = (data_dir / 'global_merged.csv').read_bytes()
+    table = feather.read_table(data_dir / 'global_merged.feather')
+
+    # Several record batches per file; only the Feather batch layout changes
+    monkeypatch.setattr(mc, 'READ_BLOCK_SIZE', 4096)
+    mc.merge_csvs(str(data_dir))
+    assert (data_dir / 'global_merged.csv').read_bytes() == csv_bytes
+    assert feather.read_table(data_dir / 'global_merged.feather').equals(table)
+
+
+def test_feather_matches_the_csv(data_dir):
+    mc.merge_csvs(str(data_dir))
+    table = feather.read_table(data_dir / 'global_merged.feather')
+    countries = [path.stem for path in country_csvs(data_dir)]
+    assert table.schema == mc.merged_schema(countries)
+
+    csv_rows = pd.read_csv(data_dir / 'global_merged.csv', dtype=str, keep_default_na=False).to_dict('records')
+    assert len(csv_rows) == table.num_rows
+    for row, record in zip(csv_rows, table.to_pylist()):
+        # In Service is an int32 count, with the original text kept aside
+        # for cells such as '100+'
+        count, text = record['In Service'], record[mc.IN_SERVICE_TEXT]
+        assert row['In Service'] == (text if text is not None else str(count) if count is not None else '')
+        assert row['country'] == record['country']
+        assert row['Aircraft'] == (record['Aircraft'] or '')
+
+
+def test_columns_are_matched_by_name(tmp_path):
+    (tmp_path / 'aa.csv').write_text('Aircraft,In Service,Company\nF-16,100+,Lockheed Martin\n', encoding='utf-8')
+    (tmp_path / 'BB.csv').write_text('Company,Aircraft\nSaab,Gripen\n', encoding='utf-8')
+    (tmp_path / 'notes.csv').write_text('Aircraft\nignored\n', encoding='utf-8')
+
+    assert mc.merge_csvs(str(tmp_path)) == 2
+    table = feather.read_table(tmp_path / 'global_merged.feather')
+    # Files merge in sorted name order, upper case first
+    assert table.column('country').to_pylist() == ['BB', 'aa']
+    assert table.column('Aircraft').to_pylist() == ['Gripen', 'F-16']
+    assert table.column('Company').to_pylist() == ['Saab', 'Lockheed Martin']
+    assert table.column('In Service').to_pylist() == [None, 100]
+    assert table.column(mc.IN_SERVICE_TEXT).to_pylist() == [None, '100+']
+
+
+def test_a_bad_file_is_skipped_whole(tmp_path):
+    (tmp_path / 'aa.csv').write_text('Aircraft\nF-16\n', encoding='utf-8')
+    (tmp_path / 'bb.csv').write_text('Aircraft,Company\nGripen,Saab\nRafale\n', encoding='utf-8')
+
+    assert mc.merge_csvs(str(tmp_path)) == 1
+    assert (tmp_path / 'global_merged.csv').read_text(encoding='utf-8').splitlines()[1:] == \
+        ['F-16' + ',' * len(mc.MERGED_COLUMNS[1:]) + ',aa']
+    assert not list(tmp_path.glob('*.tmp'))
+
+
+def test_no_country_files(tmp_path):
+    assert mc.merge_csvs(str(tmp_path)) is None
+    assert mc.main(['--data-dir', str(tmp_path)]) == 1
+    assert not (tmp_path / 'global_merged.csv').exists()
+
+
+@pytest.mark.parametrize('name, expected', [('us.csv', True), ('RUS.csv', True), ('iran.csv', False),
+                                            ('calcs.csv', False), ('global_merged.csv', False)])
+def test_country_file_names(name, expected):
+    assert bool(COUNTRY_CSV.match(name)) is expected
@@ -0,0 +1,111 @@
+import pyarrow as pa
+import pyarrow.feather as feather
+import pytest
+
+import build_normalized_tables as bnt
+import merge_countries
+from aircombat.parsing import GrammarError, parse_airports, parse_items, parse_list
+
+
+def calcs_table(*rows):
+    names = ['Country', 'Flag Abbrev', '60', 'BVR', 'AEW']
+    return pa.table({name: [row[i] for row in rows] for i, name in enumerate(names)})
+
+
+def fleet_table(*rows):
+    names = ['country', 'Aircraft', 'Associated products', 'Airport']
+    return pa.table({name: [row[i] for row in rows] for i, name in enumerate(names)})
+
+
+def rows(table):
+    return [tuple(row.values()) for row in table.to_pylist()]
+
+
+def test_parse_items():
+    assert parse_items('F-22A (20) + F-35A Blk-4 (25) + F-15EX (15)') == [
+        ('F-22A', 20), ('F-35A Blk-4', 25), ('F-15EX', 15)]
+    assert parse_items('AIM-120D-3 (180) / AIM-260 (230)') == [('AIM-120D-3', 180), ('AIM-260', 230)]
+    # Separators need spaces around them, so these names stay whole
+    assert parse_items('F-16A/B MLU (10) + AN/APG-81 (1)') == [('F-16A/B MLU', 10), ('AN/APG-81', 1)]
+    assert parse_items('Podsolnukh-E (3,000) / Voronezh (1 100)') == [('Podsolnukh-E', 3000), ('Voronezh', 1100)]
+    assert parse_items(float('nan')) == parse_items('  ') == []
+    with pytest.raises(GrammarError):
+        parse_items('F-22A (20) + some more')
+    assert parse_items('F-22A (20) + some more', strict=False) == [('F-22A', 20)]
+
+
+def test_parse_lists_and_airports():
+    assert parse_list(' AIM-120 ,Meteor,, ') == ['AIM-120', 'Meteor']
+    assert parse_airports('Multiple: Nellis AFB, N/A (radar system), Not yet based, Eglin AFB') == [
+        'Nellis AFB', 'Eglin AFB']
+    assert parse_airports('Multiple (see list)') == []
+
+
+def test_build_tables_extracts_every_column():
+    calcs = calcs_table(
+        ('Russia', 'RU', 'Su-57 (12) + Su-35S (48)', 'R-77M (200) / R-37M (400)', 'A-100 (400)'),
+        ('Neverland', 'zz', 'Kite (30) + Kite (30)', 'Dart (2)', ''),
+    )
+    fleet = fleet_table(
+        ('rus', 'Su-57', 'R-77M, R-37M, R-77M', 'Akhtubinsk, N/A (test)'),
+        ('rus', '', 'R-73', 'Lipetsk'),
+    )
+    tables, issues = bnt.build_tables(inputs={'calcs': calcs, 'global_merged': fleet})
+
+    # Flag codes map to the fleet's file codes ('ru' -> 'rus'); unknown ones stay as they are
+    assert rows(tables['loadouts.feather']) == [('rus', 'Su-57', 12), ('rus', 'Su-35S', 48), ('zz', 'Kite', 30)]
+    assert rows(tables['missiles.feather']) == [('rus', 'R-77M', 200), ('rus', 'R-37M', 400), ('zz', 'Dart', 2)]
+    assert rows(tables['aew.feather']) == [('rus', 'A-100', 400)]
+    assert rows(tables['aircraft_products.feather']) == [('rus', 'Su-57', 'R-77M'), ('rus', 'Su-57', 'R-37M')]
+    assert rows(tables['aircraft_airports.feather']) == [('rus', 'Su-57', 'Akhtubinsk')]
+    assert issues == [
+        'calcs Neverland [AEW]: nothing parsed',
+        "loadouts.feather: duplicate row ('zz', 'Kite', 30)",
+        "aircraft_products.feather: duplicate row ('rus', 'Su-57', 'R-77M')",
+    ]
+
+    loadouts = tables['loadouts.feather']
+    assert loadouts.schema.field('country').type == pa.dictionary(pa.int32(), pa.string())
+    assert loadouts.schema.field('count').type == pa.int32()
+
+
+def test_bad_cells_and_packages_are_reported():
+    calcs = calcs_table(('Utopia', 'ut', 'Glider (20) + ??? + Jet (0)', 'Dart (2)', 'Eye (5)'))
+    fleet = fleet_table(('ut', 'Glider', None, None))
+    tables, issues = bnt.build_tables(inputs={'calcs': calcs, 'global_merged': fleet})
+    assert rows(tables['loadouts.feather']) == [('ut', 'Glider', 20)]
+    assert issues == [
+        "calcs Utopia [60]: expected 'name (number)', got '???'",
+        'calcs Utopia [60]: package adds up to 20, not 60',
+        "loadouts.feather: invalid row ('ut', 'Jet', 0)",
+    ]
+
+
+def test_real_data(data_dir):
+    merge_countries.merge_csvs(str(data_dir))
+    tables, issues = bnt.build_tables(data_dir)
+    assert not issues
+    loadouts = tables['loadouts.feather'].to_pylist()
+    packages = {}
+    for row in loadouts:
+        packages[row['country']] = packages.get(row['country'], 0) + row['count']
+    assert set(packages.values()) == {bnt.PACKAGE_SIZE}
+    fleet_codes = set(feather.read_table(data_dir / 'global_merged.feather').column('country').to_pylist())
+    products = tables['aircraft_products.feather']
+    assert products.num_rows and set(products.column('country').to_pylist()) <= fleet_codes
+
+
+def test_main_strict_writes_nothing_on_issues(data_dir, capsys):
+    merge_countries.merge_csvs(str(data_dir))
+    assert bnt.main(['--data-dir', str(data_dir), '--strict']) == 0
+    for name, table in bnt.build_tables(data_dir)[0].items():
+        assert feather.read_table(data_dir / name).equals(table)
+        (data_dir / name).unlink()
+
+    calcs = (data_dir / 'calcs.csv').read_text(encoding='utf-8')
+    (data_dir / 'calcs.csv').write_text(calcs.replace('F-22A (20)', 'F-22A (twenty)', 1), encoding='utf-8')
+    assert bnt.main(['--data-dir', str(data_dir), '--strict']) == 1
+    assert 'nothing written' in capsys.readouterr().out
+    assert not any((data_dir / name).exists() for name in bnt.TABLES)
+    assert bnt.main(['--data-dir', str(data_dir)]) == 0
+    assert all((data_dir / name).exists() for name in bnt.TABLES)
@@ -0,0 +1,98 @@
+import gzip
+import hashlib
+import json
+
+import pyarrow as pa
+import pyarrow.feather as feather
+import pytest
+
+import convert_to_feather
+import merge_countries
+import publish_data
+
+
+@pytest.fixture
+def feather_dir(data_dir):
+    merge_countries.merge_csvs(str(data_dir))
+    assert convert_to_feather.main(['--data-dir', str(data_dir)]) == 0
+    return data_dir
+
+
+def published_files(data_dir):
+    return sorted(path.name for path in (data_dir / publish_data.PUBLISH_DIR).iterdir())
+
+
+def test_manifest_names_match_the_content(feather_dir):
+    manifest = publish_data.publish(feather_dir)
+    out_dir = feather_dir / publish_data.PUBLISH_DIR
+    assert json.loads((out_dir / publish_data.MANIFEST_NAME).read_text(encoding='utf-8')) == manifest
+    assert set(manifest['tables']) == set(publish_data.VARIANTS)
+
+    for name, variants in manifest['tables'].items():
+        source = feather.read_table(feather_dir / f'{name}.feather')
+        assert set(variants) == set(publish_data.VARIANTS[name])
+        for variant, entry in variants.items():
+            data = (out_dir / entry['file']).read_bytes()
+            digest = hashlib.sha256(data).hexdigest()
+            assert entry['file'] == f"{name}.{variant}.{digest[:publish_data.HASH_LENGTH]}.feather"
+            assert (entry['sha256'], entry['bytes']) == (digest, len(data))
+            assert entry['source_bytes'] == (feather_dir / f'{name}.feather').stat().st_size
+            assert gzip.decompress((out_dir / (entry['file'] + '.gz')).read_bytes()) == data
+            assert entry['gz_bytes'] == (out_dir / (entry['file'] + '.gz')).stat().st_size
+
+            table = feather.read_table(out_dir / entry['file'])
+            assert table.column_names == entry['columns'] and table.num_rows == entry['rows']
+            assert table.schema.metadata is None
+            for column in table.column_names:
+                # Projection and encoding only; every value is the source's
+                assert table.column(column).cast(source.schema.field(column).type).equals(source.column(column))
+                if column in publish_data.DICTIONARY_COLUMNS:
+                    assert pa.types.is_dictionary(table.schema.field(column).type)
+    globe = manifest['tables']['global_merged']['globe']['columns']
+    assert 'Versions' not in globe and set(globe) <= set(publish_data.VARIANTS['global_merged']['globe'])
+
+
+def test_brotli_siblings(feather_dir):
+    brotli = pytest.importorskip('brotli')
+    manifest = publish_data.publish(feather_dir)
+    out_dir = feather_dir / publish_data.PUBLISH_DIR
+    for variants in manifest['tables'].values():
+        for entry in variants.values():
+            compressed = (out_dir / (entry['file'] + '.br')).read_bytes()
+            assert brotli.decompress(compressed) == (out_dir / entry['file']).read_bytes()
+            assert entry['br_bytes'] == len(compressed)
+
+
+def test_publishing_again_changes_nothing(feather_dir):
+    first = publish_data.publish(feather_dir)
+    out_dir = feather_dir / publish_data.PUBLISH_DIR
+    mtimes = {path.name: path.stat().st_mtime_ns for path in out_dir.iterdir()
+              if path.name != publish_data.MANIFEST_NAME}
+    assert publish_data.publish(feather_dir) == first
+    assert {name: (out_dir / name).stat().st_mtime_ns for name in mtimes} == mtimes
+    assert published_files(feather_dir) == sorted([*mtimes, publish_data.MANIFEST_NAME])
+
+
+def test_old_generations_are_pruned(feather_dir):
+    fleet = feather.read_table(feather_dir / 'global_merged.feather')
+    first = publish_data.publish(feather_dir)
+    (feather_dir / publish_data.PUBLISH_DIR / 'stray.feather').write_bytes(b'x')
+    second = publish_data.publish(feather_dir, {'global_merged': fleet.slice(1)})
+    third = publish_data.publish(feather_dir, {'global_merged': fleet.slice(2)})
+
+    def files(manifest, table='global_merged'):
+        return {entry['file'] for entry in manifest['tables'][table].values()}
+
+    assert not files(first) & files(second) and not files(second) & files(third)
+    # Unchanged tables keep their names across generations
+    assert files(first, 'calcs') == files(third, 'calcs')
+    names = set(published_files(feather_dir))
+    assert not any(name.startswith(tuple(files(first))) for name in names)
+    assert all(name in names for name in files(second) | files(third))
+    assert 'stray.feather' not in names and not any(name.endswith('.tmp') for name in names)
+
+
+def test_main(feather_dir, tmp_path, capsys):
+    assert publish_data.main(['--data-dir', str(feather_dir)]) == 0
+    assert 'manifest.json' in capsys.readouterr().out
+    assert publish_data.main(['--data-dir', str(tmp_path / 'missing')]) == 1
@@ -0,0 +1,125 @@
+import pathlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from aircombat import scoring
+
+CALCS = pathlib.Path(__file__).resolve().parent.parent / 'data' / 'calcs.csv'
+
+
+@pytest.fixture(scope='module')
+def matrix():
+    return scoring.subscore_matrix(scoring.load_calcs(CALCS))
+
+
+def naive_ranks(scores):
+    """1-based ranks, best first, ties in input order"""
+    order = sorted(range(len(scores)), key=lambda i: -scores[i])
+    ranks = [0] * len(scores)
+    for rank, i in enumerate(order, start=1):
+        ranks[i] = rank
+    return ranks
+
+
+def test_weight_vector():
+    assert scoring.weight_vector().sum() == pytest.approx(1.0)
+    assert list(scoring.weight_vector({'A': 2, 'C': 2})) == [0.5, 0, 0.5, 0, 0, 0, 0]
+    assert list(scoring.weight_vector([1] * 7)) == pytest.approx([1 / 7] * 7)
+    for bad in ({'A': 0}, {'Z': 1}, {'A': -1, 'B': 2}, [1, 2]):
+        with pytest.raises(ValueError):
+            scoring.weight_vector(bad)
+
+
+def test_parse_weights():
+    assert scoring.parse_weights('a=0.5, C=1') == {'A': 0.5, 'C': 1.0}
+    with pytest.raises(ValueError):
+        scoring.parse_weights('A')
+
+
+def test_check_recomputes_li_and_fps():
+    calcs = pd.DataFrame({'Country': ['X', 'Y', 'Z'], **{name: [90, 80, 70] for name in scoring.SUBSCORES}})
+    calcs['LI'] = [90.0, 80.0, 70.0]
+    calcs['FPS'] = [5400.0, 4800.0, 4200.0]
+    calcs.loc[1, 'LI'] = 81.0          # stored LI drifted
+    calcs.loc[2, 'FPS'] = 4210.0       # only the FPS is off
+    report = scoring.check_calcs(calcs)
+    assert list(report['LI computed']) == [90.0, 80.0, 70.0]
+    assert list(report['flagged']) == [False, True, True]
+
+
+def test_check_tolerates_display_rounding():
+    calcs = pd.DataFrame({'Country': ['X'], **{name: [95.85] for name in scoring.SUBSCORES}})
+    # Shown to one decimal, with FPS from the rounded LI
+    calcs['LI'] = [95.8]
+    calcs['FPS'] = [95.8 * 60]
+    assert not scoring.check_calcs(calcs)['flagged'].any()
+
+
+def test_check_matches_a_row_by_row_sum():
+    calcs = scoring.load_calcs(CALCS)
+    weights = scoring.DEFAULT_WEIGHTS
+    report = scoring.check_calcs(calcs)
+    for record, computed in zip(calcs.to_dict('records'), report['LI computed']):
+        expected = sum(float(record[name]) * weight for name, weight in weights.items())
+        assert computed == pytest.approx(expected, abs=5e-4)
+
+
+def test_rank_stability_matches_a_loop(matrix):
+    weightings = scoring.random_weights(300, spread=0.4, seed=7)
+    per_country, summary = scoring.rank_stability(matrix, weightings, top=3, chunk_size=64)
+
+    base = naive_ranks(matrix @ scoring.weight_vector())
+    ranks = np.array([naive_ranks(matrix @ w) for w in weightings])
+    n = len(matrix)
+    spearman = 1 - 6 * ((ranks - base) ** 2).sum(axis=1) / (n * (n ** 2 - 1))
+    assert list(per_country['baseline rank']) == base
+    assert list(per_country['mean rank']) == pytest.approx(ranks.mean(axis=0).round(3))
+    assert list(per_country['best rank']) == list(ranks.min(axis=0))
+    assert list(per_country['worst rank']) == list(ranks.max(axis=0))
+    assert list(per_country['P(same rank)']) == pytest.approx((ranks == base).mean(axis=0))
+    assert list(per_country['P(rank 1)']) == pytest.approx((ranks == 1).mean(axis=0))
+    assert list(per_country['P(top 3)']) == pytest.approx((ranks <= 3).mean(axis=0))
+    assert summary['spearman_mean'] == pytest.approx(spearman.mean())
+    assert summary['spearman_min'] == pytest.approx(spearman.min())
+    assert summary['order_unchanged'] == pytest.approx((ranks == base).all(axis=1).mean())
+
+
+def test_rank_stability_does_not_depend_on_chunking(matrix):
+    weightings = scoring.random_weights(500, seed=3)
+    whole = scoring.rank_stability(matrix, weightings)
+    chunked = scoring.rank_stability(matrix, weightings, chunk_size=7)
+    pd.testing.assert_frame_equal(whole[0], chunked[0])
+    assert whole[1] == pytest.approx(chunked[1])
+
+
+def test_zero_spread_keeps_every_rank(matrix):
+    weightings = scoring.random_weights(50, spread=0.0, seed=1)
+    per_country, summary = scoring.rank_stability(matrix, weightings)
+    assert (per_country['P(same rank)'] == 1).all()
+    assert summary['order_unchanged'] == 1
+    assert summary['spearman_min'] == pytest.approx(1.0)
+
+
+def test_rank_stability_needs_a_weighting(matrix):
+    with pytest.raises(ValueError):
+        scoring.rank_stability(matrix, np.empty((0, 7)))
+
+
+def test_cli(tmp_path, capsys):
+    assert scoring.main(['--calcs', str(CALCS), 'check']) == 0
+    output = tmp_path / 'sweep.csv'
+    assert scoring.main(['--calcs', str(CALCS), 'sweep', '--samples', '200', '--seed', '1',
+                         '--output', str(output)]) == 0
+    assert len(pd.read_csv(output)) == len(scoring.load_calcs(CALCS))
+    capsys.readouterr()
+
+
+@pytest.mark.parametrize('argv', [['--weights', 'A=0', 'check'], ['--weights', 'Z=1', 'check'],
+                                  ['--weights', 'A=x', 'check'], ['sweep', '--samples', '0']])
+def test_cli_rejects_bad_arguments(argv, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        scoring.main(['--calcs', str(CALCS), *argv])
+    assert exit_info.value.code == 2
+    assert 'Traceback' not in capsys.readouterr().err
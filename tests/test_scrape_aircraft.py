@@ -0,0 +1,185 @@
+import csv
+import hashlib
+import json
+import os
+import pathlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import scrape_aircraft as sa
+
+FIXTURES = pathlib.Path(__file__).resolve().parent / 'fixtures'
+
+
+class PageServer:
+    """Serves the saved pages in tests/fixtures, answering 304 to a
+    matching If-None-Match when `etags` is on"""
+
+    def __init__(self):
+        self.etags = True
+        self.requests = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def url(self, name):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/{name}"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.requests.append((self.path, dict(self.headers)))
+                path = FIXTURES / self.path.lstrip('/')
+                if not path.is_file():
+                    self.send_error(404)
+                    return
+                body = path.read_bytes()
+                etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+                if server.etags and self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                if server.etags:
+                    self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+@pytest.fixture
+def page_server():
+    server = PageServer()
+    server.thread.start()
+    yield server
+    server.server.shutdown()
+    server.server.server_close()
+
+
+def scrape(data_dir, url, *extra):
+    return sa.main(['--data-dir', str(data_dir), '--only', 'us', '--source-url', f'us={url}',
+                    '--host-rate', '0', '--jobs', '1', *extra])
+
+
+def read_rows(path):
+    with open(path, encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f)
+        return reader.fieldnames, list(reader)
+
+
+def read_report(data_dir):
+    return json.loads((data_dir / '.reports' / 'scrape_aircraft.json').read_text(encoding='utf-8'))
+
+
+def test_rows_are_mapped_by_header(page_server, tmp_path):
+    url = page_server.url('us_aircraft.html')
+    assert scrape(tmp_path, url, '--no-page-cache') == 0
+
+    fieldnames, rows = read_rows(tmp_path / 'us_aircraft.csv')
+    assert fieldnames == sa.OUTPUT_COLUMNS
+    assert [row['Aircraft'] for row in rows] == ['F-22 Raptor', 'F-15E Strike Eagle', 'E-2D Advanced Hawkeye']
+    f22, f15, e2 = rows
+    # Columns come from the header text, not their position on the page
+    assert f22['Company'] == 'Lockheed Martin'
+    assert f22['Type'] == 'Air superiority fighter'
+    assert f22['In Service'] == '183'
+    assert f15['Versions'] == 'F-15E, F-15EX'
+    assert f15['Origin'] == 'United States'
+    # Lazy-loaded images use data-src; relative ones resolve against the page
+    assert f22['Photo'] == 'https://static.wikia.nocookie.net/military-history/images/f/f2/F-22.jpg'
+    assert f15['Photo'] == page_server.url('images/F-15E.jpg')
+    assert e2['Photo'] == ''
+    # Columns the page does not have stay empty
+    assert {row['Airport'] for row in rows} == {''}
+    assert all(row['Scraped_Date'] for row in rows)
+
+
+@pytest.mark.parametrize('backend', ['html.parser', 'lxml', 'selectolax'])
+def test_backends_agree(backend):
+    try:
+        parser = sa.get_parser_backend(backend)
+    except ImportError:
+        pytest.skip(f"{backend} is not installed")
+    html = (FIXTURES / 'us_aircraft.html').read_bytes()
+    source = {'code': 'us', 'url': 'https://example.org/wiki/List'}
+    assert sa.parse_tables(html, source, parser) == sa.parse_tables(html, source, sa.SoupBackend())
+
+
+@pytest.mark.parametrize('name', ['no_tables.html', 'missing.html'])
+def test_failed_source_writes_nothing(page_server, tmp_path, name):
+    assert scrape(tmp_path, page_server.url(name)) == 1
+    assert not (tmp_path / 'us_aircraft.csv').exists()
+    assert read_report(tmp_path)['counters']['scrape.pages.error'] == 1
+
+
+def test_failed_source_keeps_existing_csv(page_server, tmp_path):
+    csv_path = tmp_path / 'us_aircraft.csv'
+    csv_path.write_bytes(b'Aircraft\r\nF-16\r\n')
+    assert scrape(tmp_path, page_server.url('no_tables.html')) == 1
+    assert csv_path.read_bytes() == b'Aircraft\r\nF-16\r\n'
+
+
+def test_not_modified_page_is_not_rewritten(page_server, tmp_path, capsys):
+    url = page_server.url('us_aircraft.html')
+    assert scrape(tmp_path, url) == 0
+    csv_path = tmp_path / 'us_aircraft.csv'
+    content = csv_path.read_bytes()
+    os.utime(csv_path, (1_000_000_000, 1_000_000_000))
+    capsys.readouterr()
+
+    assert scrape(tmp_path, url) == 0
+    # The cached validator went out and the server answered 304
+    assert 'If-None-Match' in page_server.requests[-1][1]
+    assert csv_path.read_bytes() == content
+    assert csv_path.stat().st_mtime == 1_000_000_000
+    counters = read_report(tmp_path)['counters']
+    assert counters['scrape.pages.not-modified'] == 1
+    assert 'scrape.pages.changed' not in counters
+    assert 'Page cache: 1 not modified (304)' in capsys.readouterr().out
+
+
+def test_unchanged_body_is_not_rewritten(page_server, tmp_path):
+    page_server.etags = False
+    url = page_server.url('us_aircraft.html')
+    assert scrape(tmp_path, url) == 0
+    csv_path = tmp_path / 'us_aircraft.csv'
+    os.utime(csv_path, (1_000_000_000, 1_000_000_000))
+
+    assert scrape(tmp_path, url) == 0
+    assert 'If-None-Match' not in page_server.requests[-1][1]
+    assert csv_path.stat().st_mtime == 1_000_000_000
+    assert read_report(tmp_path)['counters']['scrape.pages.unchanged'] == 1
+
+
+def test_missing_csv_is_rebuilt_from_a_cached_page(page_server, tmp_path):
+    url = page_server.url('us_aircraft.html')
+    assert scrape(tmp_path, url) == 0
+    csv_path = tmp_path / 'us_aircraft.csv'
+    rows = read_rows(csv_path)[1]
+    csv_path.unlink()
+
+    assert scrape(tmp_path, url) == 0
+    assert read_report(tmp_path)['counters']['scrape.pages.not-modified'] == 1
+    assert [row['Aircraft'] for row in read_rows(csv_path)[1]] == [row['Aircraft'] for row in rows]
+
+
+def test_page_cache_round_trip(tmp_path):
+    cache = sa.PageCache(str(tmp_path / 'pages.sqlite'))
+    page = {'etag': '"abc"', 'last_modified': None, 'sha256': 'x', 'body': b'<html></html>'}
+    assert cache.get('http://example.org/') is None
+    cache.put('http://example.org/', page)
+    cache.close()
+
+    cache = sa.PageCache(str(tmp_path / 'pages.sqlite'))
+    assert cache.get('http://example.org/') == page
+    cache.close()
@@ -0,0 +1,79 @@
+import pytest
+
+from aircombat.search import INDEX_NAME, SearchIndex, main, parse_query
+from build_search_index import write_search_index
+
+DOCUMENTS = [
+    ('fleet', 'Boeing F-15 Eagle', 'Saudi Arabia',
+     {'kill_chain': 'AN/APG-82(V)1 AESA Find/Fix; Engage AIM-120D over Link-16 datalink'}),
+    ('fleet', 'Eurofighter Typhoon', 'Saudi Arabia',
+     {'kill_chain': 'CAPTOR-E AESA radar; Meteor missile with two-way datalink'}),
+    ('products', 'AIM-120D AMRAAM', '',
+     {'kill_chain': 'Active radar seeker, two-way datalink for mid-course updates'}),
+    ('calcs', 'Australia', 'Australia',
+     {'cueing': 'E-7A Wedgetail MESA radar and Link-16 cueing',
+      'missile_design': 'AIM-120D and Meteor for 160 km shots'}),
+    ('company', 'MBDA', '', {'role': 'Meteor ramjet BVR missile'}),
+]
+
+
+@pytest.fixture(scope='module')
+def index_path(tmp_path_factory):
+    data_dir = tmp_path_factory.mktemp('search')
+    write_search_index(DOCUMENTS, data_dir)
+    return data_dir / INDEX_NAME
+
+
+@pytest.fixture(scope='module')
+def index(index_path):
+    return SearchIndex(index_path)
+
+
+def titles(hits):
+    return [hit['title'] for hit in hits]
+
+
+@pytest.mark.parametrize('query', ['', '   ', '---', '"', '""', 'cueing:""'])
+def test_queries_without_terms_find_nothing(index, query):
+    assert parse_query(query) == []
+    assert index.search(query) == []
+    hits, scores = index.match(query)
+    assert len(hits) == len(scores) == 0
+
+
+def test_punctuated_tokens_match_their_parts(index):
+    assert titles(index.search('APG-82')) == ['Boeing F-15 Eagle']
+    assert titles(index.search('an/apg-82(v)1')) == ['Boeing F-15 Eagle']
+
+
+def test_all_terms_required_unless_any(index):
+    assert set(titles(index.search('meteor datalink'))) == {'Eurofighter Typhoon'}
+    assert set(titles(index.search('meteor datalink', require_all=False))) == {
+        'Eurofighter Typhoon', 'Australia', 'MBDA', 'Boeing F-15 Eagle', 'AIM-120D AMRAAM'}
+
+
+def test_phrase(index):
+    assert set(titles(index.search('"two-way datalink"'))) == {'Eurofighter Typhoon', 'AIM-120D AMRAAM'}
+    assert index.search('"datalink two-way"') == []
+
+
+def test_field_and_source_filters(index):
+    assert titles(index.search('cueing:link-16')) == ['Australia']
+    assert titles(index.search('link-16', field='kill_chain')) == ['Boeing F-15 Eagle']
+    assert titles(index.search('datalink', sources=['products'])) == ['AIM-120D AMRAAM']
+
+
+def test_limit_keeps_best_scores(index):
+    everything = index.search('radar', limit=10)
+    assert index.search('radar', limit=2) == everything[:2]
+    assert [hit['score'] for hit in everything] == sorted((hit['score'] for hit in everything), reverse=True)
+
+
+def test_unknown_field_is_rejected():
+    with pytest.raises(ValueError):
+        parse_query('nope:radar')
+
+
+def test_cli_handles_empty_query(index_path, capsys):
+    assert main(['""', '--index', str(index_path)]) == 0
+    assert '0 hit(s)' in capsys.readouterr().out
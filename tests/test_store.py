@@ -0,0 +1,102 @@
+import pathlib
+import shutil
+
+import pyarrow as pa
+import pytest
+
+import convert_to_feather
+import merge_countries
+from aircombat.store import (FILE_CODE_TO_FLAG, DataStore, build_index, normalize_key, open_store,
+                             split_list)
+
+DATA_DIR = pathlib.Path(__file__).resolve().parent.parent / 'data'
+
+
+@pytest.fixture(scope='module')
+def store(tmp_path_factory):
+    data_dir = tmp_path_factory.mktemp('store')
+    for path in DATA_DIR.glob('*.csv'):
+        shutil.copy2(path, data_dir / path.name)
+    merge_countries.merge_csvs(str(data_dir))
+    assert convert_to_feather.main(['--data-dir', str(data_dir)]) == 0
+    return DataStore(data_dir)
+
+
+def names(table, column='Aircraft'):
+    return table.column(column).to_pylist()
+
+
+def scan(table, column, value):
+    """Rows whose `column` equals `value` once normalized, by a full scan"""
+    return [row for row in table.to_pylist() if normalize_key(row[column]) == normalize_key(value)]
+
+
+def test_normalize_key_and_split_list():
+    assert normalize_key('  F-35 Lightning II ') == 'f-35 lightning ii'
+    assert normalize_key('   ') is None and normalize_key(None) is None
+    assert split_list('AIM-120, Meteor ,,') == ['AIM-120', 'Meteor']
+    assert split_list(None) == []
+
+
+def test_build_index():
+    table = pa.table({'name': ['A', 'a ', None, 'B'], 'list': ['x, y', 'y', '', 'x, x']})
+    assert build_index(table, 'name') == {'a': [0, 1], 'b': [3]}
+    # Each row appears once per key even when the list repeats it
+    assert build_index(table, 'list', multi=True) == {'x': [0, 3], 'y': [0, 1]}
+
+
+def test_fleet_by_country_matches_a_scan(store):
+    for code in set(store.fleet.column('country').to_pylist()):
+        expected = [row['Aircraft'] for row in scan(store.fleet, 'country', code)]
+        assert names(store.fleet_by_country(code)) == expected
+        if code in FILE_CODE_TO_FLAG:
+            assert names(store.fleet_by_country(FILE_CODE_TO_FLAG[code].upper())) == expected
+    assert store.fleet_by_country('nowhere').num_rows == 0
+
+
+def test_fleet_lookups_ignore_case_and_spacing(store):
+    for aircraft in set(names(store.fleet)):
+        if aircraft:
+            # 'Akıncı'.upper() does not casefold back, so only ASCII names change case
+            variant = aircraft.upper() if aircraft.isascii() else aircraft
+            expected = scan(store.fleet, 'Aircraft', aircraft)
+            assert store.fleet_by_aircraft(f"  {variant} ").to_pylist() == expected
+    for company in set(names(store.fleet, 'Company')):
+        if company:
+            assert store.aircraft_by_company(company).to_pylist() == scan(store.fleet, 'Company', company)
+
+
+def test_calcs_for_country(store):
+    for row in store.calcs.to_pylist():
+        assert store.calcs_for_country(row['Country']).to_pylist() == [row]
+        assert store.calcs_for_country(row['Flag Abbrev']).to_pylist() == [row]
+    assert store.calcs_for_country('rus').to_pylist() == store.calcs_for_country('Russia').to_pylist()
+
+
+def test_products_and_companies(store):
+    for product in names(store.products, 'Product'):
+        assert store.product(product).to_pylist() == scan(store.products, 'Product', product)
+    for company in set(names(store.products, 'Company')):
+        if company:
+            assert store.products_by_company(company).to_pylist() == scan(store.products, 'Company', company)
+    for company in names(store.companies, 'Company'):
+        assert store.company(company).to_pylist() == scan(store.companies, 'Company', company)
+
+
+def test_products_for_aircraft_matches_a_scan(store):
+    products = store.products.to_pylist()
+    fleet = store.fleet.to_pylist()
+    for aircraft in set(names(store.fleet)):
+        if not aircraft:
+            continue
+        key = normalize_key(aircraft)
+        listed = {normalize_key(name) for row in fleet if normalize_key(row['Aircraft']) == key
+                  for name in split_list(row['Associated products'])}
+        expected = [row for row in products
+                    if normalize_key(row['Product']) in listed
+                    or key in {normalize_key(name) for name in split_list(row['Associated products'])}]
+        assert store.products_for_aircraft(aircraft).to_pylist() == expected
+
+
+def test_open_store_is_shared(store):
+    assert open_store(store.data_dir) is open_store(str(store.data_dir) + '/')
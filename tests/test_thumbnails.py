@@ -0,0 +1,113 @@
+import csv
+import json
+
+import pytest
+
+import update_aircraft_images as uai
+from aircombat import thumbnails
+from aircombat.http import HttpClient
+
+pytestmark = pytest.mark.skipif(not thumbnails.available(), reason='Pillow is not installed')
+
+
+@pytest.fixture
+def photos(mock_commons):
+    """Two copies of one airframe photo (same bytes, different URLs) and a second photo"""
+    return [mock_commons.live_url('Eagle.png'), mock_commons.live_url('Eagle_s1.png'),
+            mock_commons.live_url('Raptor.png')]
+
+
+@pytest.fixture
+def fleet_csv(tmp_path, photos):
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    rows = [{'Aircraft': name, 'Photo': url, 'Origin': 'United States'}
+            for name, url in zip(['F-15C', 'F-15E', 'F-22'], photos)]
+    uai.write_csv_atomic(data_dir / 'us.csv', ['Aircraft', 'Photo', 'Origin'], rows)
+    return data_dir / 'us.csv'
+
+
+def run(csv_path, mock, *extra):
+    return uai.main(['--data-dir', str(csv_path.parent), '--api-url', mock.api_url,
+                     '--rate', '0', '--no-cache', '--thumbs', *extra])
+
+
+def read_counters(data_dir):
+    report = json.loads((data_dir / '.reports' / 'update_aircraft_images.json').read_text(encoding='utf-8'))
+    return report['counters']
+
+
+def test_mirror_deduplicates_by_content(tmp_path, photos):
+    mirror = thumbnails.Mirror(tmp_path / 'thumbs', HttpClient())
+    keys = mirror.run(photos, jobs=1)
+    mirror.save(set(photos))
+
+    assert keys[photos[0]] == keys[photos[1]] != keys[photos[2]]
+    assert mirror.stats['downloaded'] == 3
+    assert mirror.stats['rendered'] == 2
+    assert mirror.stats['deduplicated'] == 1
+    manifest = json.loads((tmp_path / 'thumbs' / thumbnails.MANIFEST_NAME).read_text(encoding='utf-8'))
+    assert set(manifest['sources']) == set(photos)
+    assert set(manifest['images']) == set(keys.values())
+    files = sorted(path.name for path in (tmp_path / 'thumbs').iterdir())
+    assert files == sorted([thumbnails.MANIFEST_NAME] + [name for key in manifest['images']
+                                                         for name in thumbnails.thumb_names(key)])
+
+
+def test_unreferenced_images_are_removed(tmp_path, photos):
+    mirror = thumbnails.Mirror(tmp_path / 'thumbs', HttpClient())
+    keys = mirror.run(photos, jobs=1)
+    mirror.save(set(photos))
+
+    mirror = thumbnails.Mirror(tmp_path / 'thumbs', HttpClient())
+    mirror.run(photos[:2], jobs=1)
+    mirror.save(set(photos[:2]))
+    assert set(mirror.manifest['images']) == {keys[photos[0]]}
+    assert not list((tmp_path / 'thumbs').glob(f"{keys[photos[2]]}-*"))
+
+
+def test_thumb_column_and_manifest(fleet_csv, mock_commons, photos):
+    assert run(fleet_csv, mock_commons) == 0
+
+    with open(fleet_csv, encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f)
+        assert reader.fieldnames == ['Aircraft', 'Photo', 'Thumb', 'Origin']
+        rows = list(reader)
+    manifest = json.loads((fleet_csv.parent / 'thumbs' / thumbnails.MANIFEST_NAME).read_text(encoding='utf-8'))
+    for row in rows:
+        key = manifest['sources'][row['Photo']]['key']
+        assert row['Thumb'] == f"thumbs/{thumbnails.thumb_name(key)}"
+        assert (fleet_csv.parent / row['Thumb']).is_file()
+    # Both F-15 rows share one set of files
+    assert rows[0]['Thumb'] == rows[1]['Thumb'] != rows[2]['Thumb']
+    assert len(manifest['images']) == 2
+
+    counters = read_counters(fleet_csv.parent)
+    assert counters['thumbs.rendered'] == 2
+    assert counters['thumbs.deduplicated'] == 1
+    assert counters['thumbs.thumb_cells_changed'] == 3
+
+
+def test_second_run_skips_unchanged_images(fleet_csv, mock_commons):
+    assert run(fleet_csv, mock_commons) == 0
+    thumbs = fleet_csv.parent / 'thumbs'
+    mtimes = {path.name: path.stat().st_mtime_ns for path in thumbs.iterdir()}
+    content = fleet_csv.read_bytes()
+
+    assert run(fleet_csv, mock_commons) == 0
+    counters = read_counters(fleet_csv.parent)
+    assert counters['thumbs.cached'] == 3
+    assert counters['thumbs.downloaded'] == counters['thumbs.rendered'] == 0
+    assert counters['thumbs.thumb_cells_changed'] == 0
+    assert {path.name: path.stat().st_mtime_ns for path in thumbs.iterdir()
+            if path.name != thumbnails.MANIFEST_NAME} == \
+        {name: mtime for name, mtime in mtimes.items() if name != thumbnails.MANIFEST_NAME}
+    assert fleet_csv.read_bytes() == content
+
+
+def test_refresh_revalidates_with_etag(fleet_csv, mock_commons):
+    assert run(fleet_csv, mock_commons) == 0
+    assert run(fleet_csv, mock_commons, '--refresh-thumbs') == 0
+    counters = read_counters(fleet_csv.parent)
+    assert counters['thumbs.not_modified'] == 3
+    assert counters['thumbs.rendered'] == 0
@@ -0,0 +1,168 @@
+import csv
+import json
+import os
+import pathlib
+import sqlite3
+import stat
+
+import pytest
+
+import update_aircraft_images as uai
+from benchmarks.synth import synthetic_photo
+
+DATA_DIR = pathlib.Path(__file__).resolve().parent.parent / 'data'
+ROWS = 40
+
+
+def read_rows(path):
+    with open(path, encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f)
+        return reader.fieldnames, list(reader)
+
+
+@pytest.fixture
+def fleet_csv(tmp_path, mock_commons):
+    """us.csv's first rows with their photos served by the mock; about a
+    third of them answer 404 and need replacing"""
+    fieldnames, rows = read_rows(DATA_DIR / 'us.csv')
+    rows = rows[:ROWS]
+    for row in rows:
+        row['Photo'] = synthetic_photo(row['Photo'], 0, mock_commons.base_url)
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    uai.write_csv_atomic(data_dir / 'us.csv', fieldnames, rows)
+    return data_dir / 'us.csv'
+
+
+def run(csv_path, mock, *extra):
+    return uai.main(['--data-dir', str(csv_path.parent), '--api-url', mock.api_url,
+                     '--rate', '0', '--per-host', '8', *extra])
+
+
+def test_concurrent_run_matches_serial(fleet_csv, mock_commons, tmp_path):
+    serial = tmp_path / 'serial' / 'us.csv'
+    serial.parent.mkdir()
+    serial.write_bytes(fleet_csv.read_bytes())
+
+    assert run(serial, mock_commons, '--no-cache') == 0
+    assert run(fleet_csv, mock_commons, '--no-cache', '--concurrency', '8') == 0
+    assert fleet_csv.read_bytes() == serial.read_bytes()
+    assert fleet_csv.read_bytes() != (DATA_DIR / 'us.csv').read_bytes()
+
+
+def test_limit_stops_fetching(fleet_csv, mock_commons):
+    before = mock_commons.requests
+    run(fleet_csv, mock_commons, '--no-cache', '--force-recheck', '--dry-run',
+        '--concurrency', '4', '--limit', '1')
+    limited = mock_commons.requests - before
+    # Each row takes a few requests; only the rows up to the limit plus
+    # one window of in-flight checks may be fetched
+    assert 0 < limited < ROWS // 2
+
+
+def test_only_changed_cells_are_written_and_logged(fleet_csv, mock_commons):
+    fieldnames, original = read_rows(fleet_csv)
+    run(fleet_csv, mock_commons, '--no-cache')
+
+    new_fieldnames, updated = read_rows(fleet_csv)
+    assert new_fieldnames == fieldnames
+    changed = [number for number, (old, new) in enumerate(zip(original, updated), start=1) if old != new]
+    assert changed
+    for old, new in zip(original, updated):
+        assert {k: v for k, v in old.items() if k != 'Photo'} == {k: v for k, v in new.items() if k != 'Photo'}
+
+    log_path = fleet_csv.parent / '.backups' / 'us.diffs.jsonl'
+    entries = [json.loads(line) for line in log_path.read_text(encoding='utf-8').splitlines()]
+    assert len(entries) == 1
+    changes = entries[0]['changes']
+    assert [change['row'] for change in changes] == changed
+    # The diff is enough to revert the run
+    for change in changes:
+        assert original[change['row'] - 1]['Photo'] == change['old']
+        assert updated[change['row'] - 1]['Photo'] == change['new']
+    assert not list(fleet_csv.parent.glob('.*.tmp'))
+
+
+def test_unchanged_file_is_not_touched(fleet_csv, mock_commons):
+    run(fleet_csv, mock_commons, '--no-cache')
+    content = fleet_csv.read_bytes()
+    os.utime(fleet_csv, (1_000_000_000, 1_000_000_000))
+
+    run(fleet_csv, mock_commons, '--no-cache')
+    assert fleet_csv.read_bytes() == content
+    assert fleet_csv.stat().st_mtime == 1_000_000_000
+    log_path = fleet_csv.parent / '.backups' / 'us.diffs.jsonl'
+    assert len(log_path.read_text(encoding='utf-8').splitlines()) == 1
+
+
+def test_diff_retention(tmp_path):
+    csv_path = tmp_path / 'us.csv'
+    csv_path.write_text('Aircraft,Photo\n', encoding='utf-8')
+    for run_number in range(5):
+        log_path = uai.record_row_diffs(csv_path, [{'row': run_number}], retention=3)
+    entries = [json.loads(line) for line in log_path.read_text(encoding='utf-8').splitlines()]
+    assert [entry['changes'][0]['row'] for entry in entries] == [2, 3, 4]
+
+
+def test_atomic_write_keeps_original_on_failure(tmp_path):
+    csv_path = tmp_path / 'us.csv'
+    uai.write_csv_atomic(csv_path, ['Aircraft', 'Photo'], [{'Aircraft': 'F-16', 'Photo': 'a.jpg'}])
+    os.chmod(csv_path, 0o644)
+    content = csv_path.read_bytes()
+
+    with pytest.raises(ValueError):
+        uai.write_csv_atomic(csv_path, ['Aircraft', 'Photo'], [{'Aircraft': 'F-35', 'Unknown': 'x'}])
+    assert csv_path.read_bytes() == content
+    assert [path.name for path in tmp_path.iterdir()] == ['us.csv']
+
+    uai.write_csv_atomic(csv_path, ['Aircraft', 'Photo'], [{'Aircraft': 'F-35', 'Photo': 'b.jpg'}])
+    assert csv_path.read_bytes() == b'Aircraft,Photo\r\nF-35,b.jpg\r\n'
+    assert stat.S_IMODE(csv_path.stat().st_mode) == 0o644
+
+
+def test_cache_expiry_and_eviction(tmp_path):
+    cache = uai.LookupCache(tmp_path / 'cache.sqlite', max_entries=2)
+    cache.put('head', 'expired', [True, 'ok'], ttl=-1)
+    for key in ('a', 'b', 'c'):
+        cache.put('file', key, key, ttl=60)
+    assert cache.get('head', 'expired') == (False, None)
+    assert cache.get('file', 'a') == (True, 'a')
+    cache.close()
+
+    cache = uai.LookupCache(tmp_path / 'cache.sqlite')
+    # 'a' was used last, so 'b' is the least recently used of the three
+    assert [cache.get('file', key)[0] for key in ('a', 'b', 'c')] == [True, False, True]
+    cache.close()
+
+
+def test_cache_commits_without_close(tmp_path):
+    cache = uai.LookupCache(tmp_path / 'cache.sqlite')
+    for key in range(uai.CACHE_COMMIT_EVERY):
+        cache.put('head', str(key), True, ttl=60)
+    count = sqlite3.connect(tmp_path / 'cache.sqlite').execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+    assert count == uai.CACHE_COMMIT_EVERY
+    cache.close()
+
+
+def test_cache_saves_requests_across_runs(fleet_csv, mock_commons, tmp_path):
+    cache_dir = tmp_path / 'cache'
+    before = mock_commons.requests
+    run(fleet_csv, mock_commons, '--cache-dir', str(cache_dir), '--dry-run')
+    cold = mock_commons.requests - before
+
+    before = mock_commons.requests
+    run(fleet_csv, mock_commons, '--cache-dir', str(cache_dir), '--dry-run')
+    assert mock_commons.requests - before == 0 < cold
+
+
+def test_cache_is_kept_when_a_run_fails(fleet_csv, mock_commons, tmp_path, monkeypatch):
+    def interrupted(*args, **kwargs):
+        uai.get_cache().put('search', 'F-16', 'https://example.org/f16.jpg', ttl=60)
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(uai, 'update_csv_images', interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        run(fleet_csv, mock_commons, '--cache-dir', str(tmp_path / 'cache'))
+    cache = uai.LookupCache(tmp_path / 'cache' / 'image_lookups.sqlite')
+    assert cache.get('search', 'F-16') == (True, 'https://example.org/f16.jpg')
+    cache.close()
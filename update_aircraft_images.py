@@ -4,19 +4,187 @@ Aircraft Image Updater - Wikimedia Commons Edition (Enhanced & Timestamped Backu
 Scans CSV files in data directory and updates Photo URLs with hotlink-friendly alternatives.
 Uses Wikimedia Commons API (100% free, automation-friendly).
 Enhanced validation to catch dead links that return 200 OK.
-Now creates timestamped .csv.backup files before modifying CSVs.
+Changed CSVs are replaced atomically; each change is logged as a row-level
+diff under data/.backups/ instead of a full .csv.backup copy.
+Validation runs over a shared keep-alive session with a token-bucket rate
+limit and a per-host concurrency cap; --concurrency N checks rows in parallel.
+URL checks and Commons lookups are cached in data/.cache/ with TTL expiry.
+--thumbs mirrors every photo into data/thumbs/ as WebP/JPEG thumbnails
+(aircombat.thumbnails) and fills a Thumb column beside Photo.
 """
 
 import os
 import csv
+import functools
+import itertools
+import hashlib
+import io
+import tempfile
 import time
-import requests
+import threading
 import json
 import re
+import shutil
+import sqlite3
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from urllib.parse import urlparse, quote, unquote
 from datetime import datetime
 
+from aircombat import instrument, thumbnails
+from aircombat.http import HttpClient
+
+COMMONS_API_URL = "https://commons.wikimedia.org/w/api.php"
+API_HEADERS = {'User-Agent': 'AircraftImageUpdater/1.0 (Educational; GitHub Actions)'}
+
+# Replaces the old fixed time.sleep(1) per row: outbound requests draw from
+# a token bucket instead, so politeness no longer costs a second per row.
+DEFAULT_RATE = 10.0
+DEFAULT_PER_HOST = 4
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the module-wide HttpClient, creating a default one on first use"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient(rate=DEFAULT_RATE, per_host=DEFAULT_PER_HOST)
+        return _client
+
+
+def configure_client(rate=DEFAULT_RATE, per_host=DEFAULT_PER_HOST, concurrency=1):
+    """Replace the module-wide HttpClient with one sized for `concurrency` workers"""
+    global _client
+    with _client_lock:
+        _client = HttpClient(rate=rate, per_host=per_host, pool_size=max(10, concurrency))
+        return _client
+
+
+# The Commons query API takes up to 50 pipe-separated titles per request;
+# the length cap keeps the GET URL comfortably short.
+MAX_TITLES_PER_QUERY = 50
+MAX_TITLES_LENGTH = 6000
+
+DEFAULT_URL_TTL_HOURS = 72
+DEFAULT_LOOKUP_TTL_HOURS = 24 * 30
+DEFAULT_CACHE_MAX_ENTRIES = 50000
+# Lookups are committed every this many puts (and after every CSV), so an
+# interrupted run keeps what it already looked up
+CACHE_COMMIT_EVERY = 200
+
+
+class LookupCache:
+    """SQLite-backed cache of URL checks and Commons lookups.
+
+    Entries are keyed by (kind, key), where kind is 'head' (photo URL),
+    'file' (filename + width) or 'search' (query). Each entry carries its
+    own expiry; the least recently used entries are evicted beyond
+    `max_entries`. Safe to share between worker threads.
+    """
+
+    def __init__(self, path, url_ttl=DEFAULT_URL_TTL_HOURS * 3600,
+                 lookup_ttl=DEFAULT_LOOKUP_TTL_HOURS * 3600,
+                 max_entries=DEFAULT_CACHE_MAX_ENTRIES):
+        self.path = Path(path)
+        if str(path) != ':memory:':
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.url_ttl = url_ttl
+        self.lookup_ttl = lookup_ttl
+        self.max_entries = max_entries
+        self.hits = {}
+        self.misses = {}
+        self._uncommitted = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            ' kind TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,'
+            ' expires REAL NOT NULL, last_used REAL NOT NULL,'
+            ' PRIMARY KEY (kind, key))'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS cache_last_used ON cache (last_used)')
+        self._db.commit()
+
+    def get(self, kind, key):
+        """Return (hit, value); expired entries count as misses"""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                'SELECT value, expires FROM cache WHERE kind = ? AND key = ?', (kind, key)
+            ).fetchone()
+            if row is None or row[1] < now:
+                self.misses[kind] = self.misses.get(kind, 0) + 1
+                instrument.count(f"cache.{kind}.misses")
+                return False, None
+            self._db.execute(
+                'UPDATE cache SET last_used = ? WHERE kind = ? AND key = ?', (now, kind, key)
+            )
+            self.hits[kind] = self.hits.get(kind, 0) + 1
+        instrument.count(f"cache.{kind}.hits")
+        return True, json.loads(row[0])
+
+    def put(self, kind, key, value, ttl):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO cache (kind, key, value, expires, last_used)'
+                ' VALUES (?, ?, ?, ?, ?)',
+                (kind, key, json.dumps(value), now + ttl, now)
+            )
+            self._uncommitted += 1
+            if self._uncommitted >= CACHE_COMMIT_EVERY:
+                self._db.commit()
+                self._uncommitted = 0
+
+    def commit(self):
+        with self._lock:
+            self._db.commit()
+            self._uncommitted = 0
+
+    def close(self):
+        """Drop expired entries, evict down to max_entries (LRU) and commit"""
+        with self._lock:
+            self._db.execute('DELETE FROM cache WHERE expires < ?', (time.time(),))
+            self._db.execute(
+                'DELETE FROM cache WHERE rowid IN ('
+                ' SELECT rowid FROM cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            )
+            self._db.commit()
+            self._db.close()
+
+    def summary(self):
+        """One line of hit/miss counts per kind, for the run summary"""
+        kinds = sorted(set(self.hits) | set(self.misses))
+        parts = []
+        for kind in kinds:
+            hits, misses = self.hits.get(kind, 0), self.misses.get(kind, 0)
+            parts.append(f"{kind} {hits}/{hits + misses}")
+        total_hits = sum(self.hits.values())
+        total = total_hits + sum(self.misses.values())
+        rate = (100.0 * total_hits / total) if total else 0.0
+        return f"{total_hits} hits / {total} lookups ({rate:.0f}%)" + (
+            f" [{', '.join(parts)}]" if parts else '')
+
+
+_cache = None
+
+
+def get_cache():
+    """Return the module-wide LookupCache, or None when caching is off"""
+    return _cache
+
+
+def configure_cache(path, **kwargs):
+    """Open a LookupCache at `path` as the module-wide cache (None disables)"""
+    global _cache
+    _cache = LookupCache(path, **kwargs) if path else None
+    return _cache
+
 
 def is_wikimedia_url(url):
     """Check if URL is from Wikimedia"""
@@ -43,100 +211,181 @@ def extract_filename_from_wikimedia_url(url):
     return None
 
 
+# Air-force names stripped from filenames when hunting for a surviving file.
+# Words are matched case-insensitively with any whitespace between them;
+# add a country by adding a line here.
+AIR_FORCE_SUFFIXES = [
+    'Turkish Air Force', 'USAF', 'US Air Force',
+    'Royal Air Force', 'RAF', 'Israeli Air Force',
+    'Indian Air Force', 'Pakistan Air Force',
+    'Russian Air Force', 'Chinese Air Force',
+    'PLAAF', 'RAAF', 'Australian Air Force',
+    'Canadian Air Force', 'RCAF', 'German Air Force',
+    'Luftwaffe', 'French Air Force', 'Spanish Air Force',
+    'Italian Air Force', 'Japanese Air Force', 'JASDF',
+    'Korean Air Force', 'ROKAF', 'Saudi Air Force',
+    'RSAF', 'Swedish Air Force', 'Thai Air Force',
+    'RTAF',
+]
+
+
+def _compile_suffix_pattern(suffixes):
+    """One alternation over every suffix; group s<i> tells which one matched"""
+    alternatives = []
+    for i, suffix in enumerate(suffixes):
+        words = r'\s+'.join(re.escape(word) for word in suffix.split())
+        alternatives.append(f'(?P<s{i}>{words})')
+    return re.compile(r'\s+(?:' + '|'.join(alternatives) + ')', re.IGNORECASE)
+
+
+AIR_FORCE_SUFFIX_RE = _compile_suffix_pattern(AIR_FORCE_SUFFIXES)
+YEAR_PATTERNS = [re.compile(p) for p in (r'\s*\(\d{4}\)', r'_\d{4}', r'-\d{4}')]
+NUMBERED_COPY_RE = re.compile(r'_\d+(\.\w+)')
+WHITESPACE_RE = re.compile(r'\s+')
+
+
 def generate_filename_variations(filename):
     """Generate possible filename variations for fallback searches"""
     if not filename:
         return []
-
-    variations = [filename]
-    base_name = filename
-
-    air_force_patterns = [
-        r'\s+Turkish\s+Air\s+Force', r'\s+USAF', r'\s+US\s+Air\s+Force',
-        r'\s+Royal\s+Air\s+Force', r'\s+RAF', r'\s+Israeli\s+Air\s+Force',
-        r'\s+Indian\s+Air\s+Force', r'\s+Pakistan\s+Air\s+Force',
-        r'\s+Russian\s+Air\s+Force', r'\s+Chinese\s+Air\s+Force',
-        r'\s+PLAAF', r'\s+RAAF', r'\s+Australian\s+Air\s+Force',
-        r'\s+Canadian\s+Air\s+Force', r'\s+RCAF', r'\s+German\s+Air\s+Force',
-        r'\s+Luftwaffe', r'\s+French\s+Air\s+Force', r'\s+Spanish\s+Air\s+Force',
-        r'\s+Italian\s+Air\s+Force', r'\s+Japanese\s+Air\s+Force', r'\s+JASDF',
-        r'\s+Korean\s+Air\s+Force', r'\s+ROKAF', r'\s+Saudi\s+Air\s+Force',
-        r'\s+RSAF', r'\s+Swedish\s+Air\s+Force', r'\s+Thai\s+Air\s+Force',
-        r'\s+RTAF'
-    ]
-
-    for pattern in air_force_patterns:
-        cleaned = re.sub(pattern, '', base_name, flags=re.IGNORECASE)
-        cleaned = re.sub(r'\s+', ' ', cleaned).strip()
-        if cleaned and cleaned != base_name and cleaned not in variations:
-            variations.append(cleaned)
-
-    for pattern in [r'\s*\(\d{4}\)', r'_\d{4}', r'-\d{4}']:
-        cleaned = re.sub(pattern, '', base_name)
-        if cleaned and cleaned not in variations:
-            variations.append(cleaned)
+    return list(_filename_variations(filename))
+
+
+@functools.lru_cache(maxsize=4096)
+def _filename_variations(base_name):
+    variations = [base_name]
+    seen = {base_name}
+
+    def add(candidate):
+        if candidate and candidate not in seen:
+            seen.add(candidate)
+            variations.append(candidate)
+
+    # A single scan finds every suffix occurrence. No suffix can start
+    # inside another's match, so this yields the same spans as running
+    # each pattern on its own, and each suffix is still removed on its own
+    # (one variation per suffix, in table order).
+    spans_by_suffix = {}
+    for match in AIR_FORCE_SUFFIX_RE.finditer(base_name):
+        spans_by_suffix.setdefault(int(match.lastgroup[1:]), []).append(match.span())
+
+    collapsed_base = WHITESPACE_RE.sub(' ', base_name).strip()
+    for index in range(len(AIR_FORCE_SUFFIXES)):
+        spans = spans_by_suffix.get(index)
+        if spans is None:
+            cleaned = collapsed_base
+        else:
+            pieces, last = [], 0
+            for begin, end in spans:
+                pieces.append(base_name[last:begin])
+                last = end
+            pieces.append(base_name[last:])
+            cleaned = WHITESPACE_RE.sub(' ', ''.join(pieces)).strip()
+        if cleaned != base_name:
+            add(cleaned)
+
+    for pattern in YEAR_PATTERNS:
+        add(pattern.sub('', base_name))
 
     if '(cropped)' in base_name:
-        cleaned = base_name.replace('(cropped)', '').strip()
-        if cleaned not in variations:
-            variations.append(cleaned)
+        add(base_name.replace('(cropped)', '').strip())
 
-    cleaned = re.sub(r'_\d+(\.\w+)', r'\1', base_name)
-    if cleaned != base_name and cleaned not in variations:
-        variations.append(cleaned)
+    cleaned = NUMBERED_COPY_RE.sub(r'\1', base_name)
+    if cleaned != base_name:
+        add(cleaned)
 
     if '_' in base_name:
-        variations.append(base_name.replace('_', ' '))
+        add(base_name.replace('_', ' '))
     if ' ' in base_name:
-        variations.append(base_name.replace(' ', '_'))
+        add(base_name.replace(' ', '_'))
+
+    return tuple(variations)
+
+
+def _imageinfo_batches(filenames):
+    """Split filenames into title batches the Commons API accepts in one query"""
+    batch, length = [], 0
+    for filename in filenames:
+        title = f'File:{filename}'
+        if batch and (len(batch) >= MAX_TITLES_PER_QUERY or length + len(title) > MAX_TITLES_LENGTH):
+            yield batch
+            batch, length = [], 0
+        batch.append(filename)
+        length += len(title) + 1
+    if batch:
+        yield batch
+
+
+def resolve_wikimedia_filenames(filenames, preferred_width=1280):
+    """Resolve many Commons filenames to direct URLs in as few API calls as possible.
+
+    Returns {filename: url or None} for every filename that got an answer;
+    filenames whose batch failed on the network are left out so callers
+    treat them as unresolved without caching the failure.
+    """
+    cache = get_cache()
+    resolved = {}
+    pending = []
+    for filename in dict.fromkeys(f for f in filenames if f):
+        if cache:
+            hit, cached = cache.get('file', f"{filename}|{preferred_width}")
+            if hit:
+                resolved[filename] = cached
+                continue
+        # '|' separates titles in the API and can't occur in a Commons filename
+        if '|' not in filename:
+            pending.append(filename)
 
-    return variations
+    for batch in _imageinfo_batches(pending):
+        try:
+            params = {
+                'action': 'query',
+                'titles': '|'.join(f'File:{filename}' for filename in batch),
+                'prop': 'imageinfo',
+                'iiprop': 'url|size',
+                'iiurlwidth': preferred_width,
+                'format': 'json',
+            }
+            response = get_client().get(COMMONS_API_URL, params=params, headers=API_HEADERS, timeout=10)
+            if response.status_code != 200:
+                continue
+
+            query = response.json().get('query', {})
+            # The API reports titles after normalization (e.g. '_' -> ' ')
+            normalized = {n['from']: n['to'] for n in query.get('normalized', [])}
+            pages = {page.get('title'): page for page in query.get('pages', {}).values()}
+        except Exception:
+            continue
+
+        for filename in batch:
+            title = f'File:{filename}'
+            page = pages.get(normalized.get(title, title), {})
+            imageinfo = page.get('imageinfo', [])
+            url = (imageinfo[0].get('thumburl') or imageinfo[0].get('url')) if imageinfo else None
+            resolved[filename] = url
+            # Only answered queries are cached (missing files included);
+            # network errors are transient and skipped above.
+            if cache:
+                cache.put('file', f"{filename}|{preferred_width}", url, cache.lookup_ttl)
+
+    return resolved
 
 
 def get_wikimedia_direct_url(filename, preferred_width=1280):
     """Get direct URL for a Wikimedia Commons file using the API"""
     if not filename:
         return None
-
-    try:
-        api_url = "https://commons.wikimedia.org/w/api.php"
-        params = {
-            'action': 'query',
-            'titles': f'File:{filename}',
-            'prop': 'imageinfo',
-            'iiprop': 'url|size',
-            'iiurlwidth': preferred_width,
-            'format': 'json',
-        }
-        headers = {'User-Agent': 'AircraftImageUpdater/1.0 (Educational; GitHub Actions)'}
-
-        response = requests.get(api_url, params=params, headers=headers, timeout=10)
-        if response.status_code != 200:
-            return None
-
-        data = response.json()
-        pages = data.get('query', {}).get('pages', {})
-        for _, page_data in pages.items():
-            imageinfo = page_data.get('imageinfo', [])
-            if imageinfo:
-                return imageinfo[0].get('thumburl') or imageinfo[0].get('url')
-        return None
-
-    except Exception:
-        return None
+    return resolve_wikimedia_filenames([filename], preferred_width).get(filename)
 
 
 def get_wikimedia_direct_url_with_fallback(filename, preferred_width=1280, verbose=True):
     """Try to get direct URL with filename variations as fallback"""
-    result = get_wikimedia_direct_url(filename, preferred_width)
-    if result:
-        return result
-
-    variations = generate_filename_variations(filename)
-    for variation in variations[1:]:
-        result = get_wikimedia_direct_url(variation, preferred_width)
-        if result:
-            return result
+    # Variations are resolved together, then taken in their usual order
+    variations = generate_filename_variations(filename) or [filename]
+    resolved = resolve_wikimedia_filenames(variations, preferred_width)
+    for variation in variations:
+        if resolved.get(variation):
+            return resolved[variation]
     return None
 
 
@@ -154,21 +403,61 @@ def test_image_url_enhanced(url, timeout=10):
     """Enhanced test for image URL accessibility"""
     if not url:
         return False, "Empty URL"
+
+    cache = get_cache()
+    if cache:
+        hit, cached = cache.get('head', url)
+        if hit:
+            return cached['ok'], cached['reason']
+
     try:
         headers = {'User-Agent': 'Mozilla/5.0'}
-        response = requests.head(url, timeout=timeout, allow_redirects=True, headers=headers)
-        if response.status_code == 404:
-            return False, "HTTP 404"
-        elif response.status_code != 200:
-            return False, f"HTTP {response.status_code}"
-
+        response = get_client().head(url, timeout=timeout, allow_redirects=True, headers=headers)
+        status = response.status_code
         content_type = response.headers.get('content-type', '').lower()
-        if 'image' not in content_type:
-            return False, f"Wrong content-type: {content_type}"
-        return True, "OK"
+        if status == 404:
+            ok, reason = False, "HTTP 404"
+        elif status != 200:
+            ok, reason = False, f"HTTP {status}"
+        elif 'image' not in content_type:
+            ok, reason = False, f"Wrong content-type: {content_type}"
+        else:
+            ok, reason = True, "OK"
     except Exception as e:
         return False, str(e)
 
+    # 200s and 404s are stable answers; rate limits and 5xx are retried next run
+    if cache and status in (200, 404):
+        cache.put('head', url, {'ok': ok, 'reason': reason, 'status': status,
+                                'content_type': content_type}, cache.url_ttl)
+    return ok, reason
+
+
+def search_commons_files(query):
+    """Titles of Commons File: pages matching `query`, or None on HTTP failure"""
+    cache = get_cache()
+    if cache:
+        hit, cached = cache.get('search', query)
+        if hit:
+            return cached
+
+    params = {
+        'action': 'query',
+        'list': 'search',
+        'srsearch': query,
+        'srnamespace': 6,
+        'format': 'json',
+        'srlimit': 10,
+    }
+    response = get_client().get(COMMONS_API_URL, params=params, headers=API_HEADERS, timeout=10)
+    if response.status_code != 200:
+        return None
+
+    titles = [result['title'] for result in response.json().get('query', {}).get('search', [])]
+    if cache:
+        cache.put('search', query, titles, cache.lookup_ttl)
+    return titles
+
 
 def find_image_by_aircraft(aircraft, origin='', preferred_width=1280, verbose=True):
     """Search for an image on Wikimedia Commons using aircraft name"""
@@ -179,112 +468,286 @@ def find_image_by_aircraft(aircraft, origin='', preferred_width=1280, verbose=Tr
     if origin:
         queries.insert(0, f'"{aircraft}" {origin}')
 
-    api_url = "https://commons.wikimedia.org/w/api.php"
     for query in queries:
         try:
-            params = {
-                'action': 'query',
-                'list': 'search',
-                'srsearch': query,
-                'srnamespace': 6,
-                'format': 'json',
-                'srlimit': 10,
-            }
-            headers = {'User-Agent': 'AircraftImageUpdater/1.0 (Educational; GitHub Actions)'}
-            response = requests.get(api_url, params=params, headers=headers, timeout=10)
-            if response.status_code != 200:
+            titles = search_commons_files(query)
+            if titles is None:
                 continue
 
-            results = response.json().get('query', {}).get('search', [])
-            for result in results:
-                title = result['title']
-                if not title.startswith('File:'):
-                    continue
-                filename = title[5:]
-                url = get_wikimedia_direct_url(filename, preferred_width)
-                if url:
-                    return url
+            filenames = [title[5:] for title in titles if title.startswith('File:')]
+            resolved = resolve_wikimedia_filenames(filenames, preferred_width)
+            for filename in filenames:
+                if resolved.get(filename):
+                    return resolved[filename]
         except Exception:
             continue
     return None
 
 
-def update_csv_images(csv_path, dry_run=False, limit=None, force_recheck=False, debug=False):
+def check_row(row, force_recheck=False):
+    """Validate one row's photo and find a replacement if needed.
+
+    Returns (new_photo, outcome) where outcome is 'skipped', 'updated' or
+    'error', or (None, None) for rows without a Wikimedia photo. Has no
+    side effects on `row`, so rows can be checked in any order or in parallel.
+    """
+    aircraft = row.get('Aircraft', '').strip()
+    origin = row.get('Origin', '').strip()
+    current_photo = row.get('Photo', '').strip()
+
+    if not (current_photo and is_wikimedia_url(current_photo)):
+        return None, None
+
+    is_accessible, reason = test_image_url_enhanced(current_photo)
+    if is_accessible and not force_recheck:
+        return None, 'skipped'
+
+    new_url = convert_wikimedia_url(current_photo, verbose=False)
+    if new_url and new_url != current_photo:
+        ok, _ = test_image_url_enhanced(new_url)
+        if ok:
+            return new_url, 'updated'
+
+    search_url = find_image_by_aircraft(aircraft, origin, verbose=False)
+    if search_url:
+        ok, _ = test_image_url_enhanced(search_url)
+        if ok:
+            return search_url, 'updated'
+    return None, 'error'
+
+
+def map_ahead(pool, fn, items, window):
+    """Like pool.map, but keeps at most `window` calls in flight, so a
+    consumer that stops early leaves the rest of `items` unsubmitted"""
+    items = iter(items)
+    pending = deque(pool.submit(fn, item) for item in itertools.islice(items, window))
+    while pending:
+        result = pending.popleft().result()
+        for item in itertools.islice(items, 1):
+            pending.append(pool.submit(fn, item))
+        yield result
+
+
+def prefetch_row_lookups(candidates, force_recheck=False, pool=None):
+    """Warm the cache for a batch of rows before check_row runs on each.
+
+    Photo URLs are checked (in parallel when a pool is given), then the
+    filenames and variations of every photo that will need replacing are
+    resolved together in batched imageinfo queries.
+    """
+    photos = [row.get('Photo', '').strip() for row in candidates]
+    checks = pool.map(test_image_url_enhanced, photos) if pool else map(test_image_url_enhanced, photos)
+
+    filenames = []
+    for photo, (is_accessible, _) in zip(photos, checks):
+        if is_accessible and not force_recheck:
+            continue
+        filename = extract_filename_from_wikimedia_url(photo)
+        if filename:
+            filenames.extend(generate_filename_variations(filename))
+    resolve_wikimedia_filenames(filenames)
+
+
+DEFAULT_BACKUP_RETENTION = 30
+
+
+def write_csv_atomic(csv_path, fieldnames, rows):
+    """Write rows to a temp file beside csv_path, then rename it into place.
+
+    Readers see either the old file or the complete new one, never a
+    partially written CSV.
+    """
+    csv_path = Path(csv_path)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{csv_path.name}.", suffix='.tmp', dir=csv_path.parent)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates 0600 files; keep the CSV's existing permissions
+        if csv_path.exists():
+            shutil.copymode(csv_path, tmp_path)
+        os.replace(tmp_path, csv_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def record_row_diffs(csv_path, changes, backup_dir=None, retention=DEFAULT_BACKUP_RETENTION):
+    """Append one run's row-level changes to <backup_dir>/<stem>.diffs.jsonl.
+
+    Each line holds a timestamp and a list of {row, Aircraft, column, old,
+    new} records, which is enough to revert the run. Only the newest
+    `retention` runs are kept.
+    """
+    csv_path = Path(csv_path)
+    backup_dir = Path(backup_dir) if backup_dir else csv_path.parent / '.backups'
+    backup_dir.mkdir(parents=True, exist_ok=True)
+    log_path = backup_dir / f"{csv_path.stem}.diffs.jsonl"
+
+    entries = []
+    if log_path.exists():
+        with open(log_path, 'r', encoding='utf-8') as f:
+            entries = [line for line in f.read().splitlines() if line.strip()]
+    entries.append(json.dumps({
+        'timestamp': datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+        'file': csv_path.name,
+        'changes': changes,
+    }, ensure_ascii=False))
+    if retention and retention > 0:
+        entries = entries[-retention:]
+
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{log_path.name}.", suffix='.tmp', dir=backup_dir)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(entries) + '\n')
+    shutil.copymode(csv_path, tmp_path)
+    os.replace(tmp_path, log_path)
+    return log_path
+
+
+def update_csv_images(csv_path, dry_run=False, limit=None, force_recheck=False, debug=False,
+                      concurrency=1, backup_dir=None, backup_retention=DEFAULT_BACKUP_RETENTION):
     """Update image URLs in a CSV file"""
     print(f"\nProcessing: {csv_path}")
-    rows = []
     updates = 0
     skipped = 0
     errors = 0
     updates_made = 0
+    changes = []
+
+    # Read once; the bytes' hash lets us detect another writer before replacing
+    with open(csv_path, 'rb') as f:
+        raw = f.read()
+    source_hash = hashlib.sha256(raw).hexdigest()
+    reader = csv.DictReader(io.StringIO(raw.decode('utf-8'), newline=''))
+    fieldnames = reader.fieldnames
+    rows = list(reader)
+    row_numbers = {id(row): number for number, row in enumerate(rows, start=1)}
+
+    candidates = [row for row in rows if is_wikimedia_url(row.get('Photo', '').strip())]
+
+    # Results are applied in row order either way, so --limit and the
+    # counters come out exactly as in the serial path.
+    pool = None
+    if concurrency > 1 and len(candidates) > 1:
+        pool = ThreadPoolExecutor(max_workers=concurrency)
+
+    # With --limit the rows are checked lazily, at most `concurrency` ahead
+    # of the limit; otherwise lookups for the whole file are batched up front.
+    if not limit:
+        with instrument.span('prefetch', rows=len(candidates)):
+            prefetch_row_lookups(candidates, force_recheck, pool)
+
+    if pool is not None and limit:
+        results = map_ahead(pool, lambda r: check_row(r, force_recheck), candidates, concurrency)
+    elif pool is not None:
+        results = pool.map(lambda r: check_row(r, force_recheck), candidates)
+    else:
+        results = (check_row(r, force_recheck) for r in candidates)
 
-    with open(csv_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        fieldnames = reader.fieldnames
+    try:
+        for row in candidates:
+            if limit and updates_made >= limit:
+                break
+            new_photo, outcome = next(results)
+            if outcome == 'skipped':
+                skipped += 1
+            elif outcome == 'updated':
+                if new_photo != row.get('Photo'):
+                    changes.append({
+                        'row': row_numbers[id(row)],
+                        'Aircraft': row.get('Aircraft', ''),
+                        'column': 'Photo',
+                        'old': row.get('Photo'),
+                        'new': new_photo,
+                    })
+                row['Photo'] = new_photo
+                updates += 1
+                updates_made += 1
+            elif outcome == 'error':
+                errors += 1
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    # Files without an actual cell change are never touched
+    if not dry_run and changes:
+        with open(csv_path, 'rb') as f:
+            if hashlib.sha256(f.read()).hexdigest() != source_hash:
+                print(f"⚠️ {csv_path.name} changed while it was being checked; not overwriting")
+                return updates, skipped, errors
+
+        log_path = record_row_diffs(csv_path, changes, backup_dir, backup_retention)
+        write_csv_atomic(csv_path, fieldnames, rows)
+
+        print(f"💾 Row diffs saved: {log_path}")
+        print(f"✅ Updated {updates} images in {csv_path.name}")
 
-        for idx, row in enumerate(reader, start=1):
-            aircraft = row.get('Aircraft', '').strip()
-            origin = row.get('Origin', '').strip()
-            current_photo = row.get('Photo', '').strip()
+    return updates, skipped, errors
 
-            if limit and updates_made >= limit:
-                rows.append(row)
-                continue
 
-            if current_photo and is_wikimedia_url(current_photo):
-                is_accessible, reason = test_image_url_enhanced(current_photo)
-                if is_accessible and not force_recheck:
-                    skipped += 1
-                    rows.append(row)
-                    continue
-
-                new_url = convert_wikimedia_url(current_photo, verbose=False)
-                found = False
-                if new_url and new_url != current_photo:
-                    ok, _ = test_image_url_enhanced(new_url)
-                    if ok:
-                        row['Photo'] = new_url
-                        updates += 1
-                        updates_made += 1
-                        found = True
-                if not found:
-                    search_url = find_image_by_aircraft(aircraft, origin, verbose=False)
-                    if search_url:
-                        ok, _ = test_image_url_enhanced(search_url)
-                        if ok:
-                            row['Photo'] = search_url
-                            updates += 1
-                            updates_made += 1
-                        else:
-                            errors += 1
-                    else:
-                        errors += 1
-                time.sleep(1)
-            rows.append(row)
-
-    if not dry_run and updates > 0:
-        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-        backup_path = csv_path.with_name(f"{csv_path.stem}_{timestamp}.csv.backup")
-
-        with open(backup_path, 'w', encoding='utf-8', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            with open(csv_path, 'r', encoding='utf-8') as orig:
-                reader = csv.DictReader(orig)
-                writer.writerows(reader)
+def update_csv_thumbs(csv_path, keys, dry_run=False, backup_dir=None,
+                      backup_retention=DEFAULT_BACKUP_RETENTION):
+    """Set each row's Thumb from its Photo's mirrored image key; returns cells changed"""
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f)
+        fieldnames = list(reader.fieldnames or [])
+        rows = list(reader)
+    if 'Photo' not in fieldnames:
+        return 0
+    if 'Thumb' not in fieldnames:
+        fieldnames.insert(fieldnames.index('Photo') + 1, 'Thumb')
+
+    changes = []
+    for number, row in enumerate(rows, start=1):
+        key = keys.get(row.get('Photo', '').strip())
+        thumb = f"{thumbnails.THUMB_DIR}/{thumbnails.thumb_name(key)}" if key else ''
+        if thumb != (row.get('Thumb') or ''):
+            changes.append({
+                'row': number,
+                'Aircraft': row.get('Aircraft', ''),
+                'column': 'Thumb',
+                'old': row.get('Thumb'),
+                'new': thumb,
+            })
+        row['Thumb'] = thumb
+
+    if changes and not dry_run:
+        record_row_diffs(csv_path, changes, backup_dir, backup_retention)
+        write_csv_atomic(csv_path, fieldnames, rows)
+        print(f"🖼️ Updated {len(changes)} thumbnails in {Path(csv_path).name}")
+    return len(changes)
+
+
+def mirror_thumbnails(csv_files, data_dir, jobs=8, refresh=False, dry_run=False,
+                      backup_dir=None, backup_retention=DEFAULT_BACKUP_RETENTION):
+    """Mirror the photos of every CSV into <data_dir>/thumbs and fill the Thumb columns"""
+    if not thumbnails.available():
+        print("⚠️ Pillow is not installed; skipping thumbnails (pip install pillow)")
+        return None
 
-        with open(csv_path, 'w', encoding='utf-8', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(rows)
+    urls = set()
+    for csv_path in csv_files:
+        with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+            urls.update((row.get('Photo') or '').strip() for row in csv.DictReader(f))
+    urls.discard('')
 
-        print(f"💾 Backup saved: {backup_path}")
-        print(f"✅ Updated {updates} images in {csv_path.name}")
+    print(f"\nMirroring {len(urls)} photos into {Path(data_dir) / thumbnails.THUMB_DIR}")
+    mirror = thumbnails.Mirror(Path(data_dir) / thumbnails.THUMB_DIR, get_client(),
+                               refresh=refresh, dry_run=dry_run)
+    keys = mirror.run(sorted(urls), jobs=jobs)
+    mirror.save(urls)
 
-    return updates, skipped, errors
+    changed = sum(update_csv_thumbs(csv_path, keys, dry_run, backup_dir, backup_retention)
+                  for csv_path in sorted(csv_files))
+    mirror.stats['thumb_cells_changed'] = changed
+    return mirror.stats
 
 
-def main():
+def main(argv=None):
     """Main execution function"""
     import argparse
     parser = argparse.ArgumentParser(description='Update aircraft images using Wikimedia Commons API')
@@ -293,7 +756,41 @@ def main():
     parser.add_argument('--limit', type=int, default=None)
     parser.add_argument('--force-recheck', action='store_true')
     parser.add_argument('--debug', action='store_true')
-    args = parser.parse_args()
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='Rows validated in parallel per CSV (default: 1, serial)')
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE,
+                        help='Max outbound requests per second (0 = unlimited)')
+    parser.add_argument('--per-host', type=int, default=DEFAULT_PER_HOST,
+                        help='Max concurrent requests to any one host')
+    parser.add_argument('--api-url', default=COMMONS_API_URL,
+                        help='Commons API endpoint (override to test against a local server)')
+    parser.add_argument('--cache-dir', default=None,
+                        help='Lookup cache directory (default: <data-dir>/.cache)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Disable the URL-check and Commons lookup cache')
+    parser.add_argument('--url-ttl', type=float, default=DEFAULT_URL_TTL_HOURS,
+                        help='Hours a photo URL check stays cached')
+    parser.add_argument('--lookup-ttl', type=float, default=DEFAULT_LOOKUP_TTL_HOURS,
+                        help='Hours a Commons filename/search lookup stays cached')
+    parser.add_argument('--backup-dir', default=None,
+                        help='Where row-level diff backups go (default: <data-dir>/.backups)')
+    parser.add_argument('--backup-retention', type=int, default=DEFAULT_BACKUP_RETENTION,
+                        help='Runs of diffs kept per CSV (0 = keep all)')
+    parser.add_argument('--thumbs', action='store_true',
+                        help='Mirror photos into <data-dir>/thumbs and fill the Thumb column (needs Pillow)')
+    parser.add_argument('--thumb-jobs', type=int, default=8,
+                        help='Parallel photo downloads for --thumbs')
+    parser.add_argument('--refresh-thumbs', action='store_true',
+                        help='Revalidate already mirrored photos with conditional requests')
+    instrument.add_arguments(parser)
+    args = parser.parse_args(argv)
+    return instrument.run_main('update_aircraft_images', args, update_images, args)
+
+
+def update_images(args):
+    global COMMONS_API_URL
+    COMMONS_API_URL = args.api_url
+    configure_client(rate=args.rate, per_host=args.per_host, concurrency=args.concurrency)
 
     data_dir = Path(args.data_dir)
     if not data_dir.exists():
@@ -305,22 +802,58 @@ def main():
         print(f"❌ No CSV files found in '{data_dir}'")
         return 1
 
+    # --no-cache keeps lookups in memory for this run only; batched
+    # prefetching hands its results to the row checks through the cache.
+    if args.no_cache:
+        cache_path = ':memory:'
+    else:
+        cache_dir = Path(args.cache_dir) if args.cache_dir else data_dir / '.cache'
+        cache_path = cache_dir / 'image_lookups.sqlite'
+    cache = configure_cache(cache_path, url_ttl=args.url_ttl * 3600,
+                            lookup_ttl=args.lookup_ttl * 3600)
+    try:
+        return process_files(args, csv_files, data_dir, cache)
+    finally:
+        cache.close()
+
+
+def process_files(args, csv_files, data_dir, cache):
     total_updates = total_skipped = total_errors = 0
     for csv_path in sorted(csv_files):
-        updates, skipped, errors = update_csv_images(
-            csv_path, dry_run=args.dry_run,
-            limit=args.limit, force_recheck=args.force_recheck,
-            debug=args.debug
-        )
+        with instrument.span('file', file=csv_path.name) as attrs:
+            updates, skipped, errors = update_csv_images(
+                csv_path, dry_run=args.dry_run,
+                limit=args.limit, force_recheck=args.force_recheck,
+                debug=args.debug, concurrency=args.concurrency,
+                backup_dir=args.backup_dir, backup_retention=args.backup_retention
+            )
+            attrs.update(updated=updates, skipped=skipped, errors=errors)
+        cache.commit()
         total_updates += updates
         total_skipped += skipped
         total_errors += errors
 
+    thumb_stats = None
+    if args.thumbs:
+        with instrument.span('thumbs', jobs=args.thumb_jobs):
+            thumb_stats = mirror_thumbnails(csv_files, data_dir, jobs=args.thumb_jobs,
+                                            refresh=args.refresh_thumbs, dry_run=args.dry_run,
+                                            backup_dir=args.backup_dir,
+                                            backup_retention=args.backup_retention)
+        for name, value in (thumb_stats or {}).items():
+            instrument.count(f"thumbs.{name}", value)
+
     print("\n📊 SUMMARY")
     print(f" Files processed: {len(csv_files)}")
     print(f" ✅ Images updated: {total_updates}")
     print(f" ⚠️ Images skipped: {total_skipped}")
     print(f" ❌ Errors: {total_errors}")
+    instrument.count('images.updated', total_updates)
+    instrument.count('images.skipped', total_skipped)
+    instrument.count('images.errors', total_errors)
+    print(f" 🗄️ Cache: {cache.summary()}")
+    if thumb_stats:
+        print(" 🖼️ Thumbnails: " + ', '.join(f"{name} {count}" for name, count in thumb_stats.items()))
     return 0
 
 